@@ -0,0 +1,455 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+import numpy as np
+from v2_search_engine import ENGINES
+from search_core.documents import ArxivPaper, DocumentStore
+from search_core.corpus import DocumentManager
+from search_core.sources import reddit_submission_to_post, RedditExtractor, ArxivHarvester, ingest_sources
+from search_core.engines import SearchEngine
+from search_core.semantic import SemanticIndex
+
+# ======================
+# Corpus synthétique (lois de Zipf)
+# ======================
+# Les mots, les auteurs et les nombres de commentaires suivent des lois de
+# Zipf, comme dans un vrai corpus : quelques termes très fréquents, une longue
+# traîne de termes rares. Le générateur est déterministe pour une graine donnée.
+SYLLABLES = ["ba", "ko", "ri", "te", "lu", "mo", "sa", "ne", "pi", "da", "fe", "go", "ju", "vi", "xo", "zu"]
+SUBREDDITS = ["python", "datascience", "machinelearning", "rust", "programming", "statistics"]
+# Nombre moyen de mots par titre, par post Reddit et par résumé arXiv
+TITLE_WORDS = 6
+REDDIT_WORDS = 40
+ARXIV_WORDS = 150
+MAX_COMMENTS = 5000
+# Horodatages répartis sur l'année 2024
+EPOCH_START = 1704067200
+YEAR_SECONDS = 366 * 86400
+BLOCK_SIZE = 10000
+
+def synthetic_word(rank):
+    # Mot prononçable et unique : le rang écrit en base 16, une syllabe par chiffre
+    word = SYLLABLES[rank % len(SYLLABLES)]
+    rank //= len(SYLLABLES)
+    while rank:
+        word = SYLLABLES[rank % len(SYLLABLES)] + word
+        rank //= len(SYLLABLES)
+    return word
+
+class ZipfSampler:
+    # Tirage de rangs 0..size-1 de probabilité proportionnelle à 1 / (rang + 1) ** exponent
+    def __init__(self, size, exponent):
+        weights = 1 / np.arange(1, size + 1) ** exponent
+        self.cdf = np.cumsum(weights) / weights.sum()
+
+    def sample(self, rng, n):
+        return np.minimum(np.searchsorted(self.cdf, rng.random(n), side="right"), len(self.cdf) - 1)
+
+class SyntheticCorpus:
+    def __init__(self, vocabulary_size=50000, exponent=1.1, n_authors=5000, seed=0):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.words = [synthetic_word(rank) for rank in range(vocabulary_size)]
+        self.word_sampler = ZipfSampler(vocabulary_size, exponent)
+        self.author_sampler = ZipfSampler(n_authors, 1.0)
+        self.comment_sampler = ZipfSampler(MAX_COMMENTS, 1.2)
+
+    def texts(self, rng, lengths):
+        # Tous les mots d'un bloc de textes sont tirés en une fois
+        ids = self.word_sampler.sample(rng, int(lengths.sum())).tolist()
+        words, texts, start = self.words, [], 0
+        for length in lengths.tolist():
+            texts.append(" ".join([words[i] for i in ids[start:start + length]]))
+            start += length
+        return texts
+
+    def reddit_submissions(self, n, subreddit=None, rng=None):
+        # Objets au format des soumissions praw (attributs lus par reddit_submission_to_post)
+        rng = self.rng if rng is None else rng
+        for start in range(0, n, BLOCK_SIZE):
+            size = min(BLOCK_SIZE, n - start)
+            titles = self.texts(rng, rng.poisson(TITLE_WORDS, size) + 1)
+            bodies = self.texts(rng, rng.poisson(REDDIT_WORDS, size) + 1)
+            authors = self.author_sampler.sample(rng, size).tolist()
+            comments = self.comment_sampler.sample(rng, size).tolist()
+            epochs = (EPOCH_START + rng.integers(0, YEAR_SECONDS, size)).tolist()
+            subreddits = rng.integers(0, len(SUBREDDITS), size).tolist()
+            for j in range(size):
+                yield SimpleNamespace(title=titles[j], selftext=bodies[j], author=f"user_{authors[j]}",
+                                      created_utc=epochs[j], num_comments=comments[j],
+                                      subreddit=SUBREDDITS[subreddits[j]] if subreddit is None else subreddit)
+
+    def arxiv_entries(self, n, rng=None):
+        # Champs d'une entrée du flux Atom d'arXiv
+        rng = self.rng if rng is None else rng
+        for start in range(0, n, BLOCK_SIZE):
+            size = min(BLOCK_SIZE, n - start)
+            titles = self.texts(rng, rng.poisson(TITLE_WORDS, size) + 1)
+            summaries = self.texts(rng, rng.poisson(ARXIV_WORDS, size) + 1)
+            n_authors = rng.integers(1, 5, size)
+            authors = self.author_sampler.sample(rng, int(n_authors.sum())).tolist()
+            epochs = (EPOCH_START + rng.integers(0, YEAR_SECONDS, size)).tolist()
+            offset = 0
+            for j, count in enumerate(n_authors.tolist()):
+                yield {"title": titles[j], "authors": [f"Auteur {author}" for author in authors[offset:offset + count]],
+                       "published": datetime.fromtimestamp(epochs[j], timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                       "summary": summaries[j]}
+                offset += count
+
+    def documents(self, n, reddit_ratio=0.5):
+        # Posts Reddit et articles arXiv mélangés, convertis comme à l'ingestion
+        n_reddit = int(round(n * reddit_ratio))
+        submissions = self.reddit_submissions(n_reddit)
+        entries = self.arxiv_entries(n - n_reddit)
+        for is_reddit in (self.rng.permutation(n) < n_reddit).tolist():
+            if is_reddit:
+                submission = next(submissions)
+                yield reddit_submission_to_post(submission, submission.subreddit)
+            else:
+                entry = next(entries)
+                yield ArxivPaper(entry["title"], entry["authors"], entry["published"], entry["summary"])
+
+    def queries(self, n, max_terms=3):
+        # Requêtes de 1 à max_terms termes tirés de la même loi que les documents
+        rng = np.random.default_rng([self.seed, 1])
+        lengths = rng.integers(1, max_terms + 1, n)
+        return self.texts(rng, lengths)
+
+# ======================
+# Sources factices (praw et arXiv)
+# ======================
+class SyntheticRedditClient:
+    # Remplaçant de praw.Reddit pour RedditExtractor ; chaque subreddit a son propre
+    # générateur aléatoire (les subreddits sont lus en parallèle)
+    def __init__(self, corpus, posts_per_subreddit=1000):
+        self.corpus = corpus
+        self.posts_per_subreddit = posts_per_subreddit
+
+    def subreddit(self, name):
+        return SyntheticSubreddit(self.corpus, name, self.posts_per_subreddit)
+
+class SyntheticSubreddit:
+    def __init__(self, corpus, name, size):
+        self.corpus = corpus
+        self.name = name
+        self.size = size
+
+    def listing(self, limit=None):
+        count = self.size if limit is None else min(limit, self.size)
+        rng = np.random.default_rng([self.corpus.seed, zlib.crc32(self.name.encode("utf-8"))])
+        return self.corpus.reddit_submissions(count, subreddit=self.name, rng=rng)
+
+    top = hot = new = listing
+
+ATOM_FEED_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">\n'
+                    '<title>ArXiv Query</title>\n<opensearch:totalResults>{total}</opensearch:totalResults>\n')
+ATOM_FEED_FOOTER = "</feed>\n"
+
+def atom_entry(entry):
+    authors = "".join(f"<author><name>{escape(author)}</name></author>" for author in entry["authors"])
+    return (f"<entry><title>{escape(entry['title'])}</title><published>{entry['published']}</published>"
+            f"<summary>{escape(entry['summary'])}</summary>{authors}</entry>\n")
+
+class ArxivFeedHandler(BaseHTTPRequestHandler):
+    # Connexions persistantes (HTTP/1.1), comme l'API arXiv
+    protocol_version = "HTTP/1.1"
+    entries = []
+
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        start, size = int(params["start"][0]), int(params["max_results"][0])
+        body = (ATOM_FEED_HEADER.format(total=len(self.entries)) + "".join(self.entries[start:start + size])
+                + ATOM_FEED_FOOTER).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class SyntheticArxivServer:
+    # Point d'accès arXiv local servant des flux Atom paginés, à utiliser avec
+    # ArxivHarvester(url=server.url) dans un bloc with
+    def __init__(self, corpus, total=1000):
+        rng = np.random.default_rng([corpus.seed, 2])
+        handler = type("SyntheticArxivHandler", (ArxivFeedHandler,),
+                       {"entries": [atom_entry(entry) for entry in corpus.arxiv_entries(total, rng=rng)]})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/query"
+        self.thread = None
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+# ======================
+# Mesures
+# ======================
+# Sens d'amélioration de chaque mesure : -1 si plus bas est meilleur, 1 sinon
+METRICS = {"fit_seconds": -1, "peak_memory_bytes": -1, "first_query_ms": -1, "p50_ms": -1, "p99_ms": -1,
+           "qps": 1, "batch_qps": 1}
+RESULTS_FORMAT_VERSION = 1
+# Listes parcourues par la recherche sémantique (compromis rappel/latence)
+SEMANTIC_PROBE_SWEEP = (1, 4, 16, 64)
+
+def measure_engine(engine_class, documents, queries, k=10, measure_memory=True, rankings=None):
+    # Les indices des k premiers résultats de chaque requête sont ajoutés à rankings
+    # (comparaison des classements entre moteurs). Pic mémoire (tracemalloc) mesuré sur une construction à part : le traçage
+    # ralentit le code Python et fausserait le temps de construction
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        engine = engine_class(documents, cache_size=0)
+        engine.search(queries[0], k=k)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del engine
+
+    start = time.perf_counter()
+    engine = engine_class(documents, cache_size=0)
+    fit_seconds = time.perf_counter() - start
+    # La première requête paie les structures construites à la demande (listes inversées...)
+    start = time.perf_counter()
+    engine.search(queries[0], k=k)
+    first_query = time.perf_counter() - start
+
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        page = engine.search(query, k=k)
+        latencies[i] = time.perf_counter() - start
+        if rankings is not None:
+            rankings.append(np.asarray(page.indices))
+    start = time.perf_counter()
+    engine.search_many(queries, k=k)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "fit_seconds": fit_seconds,
+        "peak_memory_bytes": peak_memory,
+        "first_query_ms": first_query * 1000,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "mean_ms": float(latencies.mean()) * 1000,
+        "qps": len(queries) / latencies.sum(),
+        "batch_qps": len(queries) / batch_seconds,
+    }
+
+def ranking_overlap(rankings, reference):
+    # Part moyenne des k premiers résultats de référence retrouvés (requêtes avec au moins un résultat)
+    overlaps = [len(np.intersect1d(ranking, expected)) / len(expected)
+                for ranking, expected in zip(rankings, reference) if len(expected)]
+    return float(np.mean(overlaps)) if overlaps else None
+
+def title_match_rate(documents, queries, rankings):
+    # Part des résultats dont le titre contient un terme de la requête
+    matches = [bool(set(query.split()) & set(documents[i].title.split()))
+               for query, ranking in zip(queries, rankings) for i in ranking.tolist()]
+    return float(np.mean(matches)) if matches else None
+
+def measure_semantic(engine, queries, k=10, probes=SEMANTIC_PROBE_SWEEP):
+    # Rappel des k premiers résultats de la recherche exacte (toutes les listes) et
+    # latence, pour chaque nombre de listes parcourues
+    start = time.perf_counter()
+    index = SemanticIndex.build(engine)
+    build_seconds = time.perf_counter() - start
+    exact = [index.search(query, k=k, n_probe=len(index.centroids)).indices for query in queries]
+    sweep = []
+    for n_probe in probes:
+        latencies, found = np.empty(len(queries)), []
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            found.append(index.search(query, k=k, n_probe=n_probe).indices)
+            latencies[i] = time.perf_counter() - start
+        sweep.append({"n_probe": n_probe, "recall_at_k": ranking_overlap(found, exact),
+                      "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+                      "p99_ms": float(np.percentile(latencies, 99)) * 1000})
+    return {"build_seconds": build_seconds, "lists": len(index.centroids), "probes": sweep}
+
+def format_semantic(result):
+    lines = [f"sémantique — {result['documents']} documents : construction {result['build_seconds']:.2f} s, "
+             f"{result['lists']} listes"]
+    for row in result["probes"]:
+        lines.append(f"  {row['n_probe']:>4} listes parcourues : rappel {row['recall_at_k']:.0%}, "
+                     f"p50 {row['p50_ms']:.2f} ms, p99 {row['p99_ms']:.2f} ms")
+    return "\n".join(lines)
+
+def measure_ingestion(corpus, n_documents):
+    # Ingestion complète depuis les sources factices : extraction parallèle,
+    # conversion, détection des doublons et stockage en colonnes
+    per_subreddit = max(1, n_documents // 2 // len(SUBREDDITS))
+    client = SyntheticRedditClient(corpus, per_subreddit)
+    manager = DocumentManager()
+    with SyntheticArxivServer(corpus, total=n_documents - per_subreddit * len(SUBREDDITS)) as server:
+        sources = {
+            "Reddit": lambda: list(RedditExtractor(SUBREDDITS, limit=per_subreddit, client=client).posts()),
+            # Aucune limite de débit face au serveur local
+            "Arxiv": lambda: list(ArxivHarvester(query="all:benchmark", url=server.url, rate=1e9).papers()),
+        }
+        start = time.perf_counter()
+        reports = ingest_sources(manager, sources)
+        seconds = time.perf_counter() - start
+    for name, report in reports.items():
+        if report["error"] is not None:
+            raise RuntimeError(f"source {name} : {report['error']}")
+    return {
+        "sources": {name: {"documents": report["documents"], "seconds": report["seconds"]} for name, report in reports.items()},
+        "stored": len(manager.doc_list),
+        "seconds": seconds,
+        "docs_per_second": len(manager.doc_list) / seconds,
+    }
+
+def run_benchmarks(sizes=(10000, 100000), engines=None, n_queries=1000, k=10, measure_memory=True, ingest=10000,
+                   seed=0, vocabulary_size=50000, semantic_probes=SEMANTIC_PROBE_SWEEP, log=print):
+    engines = list(ENGINES) if engines is None else list(engines)
+    corpus = SyntheticCorpus(vocabulary_size=vocabulary_size, seed=seed)
+    queries = corpus.queries(n_queries)
+    # Échauffement hors mesure : chargement différé de scikit-learn et scipy
+    warmup = list(SyntheticCorpus(vocabulary_size=1000, seed=seed).documents(100))
+    for name in engines:
+        ENGINES[name](warmup, cache_size=0).search(queries[0], k=k)
+    results, semantic_results = [], []
+    for n_documents in sorted(sizes):
+        start = time.perf_counter()
+        documents = DocumentStore(SyntheticCorpus(vocabulary_size=vocabulary_size, seed=seed).documents(n_documents))
+        generation_seconds = time.perf_counter() - start
+        # Classements comparés à celui du premier moteur mesuré
+        reference = None
+        for name in engines:
+            result = {"engine": name, "documents": n_documents, "generation_seconds": generation_seconds}
+            rankings = []
+            result.update(measure_engine(ENGINES[name], documents, queries, k, measure_memory, rankings))
+            if reference is None:
+                reference = (name, rankings)
+            result["ranking"] = {"reference": reference[0], "overlap_at_k": ranking_overlap(rankings, reference[1]),
+                                 "title_match_rate": title_match_rate(documents, queries, rankings)}
+            results.append(result)
+            log(format_result(result))
+        if semantic_probes:
+            semantic = {"documents": n_documents}
+            semantic.update(measure_semantic(SearchEngine(documents, cache_size=0), queries, k, semantic_probes))
+            semantic_results.append(semantic)
+            log(format_semantic(semantic))
+    report = {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "parameters": {"sizes": sorted(sizes), "queries": n_queries, "k": k, "seed": seed,
+                       "vocabulary_size": vocabulary_size},
+        "results": results,
+        "semantic": semantic_results,
+        "ingestion": None,
+    }
+    if ingest:
+        report["ingestion"] = measure_ingestion(corpus, ingest)
+        log(f"Ingestion (sources factices) : {report['ingestion']['stored']} documents en "
+            f"{report['ingestion']['seconds']:.2f} s ({report['ingestion']['docs_per_second']:.0f} documents/s)")
+    return report
+
+def format_result(result):
+    memory = "" if result["peak_memory_bytes"] is None else f", pic mémoire {result['peak_memory_bytes'] / 2 ** 20:.1f} Mo"
+    ranking, agreement = result.get("ranking") or {}, ""
+    if ranking.get("overlap_at_k") is not None and ranking["reference"] != result["engine"]:
+        agreement += f", classement commun à {ranking['overlap_at_k']:.0%} avec {ranking['reference']}"
+    if ranking.get("title_match_rate") is not None:
+        agreement += f", titre correspondant pour {ranking['title_match_rate']:.0%} des résultats"
+    return (f"{result['engine']} — {result['documents']} documents : construction {result['fit_seconds']:.2f} s, "
+            f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, {result['qps']:.0f} requêtes/s "
+            f"({result['batch_qps']:.0f} par lots){memory}{agreement}")
+
+# ======================
+# Résultats et comparaison à une référence
+# ======================
+def write_results(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    if report.get("format_version") != RESULTS_FORMAT_VERSION:
+        raise ValueError(f"Format de résultats non supporté : {report.get('format_version')}")
+    return report
+
+def compare_results(report, baseline, tolerance=0.1):
+    # Variation relative de chaque mesure par (moteur, taille) présents dans les deux
+    # rapports ; au-delà de la tolérance dans le mauvais sens, c'est une régression
+    references = {(result["engine"], result["documents"]): result for result in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        reference = references.get((result["engine"], result["documents"]))
+        if reference is None:
+            continue
+        for metric, direction in METRICS.items():
+            old, new = reference.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            rows.append({"engine": result["engine"], "documents": result["documents"], "metric": metric,
+                         "baseline": old, "current": new, "change": change,
+                         "regression": change * direction < -tolerance})
+    return rows
+
+def format_comparison(rows):
+    lines = []
+    for row in rows:
+        flag = " ⚠ régression" if row["regression"] else ""
+        lines.append(f"{row['engine']:>10} {row['documents']:>9} {row['metric']:<18} {row['baseline']:>14.4g} → "
+                     f"{row['current']:<14.4g} {row['change']:+.1%}{flag}")
+    return "\n".join(lines)
+
+# ======================
+# Exécution
+# ======================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai hors ligne du moteur de recherche")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000],
+                        help="tailles de corpus mesurées (par exemple 10000 100000 1000000)")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), help="moteurs mesurés (tous par défaut)")
+    parser.add_argument("--queries", type=int, default=1000, help="nombre de requêtes par mesure de latence")
+    parser.add_argument("--ingest", type=int, default=10000, help="documents ingérés depuis les sources factices (0 : aucun)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="ne pas mesurer le pic mémoire (plus rapide)")
+    parser.add_argument("--probes", type=int, nargs="*", default=list(SEMANTIC_PROBE_SWEEP),
+                        help="listes parcourues par la recherche sémantique (aucune valeur : mesure ignorée)")
+    parser.add_argument("--output", default="benchmark_results.json", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", help="résultats de référence (JSON) auxquels comparer cette exécution")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="dégradation relative tolérée avant de signaler une régression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.engines, args.queries, measure_memory=not args.no_memory,
+                            ingest=args.ingest, seed=args.seed, semantic_probes=args.probes)
+    write_results(report, args.output)
+    print(f"Résultats enregistrés dans '{args.output}'")
+
+    if args.baseline:
+        rows = compare_results(report, read_results(args.baseline), args.tolerance)
+        print(f"\n--- Comparaison avec '{args.baseline}' ---")
+        print(format_comparison(rows) or "Aucune mesure commune.")
+        # Code de sortie non nul en cas de régression (intégration continue)
+        sys.exit(1 if any(row["regression"] for row in rows) else 0)
@@ -0,0 +1,131 @@
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+import numpy as np
+from benchmark_v2_search_engine import SyntheticCorpus
+from server_v2_search_engine import SERVER_ENGINES, SearchSnapshot, SERVER_WORKERS, SearchServer
+from search_core.documents import DocumentStore
+
+# ======================
+# Générateur de charge
+# ======================
+# Chaque client garde une connexion persistante et enchaîne les requêtes
+# /search (boucle fermée : une requête attend la réponse de la précédente).
+# Débit et latences de queue sont mesurés côté client.
+LOAD_CLIENTS = 8
+LOAD_SECONDS = 10
+
+def run_load(url, queries, clients=LOAD_CLIENTS, seconds=LOAD_SECONDS, requests_per_client=None, k=10):
+    # Durée fixe, ou requests_per_client requêtes par client si ce nombre est donné
+    address = urlsplit(url)
+    paths = [f"/search?{urlencode({'q': query, 'k': k})}" for query in queries]
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    connections = [0] * clients
+    barrier = threading.Barrier(clients + 1)
+    deadline = None
+
+    def client(number):
+        connection = None
+        barrier.wait()
+        sent = 0
+        while (sent < requests_per_client) if requests_per_client is not None else (time.perf_counter() < deadline):
+            path = paths[(number + sent * clients) % len(paths)]
+            sent += 1
+            start = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(address.hostname, address.port, timeout=30)
+                    connections[number] += 1
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[number] += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                errors[number] += 1
+                if connection is not None:
+                    connection.close()
+                connection = None
+                continue
+            latencies[number].append(time.perf_counter() - start)
+        if connection is not None:
+            connection.close()
+
+    threads = [threading.Thread(target=client, args=(number,), daemon=True) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    deadline = start + seconds
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.array(values) for values in latencies]) * 1000
+    report = {"clients": clients, "seconds": elapsed, "requests": len(all_latencies), "errors": sum(errors),
+              "connections": sum(connections), "qps": len(all_latencies) / elapsed}
+    for name, q in [("p50_ms", 50), ("p90_ms", 90), ("p99_ms", 99), ("p999_ms", 99.9)]:
+        report[name] = float(np.percentile(all_latencies, q)) if len(all_latencies) else None
+    report["max_ms"] = float(all_latencies.max()) if len(all_latencies) else None
+    return report
+
+def format_load_report(report):
+    if not report["requests"]:
+        return f"Aucune réponse ({report['errors']} erreurs)."
+    return (f"{report['requests']} requêtes en {report['seconds']:.1f} s par {report['clients']} clients "
+            f"({report['connections']} connexions) : {report['qps']:.0f} requêtes/s, p50 {report['p50_ms']:.2f} ms, "
+            f"p90 {report['p90_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, p99.9 {report['p999_ms']:.2f} ms, "
+            f"max {report['max_ms']:.2f} ms, {report['errors']} erreurs")
+
+# ======================
+# Exécution
+# ======================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Générateur de charge du serveur de recherche")
+    parser.add_argument("--url", help="serveur déjà démarré (par défaut : serveur local sur un corpus synthétique)")
+    parser.add_argument("--documents", type=int, default=100000, help="taille du corpus synthétique du serveur local")
+    parser.add_argument("--engine", choices=sorted(SERVER_ENGINES), default="cosinus", help="moteur du serveur local")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="threads du serveur local")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, LOAD_CLIENTS],
+                        help="nombres de clients simultanés mesurés successivement")
+    parser.add_argument("--seconds", type=float, default=LOAD_SECONDS, help="durée de chaque mesure")
+    parser.add_argument("--queries", type=int, default=1000, help="requêtes synthétiques distinctes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    args = parser.parse_args()
+    if min(args.clients) < 1:
+        parser.error("--clients doit être au moins 1")
+
+    corpus = SyntheticCorpus(seed=args.seed)
+    queries = corpus.queries(args.queries)
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        url = args.url
+        if url is None:
+            # Serveur dans ce processus : clients et serveur se partagent les cœurs (et le GIL)
+            engine = SERVER_ENGINES[args.engine](DocumentStore(corpus.documents(args.documents)))
+            engine.save(os.path.join(directory, "index"))
+            snapshot = SearchSnapshot.load(os.path.join(directory, "index"), SERVER_ENGINES[args.engine])
+            server = SearchServer(snapshot, port=0, workers=args.workers).__enter__()
+            url = server.url
+            print(f"Serveur local : {args.documents} documents sur {url}")
+        try:
+            for clients in args.clients:
+                report = run_load(url, queries, clients, args.seconds)
+                reports.append(report)
+                print(format_load_report(report))
+        finally:
+            if server is not None:
+                server.__exit__(None, None, None)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"Résultats enregistrés dans '{args.output}'")
@@ -0,0 +1,317 @@
+import argparse
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from v2_search_engine import ENGINES
+from search_core.metrics import METRICS
+from search_core.corpus import CorpusStats, SearchFilter, MetadataIndex
+from search_core.engines import INDEX_PATH, document_to_dict
+
+# ======================
+# Instantané de l'index
+# ======================
+# Index enregistré, chargé une seule fois (tableaux projetés en mémoire, en
+# lecture seule) avec toutes les structures dérivées calculées d'avance : les
+# recherches ne modifient aucun état et s'exécutent en parallèle sans verrou,
+# sauf avec le moteur réparti dont les processus traitent une requête à la fois.
+# L'index inversé n'est pas proposé : ses tableaux de travail sont partagés
+# entre recherches.
+SERVER_ENGINES = {name: engine_class for name, engine_class in ENGINES.items() if name != "inverse"}
+MAX_RESULTS = 100
+
+class SearchSnapshot:
+    def __init__(self, engine):
+        self.engine = engine
+        self.documents = engine.documents
+        self.metadata_index = MetadataIndex()
+        self.metadata_index.update(self.documents)
+        self.metadata_index.prepare()
+        corpus_stats = CorpusStats()
+        for doc in self.documents:
+            corpus_stats.add(doc)
+        self.summary = corpus_stats.summary()
+        self.summary["engine"] = type(engine).__name__
+        self.summary["terms"] = engine.doc_matrix.shape[1]
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, engine_class=ENGINES["cosinus"]):
+        return cls(engine_class.load(path))
+
+    def search(self, query, k=10, offset=0, filters=None):
+        rows = self.metadata_index.rows(filters) if filters else None
+        return self.engine.rank(query, k, offset, rows)
+
+    def document(self, doc_id):
+        if not 0 <= doc_id < len(self.documents):
+            raise KeyError(doc_id)
+        record = document_to_dict(self.documents[doc_id])
+        record["id"] = doc_id
+        return record
+
+# ======================
+# Serveur HTTP/JSON
+# ======================
+# Points d'accès (GET, réponses JSON) :
+#   /search?q=...&k=10&offset=0&type=...&creator=...&since=AAAA-MM-JJ&until=...&min_comments=...
+#   /stats
+#   /document/<id>
+# Les connexions sont persistantes (HTTP/1.1). Un thread unique surveille les
+# connexions inactives (sélecteur) et confie au pool de taille fixe celles dont une
+# requête est arrivée : un thread du pool n'est occupé que le temps d'une réponse,
+# quel que soit le nombre de clients. Une connexion inactive depuis
+# KEEPALIVE_TIMEOUT secondes est fermée.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+SERVER_WORKERS = 16
+KEEPALIVE_TIMEOUT = 5
+
+def search_filter_from_params(params):
+    def first(name):
+        return params[name][0] if name in params else None
+    return SearchFilter(doc_type=first("type"), since=first("since"), until=first("until"),
+                        creator=params.get("creator"), min_comments=first("min_comments"))
+
+def result_to_dict(doc_id, doc, score):
+    return {"id": int(doc_id), "title": doc.title, "type": doc.doc_type, "creator": doc.creator,
+            "date": doc.timestamp, "score": float(score)}
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, l'algorithme
+    # de Nagle et l'accusé de réception différé ajoutent ~40 ms par réponse
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        endpoint = url.path.strip("/").split("/")[0]
+        try:
+            if endpoint == "search":
+                status, payload = 200, self.search(params)
+            elif endpoint == "stats":
+                status, payload = 200, self.stats()
+            elif endpoint == "document":
+                status, payload = 200, self.server.snapshot.document(int(unquote(url.path.rstrip("/").rsplit("/", 1)[1])))
+            else:
+                status, payload = 404, {"error": f"point d'accès inconnu : {url.path}"}
+        except KeyError as error:
+            status, payload = 404, {"error": f"document inconnu : {error}"}
+        except ValueError as error:
+            status, payload = 400, {"error": str(error)}
+        self.send_json(status, payload)
+        self.server.record(endpoint if status != 404 else "inconnu", status, time.perf_counter() - start)
+
+    def search(self, params):
+        if "q" not in params:
+            raise ValueError("paramètre q manquant")
+        k = int(params.get("k", ["10"])[0])
+        offset = int(params.get("offset", ["0"])[0])
+        if not 1 <= k <= MAX_RESULTS or offset < 0:
+            raise ValueError(f"k doit être compris entre 1 et {MAX_RESULTS}, offset positif")
+        query = params["q"][0]
+        page = self.server.snapshot.search(query, k, offset, search_filter_from_params(params))
+        return {"query": query, "total": int(page.total), "offset": offset,
+                "results": [result_to_dict(doc_id, doc, score) for doc_id, (doc, score) in zip(page.indices, page)]}
+
+    def stats(self):
+        stats = dict(self.server.snapshot.summary)
+        stats["server"] = self.server.counters()
+        return stats
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle(self):
+        # Une requête par passage : la connexion retourne ensuite au sélecteur du
+        # serveur, sauf si la suivante est déjà arrivée (requêtes enchaînées)
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.request_pending():
+            self.handle_one_request()
+
+    def request_pending(self):
+        try:
+            self.connection.setblocking(False)
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+class SearchServer(HTTPServer):
+    # Serveur à utiliser dans un bloc with (service dans un thread d'arrière-plan)
+    # ou par serve_forever()
+    # File d'attente des connexions : celle par défaut (5) déborde quand de nombreux
+    # clients se connectent ensemble, et chaque connexion refusée attend 1 s de plus
+    request_queue_size = 128
+
+    def __init__(self, snapshot, host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS, verbose=False):
+        super().__init__((host, port), SearchRequestHandler)
+        self.snapshot = snapshot
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-http")
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.connections = 0
+        self.thread = None
+        # Connexions inactives : surveillées par un seul thread, réveillé par une
+        # paire de sockets lorsqu'une connexion lui est rendue
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_writer.setblocking(False)
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        self.waiting = []
+        self.closing = False
+        self.watcher = threading.Thread(target=self.watch_connections, name="search-http-idle", daemon=True)
+        self.watcher.start()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def process_request(self, request, client_address):
+        # La connexion attend sa première requête dans le sélecteur, sans thread
+        with self.lock:
+            self.connections += 1
+        self.watch(request, client_address)
+
+    def watch(self, request, client_address):
+        with self.lock:
+            closing = self.closing
+            if not closing:
+                self.waiting.append((request, client_address))
+        if closing:
+            self.shutdown_request(request)
+        else:
+            self.wake()
+
+    def wake(self):
+        try:
+            self.wakeup_writer.send(b"\0")
+        except OSError:
+            # Tampon plein : un réveil est déjà en attente
+            pass
+
+    def watch_connections(self):
+        deadlines = {}
+        while True:
+            timeout = max(0, min(deadlines.values()) - time.monotonic()) if deadlines else None
+            for key, _ in self.selector.select(timeout):
+                if key.fileobj is self.wakeup_reader:
+                    self.wakeup_reader.recv(4096)
+                    continue
+                # Requête arrivée (ou fermeture par le client) : la connexion passe au pool
+                self.selector.unregister(key.fileobj)
+                del deadlines[key.fileobj]
+                self.executor.submit(self.serve_connection, key.fileobj, key.data)
+            with self.lock:
+                waiting, self.waiting = self.waiting, []
+                closing = self.closing
+            now = time.monotonic()
+            for request, client_address in waiting:
+                self.selector.register(request, selectors.EVENT_READ, client_address)
+                deadlines[request] = now + KEEPALIVE_TIMEOUT
+            for request in [request for request, deadline in deadlines.items() if closing or deadline <= now]:
+                self.selector.unregister(request)
+                del deadlines[request]
+                self.shutdown_request(request)
+            if closing:
+                return
+
+    def serve_connection(self, request, client_address):
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        if handler.close_connection:
+            self.shutdown_request(request)
+        else:
+            self.watch(request, client_address)
+
+    def record(self, endpoint, status, seconds):
+        with self.lock:
+            self.requests += 1
+        METRICS.count("http_requests_total", endpoint=endpoint, status=status)
+        METRICS.observe("http_request_seconds", seconds, endpoint=endpoint)
+
+    def counters(self):
+        with self.lock:
+            return {"uptime_seconds": time.time() - self.started, "requests": self.requests,
+                    "connections": self.connections}
+
+    def server_close(self):
+        super().server_close()
+        # Les connexions inactives sont fermées par le thread de surveillance
+        with self.lock:
+            self.closing = True
+        self.wake()
+        self.watcher.join()
+        self.selector.close()
+        self.wakeup_reader.close()
+        self.wakeup_writer.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+# ======================
+# Exécution
+# ======================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur HTTP/JSON du moteur de recherche")
+    parser.add_argument("--index", default=INDEX_PATH, help="index enregistré (voir SearchEngine.save)")
+    parser.add_argument("--engine", choices=sorted(SERVER_ENGINES), default="cosinus",
+                        help="moteur correspondant à l'index enregistré")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                        help="threads du pool (un thread est occupé le temps d'une réponse, pas d'une connexion)")
+    parser.add_argument("--metrics", help="active l'instrumentation et écrit les mesures dans ce fichier à l'arrêt")
+    parser.add_argument("--verbose", action="store_true", help="journalise chaque requête")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers doit être au moins 1")
+    if not os.path.exists(os.path.join(args.index, "meta.json")):
+        parser.error(f"aucun index enregistré dans '{args.index}'")
+    if args.metrics:
+        METRICS.enable()
+
+    snapshot = SearchSnapshot.load(args.index, SERVER_ENGINES[args.engine])
+    server = SearchServer(snapshot, args.host, args.port, args.workers, args.verbose)
+    print(f"{snapshot.summary['documents']} documents servis sur {server.url} (Ctrl+C pour arrêter)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.metrics:
+            METRICS.write(args.metrics)
+            print(f"Mesures enregistrées dans '{args.metrics}'")
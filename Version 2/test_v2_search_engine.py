@@ -1,89 +1,153 @@
 import unittest
-from v2_search_engine import BaseDocument, RedditPost, ArxivPaper, DocumentManager, SearchEngine, reddit_posts_extract, arxiv_papers_extract
+import sys
+import subprocess
+import os
+import tempfile
+import json
+import http.client
+from v2_search_engine import benchmark_startup, ENGINES
+from benchmark_v2_search_engine import (SyntheticCorpus, SyntheticRedditClient, SyntheticArxivServer, run_benchmarks,
+                                        write_results, read_results, compare_results)
+from server_v2_search_engine import SERVER_ENGINES, SearchSnapshot, SearchServer
+from loadgen_v2_search_engine import run_load
+from search_core.documents import RedditPost, ArxivPaper
+from search_core.sources import RedditExtractor, ArxivHarvester
+from search_core.engines import SearchEngine
+from urllib.parse import urlsplit
 
 class TestSearchEngine(unittest.TestCase):
     # ====================
-    # Test de la classe BaseDocument
+    # Test du banc d'essai hors ligne
     # ====================
-    def test_base_document_creation(self):
-        print("[Test] Création d'un BaseDocument...")
-        base_doc = BaseDocument("Titre générique", "Auteur Test", "2025-01-01", "Contenu générique")
-        self.assertEqual(base_doc.title, "Titre générique")
-        self.assertEqual(base_doc.creator, "Auteur Test")
-        self.assertEqual(base_doc.timestamp, "2025-01-01")
-        self.assertEqual(base_doc.doc_type, "Generic Document")
-        print("✔️ BaseDocument créé avec succès.")
+    def test_benchmark_suite(self):
+        print("[Test] Corpus synthétique, sources factices et banc d'essai...")
+        corpus = SyntheticCorpus(vocabulary_size=2000, seed=3)
+        docs = list(corpus.documents(400))
+        self.assertEqual([doc.content for doc in docs], [doc.content for doc in SyntheticCorpus(vocabulary_size=2000, seed=3).documents(400)])
+        self.assertEqual(sum(isinstance(doc, RedditPost) for doc in docs), 200)
+        # Loi de Zipf : le terme de rang 1 est environ deux fois plus fréquent que celui de rang 2
+        words = " ".join(doc.content for doc in docs).split()
+        self.assertGreater(words.count(corpus.words[0]), 1.5 * words.count(corpus.words[1]))
 
-    # ====================
-    # Test de la classe RedditPost
-    # ====================
-    def test_reddit_post_creation(self):
-        print("[Test] Création d'un RedditPost...")
-        reddit_post = RedditPost("Titre Reddit", "Utilisateur Reddit", "2025-01-01", 100, "Contenu Reddit")
-        self.assertEqual(reddit_post.title, "Titre Reddit")
-        self.assertEqual(reddit_post.creator, "Utilisateur Reddit")
-        self.assertEqual(reddit_post.comments, 100)
-        self.assertEqual(reddit_post.doc_type, "Reddit Post")
-        print("✔️ RedditPost créé avec succès.")
+        # Sources factices branchées sur les extracteurs réels
+        posts = list(RedditExtractor(("python", "rust"), limit=30, client=SyntheticRedditClient(corpus, 30)).posts())
+        self.assertEqual(len(posts), 60)
+        self.assertEqual({post.subreddit for post in posts}, {"python", "rust"})
+        with SyntheticArxivServer(corpus, total=250) as server:
+            papers = list(ArxivHarvester(url=server.url, page_size=100, rate=1e9).papers())
+        self.assertEqual(len(papers), 250)
+        self.assertTrue(all(paper.creators and paper.content for paper in papers))
 
-    # ====================
-    # Test de la classe ArxivPaper
-    # ====================
-    def test_arxiv_paper_creation(self):
-        print("[Test] Création d'un ArxivPaper...")
-        arxiv_paper = ArxivPaper("Titre Arxiv", ["Auteur1", "Auteur2"], "2025-01-01", "Résumé Arxiv")
-        self.assertEqual(arxiv_paper.title, "Titre Arxiv")
-        self.assertEqual(arxiv_paper.creators, ["Auteur1", "Auteur2"])
-        self.assertEqual(arxiv_paper.doc_type, "Arxiv Paper")
-        print("✔️ ArxivPaper créé avec succès.")
+        report = run_benchmarks(sizes=[300], n_queries=20, ingest=200, seed=3, vocabulary_size=2000, log=lambda line: None)
+        self.assertEqual({result["engine"] for result in report["results"]}, set(ENGINES))
+        for result in report["results"]:
+            self.assertGreater(result["fit_seconds"], 0)
+            self.assertGreater(result["peak_memory_bytes"], 0)
+            self.assertGreaterEqual(result["p99_ms"], result["p50_ms"])
+            self.assertGreater(result["qps"], 0)
+        # Classements comparés au premier moteur : les variantes TF-IDF le reproduisent exactement
+        rankings = {result["engine"]: result["ranking"] for result in report["results"]}
+        self.assertEqual(rankings["inverse"]["reference"], "cosinus")
+        self.assertEqual(rankings["inverse"]["overlap_at_k"], 1.0)
+        self.assertEqual(rankings["reparti"]["overlap_at_k"], 1.0)
+        self.assertLess(rankings["bm25"]["overlap_at_k"], 1.0)
+        self.assertGreater(rankings["bm25"]["title_match_rate"], rankings["cosinus"]["title_match_rate"])
+        # Recherche sémantique : rappel croissant avec le nombre de listes parcourues, exact quand elles le sont toutes
+        recalls = [row["recall_at_k"] for row in report["semantic"][0]["probes"]]
+        self.assertEqual(recalls, sorted(recalls))
+        self.assertEqual(recalls[-1], 1.0)
+        self.assertEqual(report["ingestion"]["stored"], 200)
 
-    # ====================
-    # Test de la classe DocumentManager
-    # ====================
-    def test_document_manager(self):
-        print("[Test] Gestion des documents avec DocumentManager...")
-        manager = DocumentManager()
-        doc1 = RedditPost("Titre1", "Auteur1", "2025-01-01", 10)
-        doc2 = ArxivPaper("Titre2", ["Auteur2"], "2025-01-02")
-        manager.add(doc1)
-        manager.add(doc2)
-        self.assertEqual(len(manager.doc_list), 2)
-        print("✔️ DocumentManager fonctionne correctement.")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            write_results(report, path)
+            baseline = read_results(path)
+        self.assertFalse(any(row["regression"] for row in compare_results(report, baseline)))
+        # Référence deux fois plus rapide : régression signalée
+        for result in baseline["results"]:
+            result["qps"] *= 2
+        regressions = [row for row in compare_results(report, baseline) if row["regression"]]
+        self.assertEqual({row["metric"] for row in regressions}, {"qps"})
+        print("✔️ Banc d'essai exécuté sans réseau.")
 
     # ====================
-    # Test de l'extraction Reddit
+    # Test du serveur HTTP/JSON
     # ====================
-    def test_reddit_posts_extract(self):
-        print("[Test] Extraction des posts Reddit...")
-        reddit_posts = reddit_posts_extract()
-        self.assertGreater(len(reddit_posts), 0)
-        self.assertIsInstance(reddit_posts[0], RedditPost)
-        print("✔️ Extraction des posts Reddit réussie.")
+    def test_search_server(self):
+        print("[Test] Serveur de recherche HTTP et générateur de charge...")
+        docs = [RedditPost("Python tips", "alice", "2024-03-01", 12, "python list comprehension tricks", "python"),
+                RedditPost("Rust ownership", "bob", "2024-04-01", 3, "rust borrow checker explained", "rust"),
+                ArxivPaper("Python for science", ["carol", "dave"], "2023-05-01", "numerical python arrays")]
+        with tempfile.TemporaryDirectory() as directory:
+            SearchEngine(docs).save(os.path.join(directory, "index"))
+            snapshot = SearchSnapshot.load(os.path.join(directory, "index"), SERVER_ENGINES["cosinus"])
+        with SearchServer(snapshot, port=0, workers=4) as server:
+            address = urlsplit(server.url)
+            connection = http.client.HTTPConnection(address.hostname, address.port, timeout=10)
 
-    # ====================
-    # Test de l'extraction Arxiv
-    # ====================
-    def test_arxiv_papers_extract(self):
-        print("[Test] Extraction des articles Arxiv...")
-        arxiv_papers = arxiv_papers_extract()
-        self.assertGreater(len(arxiv_papers), 0)
-        self.assertIsInstance(arxiv_papers[0], ArxivPaper)
-        print("✔️ Extraction des articles Arxiv réussie.")
+            def get(path):
+                connection.request("GET", path)
+                response = connection.getresponse()
+                return response.status, json.loads(response.read())
+
+            status, page = get("/search?q=python&k=5")
+            self.assertEqual(status, 200)
+            self.assertEqual(page["total"], 2)
+            self.assertEqual({result["title"] for result in page["results"]}, {"Python tips", "Python for science"})
+            _, page = get("/search?q=python&type=Arxiv%20Paper")
+            self.assertEqual([result["creator"] for result in page["results"]], [["carol", "dave"]])
+            _, page = get("/search?q=python&creator=alice&creator=dave")
+            self.assertEqual(page["total"], 2)
+            _, page = get("/search?q=python&min_comments=10&since=2024-01-01")
+            self.assertEqual([result["id"] for result in page["results"]], [0])
+
+            status, record = get("/document/2")
+            self.assertEqual((status, record["class"], record["creator"]), (200, "ArxivPaper", ["carol", "dave"]))
+            status, stats = get("/stats")
+            self.assertEqual((status, stats["documents"], stats["engine"]), (200, 3, "SearchEngine"))
+            self.assertEqual(get("/document/9")[0], 404)
+            self.assertEqual(get("/inconnu")[0], 404)
+            self.assertEqual(get("/search")[0], 400)
+            self.assertEqual(get("/search?q=python&k=1000")[0], 400)
+            self.assertEqual(get("/search?q=python&since=hier")[0], 400)
+            # Toutes ces requêtes ont utilisé la même connexion persistante
+            self.assertEqual(get("/stats")[1]["server"]["connections"], 1)
+            connection.close()
+
+            # Clients simultanés : chacun garde sa connexion
+            report = run_load(server.url, ["python", "rust borrow", "arrays"], clients=4, requests_per_client=25)
+            self.assertEqual((report["requests"], report["errors"], report["connections"]), (100, 0, 4))
+            self.assertGreaterEqual(report["p99_ms"], report["p50_ms"])
+            self.assertGreater(report["qps"], 0)
+
+        # Plus de connexions persistantes inactives que de threads : aucune n'en bloque une autre
+        with SearchServer(snapshot, port=0, workers=1) as server:
+            address = urlsplit(server.url)
+            connections = [http.client.HTTPConnection(address.hostname, address.port, timeout=2) for _ in range(4)]
+            for _ in range(2):
+                for connection in connections:
+                    connection.request("GET", "/search?q=rust")
+                    self.assertEqual(json.loads(connection.getresponse().read())["total"], 1)
+            self.assertEqual(server.counters()["connections"], 4)
+            for connection in connections:
+                connection.close()
+        print("✔️ Serveur de recherche interrogé en parallèle.")
 
     # ====================
-    # Test du moteur de recherche
+    # Test du chargement différé des dépendances
     # ====================
-    def test_search_engine(self):
-        print("[Test] Initialisation du moteur de recherche...")
-        docs = [
-            BaseDocument("Python Tutorial", "John Doe", "2025-01-01", "Learn Python basics"),
-            BaseDocument("Advanced Python", "Jane Smith", "2025-02-01", "Master advanced Python techniques"),
-            BaseDocument("Data Science", "Alice Brown", "2025-03-01", "Learn data science with Python")
-        ]
-        search_engine = SearchEngine(docs)
-        results = search_engine.search("Python")
-        self.assertGreater(len(results), 0)
-        print("✔️ Moteur de recherche fonctionne correctement.")
+    def test_lazy_imports(self):
+        print("[Test] Import du module sans dépendances lourdes...")
+        script = "import sys, v2_search_engine; print(sorted(m for m in ('numpy', 'pandas', 'praw', 'scipy', 'sklearn') if m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "[]")
+
+        startup = benchmark_startup(n_documents=200)
+        self.assertEqual(set(startup), {"cold", "warm"})
+        self.assertGreater(startup["warm"]["seconds"], startup["warm"]["import_seconds"])
+        self.assertTrue(startup["warm"]["heaviest"])
+        print("✔️ Dépendances lourdes chargées à la demande.")
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,171 +1,148 @@
-import pandas as pd
-import json
-import urllib.request
-import xmltodict
-import praw
-from datetime import datetime
-import time
-import csv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-# ======================
-# Classe BaseDocument
-# ======================
-class BaseDocument:
-    def __init__(self, title, creator, timestamp, content=""):
-        self.title = title
-        self.creator = creator
-        self.timestamp = timestamp
-        self.content = content
-        self.doc_type = self.identify_type()
-
-    def identify_type(self):
-        return "Generic Document"
-
-    def __str__(self):
-        return f"{self.title} created by {self.creator} on {self.timestamp} ({self.doc_type})"
-
-# ======================
-# Classe RedditPost
-# ======================
-class RedditPost(BaseDocument):
-    def __init__(self, title, creator, timestamp, comments, content=""):
-        super().__init__(title, creator, timestamp, content)
-        self.comments = comments
-
-    def identify_type(self):
-        return "Reddit Post"
-
-    def __str__(self):
-        return super().__str__() + f" | Comments: {self.comments}"
-
-# ======================
-# Classe ArxivPaper
-# ======================
-class ArxivPaper(BaseDocument):
-    def __init__(self, title, creators, timestamp, content=""):
-        super().__init__(title, creators, timestamp, content)
-        self.creators = creators
-
-    def identify_type(self):
-        return "Arxiv Paper"
-
-    def __str__(self):
-        authors_list = ", ".join(self.creators)
-        return super().__str__() + f" | Authors: {authors_list}"
-
-# ======================
-# Classe DocumentManager
-# ======================
-class DocumentManager:
-    def __init__(self):
-        self.doc_list = []
-
-    def add(self, doc):
-        self.doc_list.append(doc)
-
-    def show_all(self):
-        for doc in self.doc_list:
-            print(doc)
-
-# ======================
-# Fonction pour extraire les posts Reddit
-# ======================
-def reddit_posts_extract():
-    reddit = praw.Reddit(client_id='y_jUSZ3PH27WkoD6IY52UQ', client_secret='W1KV3UJjFlxRrDla-ZFIvfc_wGkrmw', user_agent='Redit WebScraping', redirect_uri='http://localhost:8080')
-    subreddit_posts = reddit.subreddit('Python').top(limit=10)
-    extracted_posts = []
-
-    for post in subreddit_posts:
-        post_data = f"{post.title} - {post.selftext}"
-        extracted_post = RedditPost(
-            title=post.title,
-            creator=str(post.author) if post.author else "Unknown",
-            timestamp=str(datetime.fromtimestamp(post.created_utc)),
-            comments=post.num_comments,
-            content=post_data
-        )
-        extracted_posts.append(extracted_post)
-    return extracted_posts
-
-# ======================
-# Fonction pour extraire les articles Arxiv
-# ======================
-def arxiv_papers_extract():
-    keyword = "Data%20Science"
-    url = f'http://export.arxiv.org/api/query?search_query=all:{keyword}&start=0&max_results=10'
-    time.sleep(1)
-
-    with urllib.request.urlopen(url) as response:
-        arxiv_data = response.read()
-
-    parsed_arxiv_data = xmltodict.parse(arxiv_data)
-    extracted_papers = []
-
-    for entry in parsed_arxiv_data['feed']['entry']:
-        authors = [entry['author'][0]['name']] if isinstance(entry['author'], list) else [entry['author']['name']]
-        extracted_paper = ArxivPaper(
-            title=entry['title'],
-            creators=authors,
-            timestamp=entry['published'],
-            content=entry['summary'].replace("\n", " ")
-        )
-        extracted_papers.append(extracted_paper)
-    return extracted_papers
-
-# ======================
-# Classe SearchEngine
-# ======================
-class SearchEngine:
-    def __init__(self, documents):
-        self.documents = documents
-        self.vectorizer = TfidfVectorizer()
-        self.doc_matrix = self.vectorizer.fit_transform([doc.content for doc in self.documents])
-
-    def search(self, query):
-        query_vec = self.vectorizer.transform([query])
-        similarity_scores = cosine_similarity(query_vec, self.doc_matrix).flatten()
-        results = [(self.documents[i], similarity_scores[i]) for i in range(len(self.documents)) if similarity_scores[i] > 0]
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
+import argparse
+import os
+import sys
+import tempfile
+
+# Paquet search_core (cœur commun), à la racine du projet
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from search_core.metrics import METRICS, run_startup
+from search_core.documents import DOC_TYPE_NAMES, synthetic_documents
+from search_core.corpus import DocumentManager, CORPUS_PATH, write_corpus, read_corpus, load_corpus, SearchFilter
+from search_core.sources import ingest_sources, format_ingestion_report
+from search_core.engines import (INDEX_PATH, SearchEngine, InvertedIndexEngine, BM25FEngine, ShardedSearchEngine,
+                                 STREAM_CHUNK_SIZE, build_streaming_index)
+from search_core.semantic import SEMANTIC_DIRECTORY, SEMANTIC_PROBES, semantic_index_for
+
+# ======================
+# Mesure du temps de démarrage
+# ======================
+def benchmark_startup(n_documents=1000, query="contenu"):
+    # Temps jusqu'à la première réponse de la CLI, dans un processus neuf, à
+    # partir d'un corpus enregistré : au premier lancement l'index est construit
+    # (« cold »), au second il est rechargé depuis le disque (« warm »)
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(synthetic_documents(n_documents), os.path.join(directory, CORPUS_PATH))
+        command = [os.path.abspath(__file__)]
+        return {"cold": run_startup(command, directory, query + "\n"),
+                "warm": run_startup(command, directory, query + "\n")}
 
 # ======================
 # Exemple d'utilisation
 # ======================
-if __name__ == "__main__":
-    doc_manager = DocumentManager()
+ENGINES = {"cosinus": SearchEngine, "inverse": InvertedIndexEngine, "reparti": ShardedSearchEngine, "bm25": BM25FEngine}
 
-    # Extraction des données Reddit et Arxiv
-    reddit_data = reddit_posts_extract()
-    arxiv_data = arxiv_papers_extract()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Moteur de recherche Reddit/Arxiv")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="cosinus",
+                        help="cosinus : similarité sur toute la matrice ; inverse : index inversé avec arrêt anticipé ; "
+                             "reparti : partitions d'une requête calculées en parallèle par plusieurs processus ; "
+                             "bm25 : classement BM25F sur le titre et le contenu")
+    parser.add_argument("--shards", type=int, help="nombre de processus du moteur réparti (par défaut : un par cœur)")
+    parser.add_argument("--corpus", default=CORPUS_PATH,
+                        help="corpus enregistré (.csv ou .pkl), rechargé au démarrage s'il existe")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore le corpus enregistré et interroge de nouveau Reddit et Arxiv")
+    parser.add_argument("--streaming", action="store_true",
+                        help="construit l'index en flux depuis le corpus enregistré (termes hachés, mémoire bornée)")
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE,
+                        help="documents par paquet de la construction en flux (mémoire de travail)")
+    parser.add_argument("--mode", choices=["lexical", "semantique", "hybride"], default="lexical",
+                        help="lexical : termes de la requête ; semantique : proximité des vecteurs LSA ; "
+                             "hybride : combinaison des deux (moteurs TF-IDF à vocabulaire)")
+    parser.add_argument("--probes", type=int, default=SEMANTIC_PROBES,
+                        help="listes parcourues par la recherche sémantique (plus : meilleur rappel, plus lent)")
+    parser.add_argument("--type", choices=DOC_TYPE_NAMES, help="ne garder que ce type de document")
+    parser.add_argument("--creator", action="append", help="ne garder que les documents de cet auteur (répétable)")
+    parser.add_argument("--since", help="date minimale (AAAA-MM-JJ)")
+    parser.add_argument("--until", help="date maximale incluse (AAAA-MM-JJ)")
+    parser.add_argument("--min-comments", type=int, help="nombre minimal de commentaires")
+    parser.add_argument("--metrics", help="active l'instrumentation et écrit les mesures dans ce fichier "
+                                          "(.json, sinon format texte Prometheus)")
+    parser.add_argument("--profile", action="store_true", help="profile la recherche avec cProfile")
+    args = parser.parse_args()
+    if args.shards is not None and args.shards < 1:
+        parser.error("--shards doit être au moins 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size doit être au moins 1")
+    if args.probes < 1:
+        parser.error("--probes doit être au moins 1")
+    if args.streaming and ENGINES[args.engine].SCORING != SearchEngine.SCORING:
+        parser.error(f"--streaming construit un index TF-IDF, inutilisable par le moteur {args.engine}")
+    if args.mode != "lexical" and (args.streaming or ENGINES[args.engine].SCORING != SearchEngine.SCORING):
+        parser.error("--mode semantique ou hybride requiert un moteur TF-IDF sans --streaming")
+    if args.metrics or args.profile:
+        METRICS.enable(profile=args.profile)
+    try:
+        search_filter = SearchFilter(doc_type=args.type, since=args.since, until=args.until, creator=args.creator,
+                                     min_comments=args.min_comments)
+    except ValueError as error:
+        parser.error(str(error))
+    engine_class = ENGINES[args.engine]
+
+    if os.path.exists(args.corpus) and not args.refresh:
+        doc_manager, corpus_report = load_corpus(args.corpus)
+        print(f"Corpus chargé depuis '{args.corpus}' : {corpus_report['documents']} documents en "
+              f"{corpus_report['seconds']:.2f} s ({corpus_report['docs_per_second']:.0f} documents/s)")
+    else:
+        doc_manager = DocumentManager()
 
-    # Ajout des documents au gestionnaire
-    for document in reddit_data + arxiv_data:
-        doc_manager.add(document)
+        # Extraction concurrente des données Reddit et Arxiv, ajoutées au gestionnaire au fil de l'eau
+        reports = ingest_sources(doc_manager)
+        for name, report in reports.items():
+            print(format_ingestion_report(name, report))
+        write_corpus(doc_manager.doc_list, args.corpus)
 
     # Affichage de tous les documents
     doc_manager.show_all()
 
     # Sauvegarde des documents dans un fichier CSV
-    with open("documents_output.csv", "w", newline="") as csvfile:
-        csv_writer = csv.writer(csvfile)
-        csv_writer.writerow(["Title", "Creator", "Date", "Type", "Content"])
-        for doc in doc_manager.doc_list:
-            csv_writer.writerow([doc.title, doc.creator, doc.timestamp, doc.doc_type, doc.content])
+    write_corpus(doc_manager.doc_list, "documents_output.csv")
 
     print("\nLes documents ont été enregistrés dans 'documents_output.csv'")
 
     # Initialisation du moteur de recherche
     print("\n--- Initialisation du moteur de recherche ---")
-    search_engine = SearchEngine(doc_manager.doc_list)
+    try:
+        search_engine = engine_class.load(INDEX_PATH, doc_manager.doc_list)
+        print("Index chargé depuis le disque.")
+    except (FileNotFoundError, ValueError):
+        if args.streaming:
+            # Relecture du corpus enregistré par paquets : la mémoire de construction ne dépend pas de sa taille
+            report = build_streaming_index(read_corpus(args.corpus), INDEX_PATH, chunk_size=args.chunk_size)
+            print(f"Index construit en flux : {report['documents']} documents en {report['seconds']:.2f} s "
+                  f"({report['docs_per_second']:.0f} documents/s)")
+            search_engine = engine_class.load(INDEX_PATH, doc_manager.doc_list)
+        else:
+            search_engine = engine_class(doc_manager.doc_list)
+            search_engine.save(INDEX_PATH)
+    if isinstance(search_engine, ShardedSearchEngine) and args.shards:
+        search_engine.n_shards = args.shards
+    if args.mode != "lexical":
+        try:
+            semantic_index = semantic_index_for(search_engine, os.path.join(INDEX_PATH, SEMANTIC_DIRECTORY), args.probes)
+        except ValueError as error:
+            # Par exemple un index haché enregistré par une construction en flux
+            print(f"Recherche sémantique indisponible ({error}) : classement lexical.")
+            args.mode = "lexical"
 
     query = input("Entrez votre requête : ")
-    results = search_engine.search(query)
+    if args.mode == "semantique":
+        results = semantic_index.search(query, filters=search_filter)
+    elif args.mode == "hybride":
+        results = semantic_index.search_hybrid(query, filters=search_filter)
+    else:
+        results = search_engine.search(query, filters=search_filter)
 
     if results:
-        print("\n--- Résultats trouvés ---")
+        print(f"\n--- Résultats trouvés ({len(results)} sur {results.total}) ---")
         for doc, score in results:
             print(f"{doc} | Score: {score:.4f}")
     else:
-        print("\nAucun résultat trouvé.")
\ No newline at end of file
+        print("\nAucun résultat trouvé.")
+
+    if args.profile:
+        print("\n--- Profil de la recherche ---")
+        print(METRICS.profile_report("search_seconds"))
+    if args.metrics:
+        METRICS.write(args.metrics)
+        print(f"Mesures enregistrées dans '{args.metrics}'")
\ No newline at end of file
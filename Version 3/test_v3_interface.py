@@ -1,68 +1,281 @@
 import unittest
-from v3_interface import BaseDocument, RedditPost, ArxivPaper, DocumentManager, SearchEngine
+import threading
+import time
+import sys
+import subprocess
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from v3_interface import ENGINES, RESULTS_PAGE_SIZE, ALL_TYPES, RANKING_MODES, BackgroundTask, SearchApp
+from search_core.documents import FRENCH, UNKNOWN_AUTHOR, BaseDocument, RedditPost, ArxivPaper
+from search_core.corpus import DocumentManager
+
+# ====================
+# Fenêtre de recherche sans affichage
+# ====================
+# Les tests n'ont pas toujours d'écran : les widgets sont remplacés par des objets
+# qui enregistrent ce que l'interface leur demande, et root.after met les rappels
+# en file au lieu de les confier à la boucle Tk (voir run_tk_loop).
+class FakeRoot:
+    def __init__(self):
+        self.pending = []
+
+    def after(self, delay, callback, *args):
+        self.pending.append((callback, args))
+        return len(self.pending)
+
+    def after_cancel(self, after_id):
+        pass
+
+class FakeVariable:
+    # StringVar, Combobox ou Entry : seule la valeur compte
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+class FakeText:
+    def __init__(self):
+        self.content = ""
+        self.threads = []
+
+    def insert(self, index, text):
+        self.content += text
+        self.threads.append(threading.current_thread())
+
+    def see(self, index):
+        pass
+
+class FakeButton:
+    def __init__(self):
+        self.state = "disabled"
+
+    def configure(self, state):
+        self.state = state
+
+class FakeProgressBar:
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+class FakeTreeview:
+    def __init__(self):
+        self.rows = {}
+
+    def get_children(self):
+        return list(self.rows)
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.rows[iid]
+
+    def insert(self, parent, index, iid, values):
+        self.rows[iid] = values
+
+def make_search_app(directory, documents=()):
+    # Même état que SearchApp.__init__, sans fenêtre ni chargement de l'index enregistré
+    app = SearchApp.__new__(SearchApp)
+    app.root = FakeRoot()
+    app.locale = FRENCH
+    app.document_manager = DocumentManager()
+    for doc in documents:
+        app.document_manager.add(doc)
+    app.search_engine = None
+    app.semantic_index = None
+    app.index_path = os.path.join(directory, "index")
+    app.corpus_path = os.path.join(directory, "corpus.pkl")
+    app.executor = ThreadPoolExecutor(max_workers=4)
+    app.state_lock = threading.Lock()
+    app.tasks = []
+    app.polling = False
+    app.results_query = None
+    app.results_incremental = False
+    app.results_filters = None
+    app.results_page = None
+    app.result_documents = {}
+    app.typing_after = None
+    app.typed_text = ""
+    app.results_tree = FakeTreeview()
+    app.previous_button, app.next_button = FakeButton(), FakeButton()
+    app.page_label, app.status = FakeVariable(), FakeVariable()
+    app.engine_choice = FakeVariable(next(iter(ENGINES)))
+    app.ranking_choice = FakeVariable(RANKING_MODES[0])
+    app.type_choice = FakeVariable(ALL_TYPES)
+    app.query_entry, app.creator_entry, app.comments_entry = FakeVariable(), FakeVariable(), FakeVariable()
+    app.since_entry, app.until_entry = FakeVariable(), FakeVariable()
+    app.text_area = FakeText()
+    app.progress_bar = FakeProgressBar()
+    return app
+
+def run_tk_loop(app, timeout=60):
+    # Exécute les rappels en file, sur ce thread, jusqu'à la fin des traitements
+    deadline = time.perf_counter() + timeout
+    while app.root.pending and time.perf_counter() < deadline:
+        pending, app.root.pending = app.root.pending, []
+        for callback, args in pending:
+            time.sleep(0.005)
+            callback(*args)
+
 
 class TestDocumentClasses(unittest.TestCase):
     # ====================
-    # Test de la classe BaseDocument
+    # Test des libellés en français
     # ====================
-    def test_base_document_creation(self):
-        print("[Test] Création d'un BaseDocument...")
+    def test_french_labels(self):
+        print("[Test] Libellés des documents en français...")
         base_doc = BaseDocument("Titre générique", "Auteur Test", "2025-01-01", "Contenu générique")
-        self.assertEqual(base_doc.title, "Titre générique")
-        self.assertEqual(base_doc.creator, "Auteur Test")
-        self.assertEqual(base_doc.timestamp, "2025-01-01")
-        self.assertEqual(base_doc.doc_type, "Document générique")
-        print("✔️ BaseDocument créé avec succès.")
-
-    # ====================
-    # Test de la classe RedditPost
-    # ====================
-    def test_reddit_post_creation(self):
-        print("[Test] Création d'un RedditPost...")
         reddit_post = RedditPost("Titre Reddit", "Utilisateur Reddit", "2025-01-01", 100, "Contenu Reddit")
-        self.assertEqual(reddit_post.title, "Titre Reddit")
-        self.assertEqual(reddit_post.creator, "Utilisateur Reddit")
-        self.assertEqual(reddit_post.comments, 100)
-        self.assertEqual(reddit_post.doc_type, "Post Reddit")
-        print("✔️ RedditPost créé avec succès.")
+        arxiv_paper = ArxivPaper("Titre Arxiv", ["Auteur1", "Auteur2"], "2025-01-01", "Résumé Arxiv")
+        self.assertEqual([FRENCH.type_name(doc) for doc in (base_doc, reddit_post, arxiv_paper)],
+                         ["Document générique", "Post Reddit", "Article Arxiv"])
+        self.assertEqual(FRENCH.describe(base_doc), "Titre générique créé par Auteur Test le 2025-01-01 (Document générique)")
+        self.assertTrue(FRENCH.describe(reddit_post).endswith(" | Commentaires : 100"))
+        self.assertTrue(FRENCH.describe(arxiv_paper).endswith(" | Auteurs : Auteur1, Auteur2"))
+        self.assertIn("créé par Inconnu", FRENCH.describe(RedditPost("Titre", UNKNOWN_AUTHOR, "2025-01-01", 0)))
+        # Charger l'interface ne change pas les libellés des documents pour les autres versions
+        self.assertEqual(base_doc.doc_type, "Generic Document")
+        self.assertEqual(str(reddit_post), "Titre Reddit created by Utilisateur Reddit on 2025-01-01 (Reddit Post) | Comments: 100")
+        print("✔️ Libellés de la Version 3 en français.")
 
     # ====================
-    # Test de la classe ArxivPaper
+    # Test du chargement différé des dépendances
     # ====================
-    def test_arxiv_paper_creation(self):
-        print("[Test] Création d'un ArxivPaper...")
-        arxiv_paper = ArxivPaper("Titre Arxiv", ["Auteur1", "Auteur2"], "2025-01-01", "Résumé Arxiv")
-        self.assertEqual(arxiv_paper.title, "Titre Arxiv")
-        self.assertEqual(arxiv_paper.creators, ["Auteur1", "Auteur2"])
-        self.assertEqual(arxiv_paper.doc_type, "Article Arxiv")
-        print("✔️ ArxivPaper créé avec succès.")
+    def test_lazy_imports(self):
+        print("[Test] Import du module sans dépendances lourdes...")
+        script = "import sys, v3_interface; print(sorted(m for m in ('numpy', 'pandas', 'praw', 'scipy', 'sklearn') if m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "[]")
+        print("✔️ Dépendances lourdes chargées à la demande.")
 
     # ====================
-    # Test de la classe DocumentManager
+    # Test des traitements en arrière-plan de l'interface
     # ====================
-    def test_document_manager(self):
-        print("[Test] Gestion des documents avec DocumentManager...")
-        manager = DocumentManager()
-        doc1 = RedditPost("Titre1", "Auteur1", "2025-01-01", 10)
-        doc2 = ArxivPaper("Titre2", ["Auteur2"], "2025-01-02")
-        manager.add(doc1)
-        manager.add(doc2)
-        self.assertEqual(len(manager.doc_list), 2)
-        print("✔️ DocumentManager fonctionne correctement.")
+    def test_background_tasks(self):
+        print("[Test] Traitements en arrière-plan et scrutation par la boucle Tk...")
+        documents = [RedditPost(f"Post {i}", "Auteur", "2025-01-01 10:00:00", i, f"python sujet{i} terme{i * 7} mot{i * 13}")
+                     for i in range(20)] + [RedditPost("Rust", "Auteur", "2025-01-02 10:00:00", 3, "rust ownership borrow")]
+        with tempfile.TemporaryDirectory() as directory:
+            app = make_search_app(directory, documents)
+            try:
+                # Résultat d'une recherche annulée après coup : ignoré par l'interface
+                app.fetch_results("python", 0)
+                task = app.tasks[0]
+                self.assertIsInstance(task, BackgroundTask)
+                self.assertIsNotNone(task.future.result(timeout=60))
+                app.cancel_tasks()
+                self.assertTrue(task.cancelled())
+                self.assertIn("annulation…", app.status.get())
+                run_tk_loop(app)
+                self.assertIsNone(app.results_page)
+                self.assertEqual(app.results_tree.get_children(), [])
+                self.assertEqual(app.tasks, [])
+                self.assertFalse(app.polling)
+                self.assertEqual(app.status.get(), "Prêt.")
+
+                # Recherche en file remplacée par une plus récente : seule la dernière est affichée
+                with app.state_lock:
+                    app.fetch_results("python", 0)
+                    app.fetch_results("rust", 0)
+                    first, second = app.tasks
+                    self.assertTrue(first.cancelled())
+                    self.assertFalse(second.cancelled())
+                run_tk_loop(app)
+                self.assertIsNone(first.future.result())
+                self.assertEqual(app.results_query, "rust")
+                self.assertEqual([values[0] for values in app.results_tree.rows.values()], ["Rust"])
+
+                # Erreur du traitement : signalée par la boucle Tk, sans appeler on_done
+                done = []
+
+                def fail(task):
+                    raise ValueError("index illisible")
+                app.start_task("Indexation", fail, lambda task, result: done.append(result))
+                run_tk_loop(app)
+                self.assertEqual(done, [])
+                self.assertIn("Indexation : échec (index illisible)", app.text_area.content)
+                self.assertEqual(app.text_area.threads, [threading.current_thread()])
+                self.assertFalse(app.polling)
+            finally:
+                app.executor.shutdown(wait=True)
+        print("✔️ Résultats annulés ignorés, erreurs signalées sur le thread Tk.")
 
     # ====================
-    # Test du moteur de recherche
+    # Test de la pagination des résultats
     # ====================
-    def test_search_engine(self):
-        print("[Test] Fonctionnement du moteur de recherche...")
-        doc1 = BaseDocument("Python Basics", "Auteur1", "2025-01-01", "Apprendre Python")
-        doc2 = BaseDocument("Machine Learning", "Auteur2", "2025-01-02", "Apprentissage automatique")
-        search_engine = SearchEngine([doc1, doc2])
-
-        results = search_engine.search("Python")
-        self.assertGreater(len(results), 0)
-        self.assertIn(doc1, [doc for doc, _ in results])
-        print("✔️ Moteur de recherche fonctionne correctement.")
+    def test_results_paging(self):
+        print("[Test] Pagination des résultats dans la vue...")
+        n_python = 2 * RESULTS_PAGE_SIZE + 20
+        documents = [RedditPost(f"Post {i}", "Auteur", "2025-01-01 10:00:00", i, f"python sujet{i} terme{i * 7} mot{i * 13}")
+                     for i in range(n_python)]
+        documents += [RedditPost(f"Rust {i}", "Auteur", "2025-01-02 10:00:00", i, f"rust emprunt{i} cycle{i * 5}") for i in range(7)]
+        with tempfile.TemporaryDirectory() as directory:
+            app = make_search_app(directory, documents)
+            self.assertEqual(len(app.document_manager.doc_list), n_python + 7)
+            try:
+                def search(query):
+                    app.query_entry.set(query)
+                    app.run_search()
+                    run_tk_loop(app)
+
+                def page_rows():
+                    return sorted(int(iid) for iid in app.results_tree.get_children())
+
+                # Première page : pas de page précédente
+                search("python")
+                self.assertEqual(app.results_page.offset, 0)
+                self.assertEqual(app.results_page.total, n_python)
+                self.assertEqual(page_rows(), list(range(RESULTS_PAGE_SIZE)))
+                self.assertEqual({values[1] for values in app.results_tree.rows.values()}, {"Post Reddit"})
+                self.assertEqual(app.page_label.get(), f"Résultats 1–{RESULTS_PAGE_SIZE} sur {n_python}")
+                self.assertEqual((app.previous_button.state, app.next_button.state), ("disabled", "normal"))
+                app.show_previous_page()
+                self.assertEqual(app.tasks, [])
+
+                # Pages suivantes jusqu'à la dernière, incomplète
+                app.show_next_page()
+                run_tk_loop(app)
+                self.assertEqual(app.results_page.offset, RESULTS_PAGE_SIZE)
+                self.assertEqual((app.previous_button.state, app.next_button.state), ("normal", "normal"))
+                app.show_next_page()
+                run_tk_loop(app)
+                self.assertEqual(app.results_page.offset, 2 * RESULTS_PAGE_SIZE)
+                self.assertEqual(page_rows(), list(range(2 * RESULTS_PAGE_SIZE, n_python)))
+                self.assertEqual(app.page_label.get(), f"Résultats {2 * RESULTS_PAGE_SIZE + 1}–{n_python} sur {n_python}")
+                self.assertEqual((app.previous_button.state, app.next_button.state), ("normal", "disabled"))
+                app.show_next_page()
+                self.assertEqual(app.tasks, [])
+
+                # Retour en arrière
+                app.show_previous_page()
+                run_tk_loop(app)
+                self.assertEqual(app.results_page.offset, RESULTS_PAGE_SIZE)
+                self.assertEqual(page_rows(), list(range(RESULTS_PAGE_SIZE, 2 * RESULTS_PAGE_SIZE)))
+
+                # Nouvelle requête : retour à la première page, moins de résultats qu'une page
+                search("rust")
+                self.assertEqual(app.results_page.offset, 0)
+                self.assertEqual(app.results_page.total, 7)
+                self.assertEqual(page_rows(), list(range(7)))
+                self.assertEqual(app.page_label.get(), "Résultats 1–7 sur 7")
+                self.assertEqual((app.previous_button.state, app.next_button.state), ("disabled", "disabled"))
+                self.assertEqual(sorted(doc.title for doc in app.result_documents.values()), [f"Rust {i}" for i in range(7)])
+
+                # Aucune correspondance
+                search("inconnu")
+                self.assertEqual(app.results_page.total, 0)
+                self.assertEqual(app.results_tree.get_children(), [])
+                self.assertEqual(app.page_label.get(), "Aucun résultat trouvé.")
+                self.assertEqual((app.previous_button.state, app.next_button.state), ("disabled", "disabled"))
+            finally:
+                app.executor.shutdown(wait=True)
+        print("✔️ Pages parcourues dans les deux sens, décalage remis à zéro.")
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
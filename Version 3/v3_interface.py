@@ -1,149 +1,98 @@
-import pandas as pd
-import json
-import urllib.request
-import xmltodict
-import praw
-from datetime import datetime
+import os
+import sys
+import tempfile
+import threading
 import time
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
-from tkinter import ttk, messagebox
-
-# ======================
-# Classe BaseDocument
-# ======================
-class BaseDocument:
-    def __init__(self, title, creator, timestamp, content=""):
-        self.title = title
-        self.creator = creator
-        self.timestamp = timestamp
-        self.content = content
-        self.doc_type = self.identify_type()
-
-    def identify_type(self):
-        return "Document générique"
-
-    def __str__(self):
-        return f"{self.title} créé par {self.creator} le {self.timestamp} ({self.doc_type})"
-
-# ======================
-# Classe RedditPost
-# ======================
-class RedditPost(BaseDocument):
-    def __init__(self, title, creator, timestamp, comments, content=""):
-        super().__init__(title, creator, timestamp, content)
-        self.comments = comments
-
-    def identify_type(self):
-        return "Post Reddit"
-
-    def __str__(self):
-        return super().__str__() + f" | Commentaires : {self.comments}"
-
-# ======================
-# Classe ArxivPaper
-# ======================
-class ArxivPaper(BaseDocument):
-    def __init__(self, title, creators, timestamp, content=""):
-        super().__init__(title, creators, timestamp, content)
-        self.creators = creators
-
-    def identify_type(self):
-        return "Article Arxiv"
-
-    def __str__(self):
-        authors_list = ", ".join(self.creators)
-        return super().__str__() + f" | Auteurs : {authors_list}"
-
-# ======================
-# Classe DocumentManager
-# ======================
-class DocumentManager:
-    def __init__(self):
-        self.doc_list = []
-
-    def add(self, doc):
-        self.doc_list.append(doc)
-
-    def show_all(self):
-        for doc in self.doc_list:
-            print(doc)
-
-# ======================
-# Classe SearchEngine
-# ======================
-class SearchEngine:
-    def __init__(self, documents):
-        self.documents = documents
-        self.vectorizer = TfidfVectorizer()
-        self.doc_matrix = self.vectorizer.fit_transform([doc.content for doc in self.documents])
-
-    def search(self, query):
-        query_vec = self.vectorizer.transform([query])
-        similarity_scores = cosine_similarity(query_vec, self.doc_matrix).flatten()
-        results = [(self.documents[i], similarity_scores[i]) for i in range(len(self.documents)) if similarity_scores[i] > 0]
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
-
-# ======================
-# Fonction pour extraire les posts Reddit
-# ======================
-def reddit_posts_extract():
-    reddit = praw.Reddit(client_id='y_jUSZ3PH27WkoD6IY52UQ', client_secret='W1KV3UJjFlxRrDla-ZFIvfc_wGkrmw', user_agent='Redit WebScraping', redirect_uri='http://localhost:8080')
-    subreddit_posts = reddit.subreddit('Python').top(limit=10)
-    extracted_posts = []
-
-    for post in subreddit_posts:
-        post_data = f"{post.title} - {post.selftext}"
-        extracted_post = RedditPost(
-            title=post.title,
-            creator=str(post.author) if post.author else "Inconnu",
-            timestamp=str(datetime.fromtimestamp(post.created_utc)),
-            comments=post.num_comments,
-            content=post_data
-        )
-        extracted_posts.append(extracted_post)
-    return extracted_posts
-
-# ======================
-# Fonction pour extraire les articles Arxiv
-# ======================
-def arxiv_papers_extract():
-    keyword = "Data%20Science"
-    url = f'http://export.arxiv.org/api/query?search_query=all:{keyword}&start=0&max_results=10'
-    time.sleep(1)
-
-    with urllib.request.urlopen(url) as response:
-        arxiv_data = response.read()
-
-    parsed_arxiv_data = xmltodict.parse(arxiv_data)
-    extracted_papers = []
-
-    for entry in parsed_arxiv_data['feed']['entry']:
-        authors = [entry['author'][0]['name']] if isinstance(entry['author'], list) else [entry['author']['name']]
-        extracted_paper = ArxivPaper(
-            title=entry['title'],
-            creators=authors,
-            timestamp=entry['published'],
-            content=entry['summary'].replace("\n", " ")
-        )
-        extracted_papers.append(extracted_paper)
-    return extracted_papers
+from tkinter import ttk
+
+# Paquet search_core (cœur commun), à la racine du projet
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from search_core.metrics import format_metrics_summary, METRICS, run_startup
+from search_core.documents import FRENCH, DOC_TYPE_NAMES, synthetic_documents
+from search_core.corpus import DocumentManager, CORPUS_PATH, write_corpus, load_corpus, SearchFilter
+from search_core.sources import SOURCE_STREAMS, format_ingestion_report
+from search_core.engines import (INDEX_PATH, index_scoring, SearchEngine, InvertedIndexEngine, BM25FEngine,
+                                 ShardedSearchEngine)
+from search_core.semantic import SEMANTIC_DIRECTORY, semantic_index_for
 
 # ======================
 # Interface Graphique (Tkinter)
 # ======================
+ENGINES = {"TF-IDF (cosinus)": SearchEngine, "Index inversé": InvertedIndexEngine, "TF-IDF réparti": ShardedSearchEngine,
+           "BM25F (titre + contenu)": BM25FEngine}
+
+# Intervalle de scrutation des traitements en arrière-plan (environ une image à 60 Hz)
+POLL_INTERVAL_MS = 16
+# Résultats demandés au moteur (et affichés) par page
+RESULTS_PAGE_SIZE = 50
+# Délai sans frappe avant de lancer la recherche pendant la saisie
+TYPING_DEBOUNCE_MS = 150
+RESULT_COLUMNS = {"title": ("Titre", 420), "type": ("Type", 130), "date": ("Date", 150), "score": ("Score", 70)}
+# Entrée du choix de type sans critère
+ALL_TYPES = "Tous les types"
+# Classements proposés : termes de la requête, proximité des vecteurs LSA, ou combinaison des deux
+RANKING_MODES = ["Lexical", "Sémantique", "Hybride"]
+# Rafraîchissement de la fenêtre de diagnostic et fichiers d'export des mesures
+DIAGNOSTICS_REFRESH_MS = 1000
+METRICS_JSON_PATH = "metrics.json"
+METRICS_PROMETHEUS_PATH = "metrics.prom"
+
+def format_facet(counts):
+    return ", ".join(f"{name} ({count})" for name, count in counts) or "—"
+
+class BackgroundTask:
+    # Traitement exécuté dans le pool de l'application ; l'interface n'en lit
+    # l'avancement et le résultat que depuis la boucle Tk (root.after)
+    def __init__(self, label, work, on_done):
+        self.label = label
+        self.work = work
+        self.on_done = on_done
+        self.cancel_event = threading.Event()
+        self.progress = 0
+        self.future = None
+        self.started = time.perf_counter()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
 class SearchApp:
-    def __init__(self, root):
+    def __init__(self, root, index_path=INDEX_PATH, corpus_path=CORPUS_PATH, max_workers=4, locale=FRENCH):
         self.root = root
+        # Libellés des documents affichés (types, descriptions)
+        self.locale = locale
         self.root.title("Moteur de Recherche")
-        self.root.geometry("800x600")
+        self.root.geometry("900x700")
         self.root.minsize(800, 600)
         self.root.configure(bg="#e0f7fa")
 
         self.document_manager = DocumentManager()
         self.search_engine = None
+        # Index sémantique du moteur courant (construit à la première recherche sémantique)
+        self.semantic_index = None
+        self.index_path = index_path
+        self.corpus_path = corpus_path
+
+        # Extraction, indexation et recherche tournent dans ce pool ; le verrou
+        # sérialise les modifications du corpus et les lectures du moteur
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.state_lock = threading.Lock()
+        self.tasks = []
+        self.polling = False
+
+        # Page de résultats affichée : seuls ses documents sont présents dans la vue
+        self.results_query = None
+        self.results_incremental = False
+        self.results_filters = None
+        self.results_page = None
+        self.result_documents = {}
+        # Recherche pendant la saisie : frappe en attente et dernier texte recherché
+        self.typing_after = None
+        self.typed_text = ""
+        # Fenêtre de diagnostic (mesures de l'instrumentation), rafraîchie tant qu'elle est ouverte
+        self.diagnostics_window = None
+        self.diagnostics_after = None
 
         style = ttk.Style()
         style.theme_use("clam")
@@ -153,26 +102,102 @@ class SearchApp:
         main_frame = ttk.Frame(root, padding="20")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
-        self.text_area = tk.Text(main_frame, wrap=tk.WORD, width=90, height=25, bg="#ffffff", fg="#333333", font=("Arial", 12))
-        self.text_area.grid(row=0, column=0, columnspan=3, pady=10, sticky="nsew")
+        # Vue des résultats : le Treeview ne dessine que les lignes visibles et
+        # ne contient jamais plus d'une page
+        results_frame = ttk.Frame(main_frame)
+        results_frame.grid(row=0, column=0, columnspan=3, pady=10, sticky="nsew")
+        self.results_tree = ttk.Treeview(results_frame, columns=list(RESULT_COLUMNS), show="headings", selectmode="browse")
+        for column, (heading, width) in RESULT_COLUMNS.items():
+            self.results_tree.heading(column, text=heading)
+            self.results_tree.column(column, width=width, stretch=column == "title")
+        results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
+        self.results_tree.configure(yscrollcommand=results_scrollbar.set)
+        self.results_tree.grid(row=0, column=0, sticky="nsew")
+        results_scrollbar.grid(row=0, column=1, sticky="ns")
+        results_frame.rowconfigure(0, weight=1)
+        results_frame.columnconfigure(0, weight=1)
+        # Double-clic ou Entrée : contenu complet du document sélectionné
+        self.results_tree.bind("<Double-1>", self.open_selected_document)
+        self.results_tree.bind("<Return>", self.open_selected_document)
+
+        self.previous_button = ttk.Button(main_frame, text="◀ Précédent", command=self.show_previous_page, state=tk.DISABLED)
+        self.previous_button.grid(row=1, column=0, pady=5, sticky="w")
+
+        self.page_label = tk.StringVar(value="")
+        page_label = ttk.Label(main_frame, textvariable=self.page_label)
+        page_label.grid(row=1, column=1, pady=5)
+
+        self.next_button = ttk.Button(main_frame, text="Suivant ▶", command=self.show_next_page, state=tk.DISABLED)
+        self.next_button.grid(row=1, column=2, pady=5, sticky="e")
 
         self.query_entry = ttk.Entry(main_frame, width=50, font=("Arial", 12))
-        self.query_entry.grid(row=1, column=0, pady=10, sticky="ew")
+        self.query_entry.grid(row=2, column=0, pady=10, sticky="ew")
+        self.query_entry.bind("<Return>", lambda event: self.run_search())
+        self.query_entry.bind("<KeyRelease>", self.on_query_typed)
 
         search_button = ttk.Button(main_frame, text="🔍 Rechercher", command=self.run_search)
-        search_button.grid(row=1, column=1, pady=10, padx=5)
+        search_button.grid(row=2, column=1, pady=10, padx=5)
+
+        self.engine_choice = ttk.Combobox(main_frame, values=list(ENGINES), state="readonly", width=18)
+        self.engine_choice.set(next(iter(ENGINES)))
+        self.engine_choice.grid(row=2, column=2, pady=10, padx=5)
+
+        # Filtres appliqués avant le calcul des scores (champs vides : pas de critère)
+        filters_frame = ttk.Frame(main_frame)
+        filters_frame.grid(row=3, column=0, columnspan=3, sticky="ew")
+        ttk.Label(filters_frame, text="Type").grid(row=0, column=0, padx=(0, 5))
+        self.type_choice = ttk.Combobox(filters_frame, values=[ALL_TYPES] + list(self.locale.types), state="readonly",
+                                        width=18)
+        self.type_choice.set(ALL_TYPES)
+        self.type_choice.grid(row=0, column=1, padx=5)
+        ttk.Label(filters_frame, text="Auteur").grid(row=0, column=2, padx=5)
+        self.creator_entry = ttk.Entry(filters_frame, width=16)
+        self.creator_entry.grid(row=0, column=3, padx=5)
+        ttk.Label(filters_frame, text="Du").grid(row=0, column=4, padx=5)
+        self.since_entry = ttk.Entry(filters_frame, width=11)
+        self.since_entry.grid(row=0, column=5, padx=5)
+        ttk.Label(filters_frame, text="au").grid(row=0, column=6, padx=5)
+        self.until_entry = ttk.Entry(filters_frame, width=11)
+        self.until_entry.grid(row=0, column=7, padx=5)
+        ttk.Label(filters_frame, text="Commentaires ≥").grid(row=0, column=8, padx=5)
+        self.comments_entry = ttk.Entry(filters_frame, width=6)
+        self.comments_entry.grid(row=0, column=9, padx=5)
+        ttk.Label(filters_frame, text="Classement").grid(row=0, column=10, padx=5)
+        self.ranking_choice = ttk.Combobox(filters_frame, values=RANKING_MODES, state="readonly", width=11)
+        self.ranking_choice.set(RANKING_MODES[0])
+        self.ranking_choice.grid(row=0, column=11, padx=5)
 
         load_reddit_button = ttk.Button(main_frame, text="📥 Charger Reddit", command=self.load_reddit_data)
-        load_reddit_button.grid(row=2, column=0, pady=10, sticky="ew")
+        load_reddit_button.grid(row=4, column=0, pady=10, sticky="ew")
 
         load_arxiv_button = ttk.Button(main_frame, text="📥 Charger Arxiv", command=self.load_arxiv_data)
-        load_arxiv_button.grid(row=2, column=1, pady=10, sticky="ew")
+        load_arxiv_button.grid(row=4, column=1, pady=10, sticky="ew")
+
+        load_all_button = ttk.Button(main_frame, text="📥 Charger tout", command=self.load_all_data)
+        load_all_button.grid(row=4, column=2, pady=10, sticky="ew")
 
         stats_button = ttk.Button(main_frame, text="📊 Statistiques", command=self.show_stats)
-        stats_button.grid(row=3, column=0, pady=10, sticky="ew")
+        stats_button.grid(row=5, column=0, pady=10, sticky="ew")
 
         reset_button = ttk.Button(main_frame, text="🧹 Réinitialiser", command=self.reset_text_area)
-        reset_button.grid(row=3, column=1, pady=10, sticky="ew")
+        reset_button.grid(row=5, column=1, pady=10, sticky="ew")
+
+        cancel_button = ttk.Button(main_frame, text="⛔ Annuler", command=self.cancel_tasks)
+        cancel_button.grid(row=5, column=2, pady=10, sticky="ew")
+
+        self.progress_bar = ttk.Progressbar(main_frame, mode="indeterminate")
+        self.progress_bar.grid(row=6, column=0, pady=5, sticky="ew")
+
+        self.status = tk.StringVar(value="Prêt.")
+        status_label = ttk.Label(main_frame, textvariable=self.status)
+        status_label.grid(row=6, column=1, pady=5, sticky="w")
+
+        diagnostics_button = ttk.Button(main_frame, text="🩺 Diagnostics", command=self.show_diagnostics)
+        diagnostics_button.grid(row=6, column=2, pady=5, sticky="e")
+
+        # Journal des chargements et statistiques
+        self.text_area = tk.Text(main_frame, wrap=tk.WORD, width=90, height=8, bg="#ffffff", fg="#333333", font=("Arial", 12))
+        self.text_area.grid(row=7, column=0, columnspan=3, pady=10, sticky="nsew")
 
         main_frame.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
@@ -180,47 +205,422 @@ class SearchApp:
 
         self.root.rowconfigure(0, weight=1)
         self.root.columnconfigure(0, weight=1)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+        # L'index (ou le corpus) enregistré est rechargé en arrière-plan : la
+        # fenêtre s'affiche sans attendre scikit-learn ni la lecture du disque
+        engine_class = ENGINES[self.engine_choice.get()]
+        self.start_task("Chargement de l'index", lambda task: self.load_saved_state(engine_class), self.show_saved_state)
+
+    # ----------------------
+    # Traitements en arrière-plan
+    # ----------------------
+    def start_task(self, label, work, on_done):
+        task = BackgroundTask(label, work, on_done)
+        task.future = self.executor.submit(work, task)
+        self.tasks.append(task)
+        if not self.polling:
+            self.polling = True
+            self.progress_bar.start()
+            self.root.after(POLL_INTERVAL_MS, self.poll_tasks)
+        self.update_status()
+        return task
+
+    def poll_tasks(self):
+        # Seul le thread Tk touche aux widgets : les résultats sont récupérés ici
+        for task in [task for task in self.tasks if task.future.done()]:
+            self.tasks.remove(task)
+            METRICS.observe("task_seconds", time.perf_counter() - task.started, task=task.label)
+            try:
+                result = task.future.result()
+            except Exception as error:
+                METRICS.count("task_errors_total", task=task.label)
+                self.text_area.insert(tk.END, f"{task.label} : échec ({error})\n")
+                self.text_area.see(tk.END)
+                continue
+            # Temps passé sur le thread Tk : au-delà de quelques millisecondes, l'interface saccade
+            with METRICS.timer("ui_callback_seconds", task=task.label):
+                task.on_done(task, result)
+        self.update_status()
+        if self.tasks:
+            self.root.after(POLL_INTERVAL_MS, self.poll_tasks)
+        else:
+            self.polling = False
+            self.progress_bar.stop()
+
+    def update_status(self):
+        if not self.tasks:
+            self.status.set("Prêt.")
+            return
+        parts = []
+        for task in self.tasks:
+            state = "annulation…" if task.cancelled() else (f"{task.progress} documents" if task.progress else "en cours…")
+            parts.append(f"{task.label} : {state}")
+        self.status.set(" | ".join(parts))
+
+    def cancel_tasks(self):
+        for task in self.tasks:
+            task.cancel_event.set()
+        self.update_status()
+
+    def close(self):
+        self.close_diagnostics()
+        self.cancel_tasks()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if isinstance(self.search_engine, ShardedSearchEngine):
+            self.search_engine.close()
+        self.root.destroy()
+
+    # ----------------------
+    # Index et corpus enregistrés
+    # ----------------------
+    def load_saved_state(self, engine_class):
+        with self.state_lock:
+            if os.path.exists(os.path.join(self.index_path, "meta.json")):
+                scoring = index_scoring(self.index_path)
+                if scoring != engine_class.SCORING:
+                    # Index d'un autre modèle : chargé par un moteur compatible, converti à la première recherche
+                    engine_class = next((cls for cls in ENGINES.values() if cls.SCORING == scoring), engine_class)
+                try:
+                    self.search_engine = engine_class.load(self.index_path)
+                except ValueError as error:
+                    return f"Index enregistré ignoré : {error}\n"
+                # Le gestionnaire reprend directement le DocumentStore de l'index
+                self.document_manager.use_store(self.search_engine.documents)
+                self.document_manager.search_engine = self.search_engine
+                return f"Index chargé : {len(self.search_engine.documents)} documents.\n"
+            if os.path.exists(self.corpus_path):
+                try:
+                    document_manager, report = load_corpus(self.corpus_path)
+                except ValueError as error:
+                    return f"Corpus enregistré ignoré : {error}\n"
+                self.document_manager = document_manager
+                return (f"Corpus chargé : {report['documents']} documents en {report['seconds']:.2f} s "
+                        f"({report['docs_per_second']:.0f} documents/s).\n")
+        return ""
+
+    def show_saved_state(self, task, message):
+        self.text_area.insert(tk.END, message)
+
+    def persist(self):
+        # Index et corpus sont réenregistrés après chaque chargement : le démarrage
+        # suivant n'a plus besoin du réseau
+        if self.search_engine:
+            self.search_engine.save(self.index_path)
+        write_corpus(self.document_manager.doc_list, self.corpus_path)
+
+    # ----------------------
+    # Chargement des sources
+    # ----------------------
+    def load_source(self, name, on_done):
+        def work(task):
+            start = time.perf_counter()
+            added = duplicates = 0
+            documents = iter(SOURCE_STREAMS[name]())
+            try:
+                for document in documents:
+                    if task.cancelled():
+                        break
+                    # Verrou par document : une recherche peut s'intercaler pendant le chargement
+                    with self.state_lock:
+                        if self.document_manager.add(document):
+                            added += 1
+                        else:
+                            duplicates += 1
+                    task.progress += 1
+            finally:
+                # Un générateur interrompu ferme sa connexion (ou arrête ses threads) tout de suite
+                if hasattr(documents, "close"):
+                    documents.close()
+                # Les documents déjà ajoutés sont conservés même après une annulation ou une erreur
+                with self.state_lock:
+                    self.persist()
+            return {"documents": added, "duplicates": duplicates, "seconds": time.perf_counter() - start,
+                    "error": None, "cancelled": task.cancelled()}
+        return self.start_task(f"Chargement {name}", work, on_done)
 
     def load_reddit_data(self):
-        reddit_data = reddit_posts_extract()
-        for document in reddit_data:
-            self.document_manager.add(document)
-        self.text_area.insert(tk.END, "Données Reddit chargées avec succès.\n")
-        self.text_area.see(tk.END)
+        self.load_source("Reddit", lambda task, report: self.show_load_report("Reddit", report))
 
     def load_arxiv_data(self):
-        arxiv_data = arxiv_papers_extract()
-        for document in arxiv_data:
-            self.document_manager.add(document)
-        self.text_area.insert(tk.END, "Données Arxiv chargées avec succès.\n")
+        self.load_source("Arxiv", lambda task, report: self.show_load_report("Arxiv", report))
+
+    def load_all_data(self):
+        # Une tâche par source : les extractions se déroulent en parallèle dans le pool
+        for name in SOURCE_STREAMS:
+            self.load_source(name, lambda task, report, name=name: self.show_ingestion_report(name, report))
+
+    def show_load_report(self, name, report):
+        self.text_area.insert(tk.END, f"Données {name} chargées avec succès : {report['documents']} nouveaux documents, "
+                                      f"{report['duplicates']} doublons ignorés{' (annulé)' if report['cancelled'] else ''}.\n")
         self.text_area.see(tk.END)
 
+    def show_ingestion_report(self, name, report):
+        message = format_ingestion_report(name, report)
+        self.text_area.insert(tk.END, message + (" (annulé)" if report["cancelled"] else "") + "\n")
+        self.text_area.see(tk.END)
+
+    # ----------------------
+    # Recherche
+    # ----------------------
+    def read_filters(self):
+        # Critères de la barre de filtres, lus sur le thread Tk ; ValueError si une valeur est invalide
+        doc_type = self.type_choice.get()
+        creator = self.creator_entry.get().strip()
+        since, until = self.since_entry.get().strip(), self.until_entry.get().strip()
+        min_comments = self.comments_entry.get().strip()
+        if min_comments and not min_comments.isdigit():
+            raise ValueError(f"Nombre de commentaires invalide : {min_comments}")
+        return SearchFilter(doc_type=None if doc_type == ALL_TYPES else doc_type, since=since or None,
+                            until=until or None, creator=creator or None,
+                            min_comments=int(min_comments) if min_comments else None)
+
     def run_search(self):
-        query = self.query_entry.get()
-        if not self.search_engine:
-            self.search_engine = SearchEngine(self.document_manager.doc_list)
-        results = self.search_engine.search(query)
-        self.text_area.insert(tk.END, "\n--- Résultats de la Recherche ---\n")
+        if self.typing_after is not None:
+            self.root.after_cancel(self.typing_after)
+            self.typing_after = None
+        try:
+            search_filter = self.read_filters()
+        except ValueError as error:
+            self.text_area.insert(tk.END, f"Filtre ignoré : {error}\n")
+            self.text_area.see(tk.END)
+            return
+        self.typed_text = self.query_entry.get()
+        self.fetch_results(self.typed_text, 0, search_filter=search_filter)
+
+    def on_query_typed(self, event=None):
+        # Anti-rebond : seule la dernière frappe d'une rafale déclenche une recherche
+        if self.typing_after is not None:
+            self.root.after_cancel(self.typing_after)
+        self.typing_after = self.root.after(TYPING_DEBOUNCE_MS, self.run_incremental_search)
+
+    def run_incremental_search(self):
+        self.typing_after = None
+        text = self.query_entry.get()
+        # Touches sans effet sur le texte (flèches, Entrée déjà traitée...) : rien à faire
+        if text == self.typed_text or not text.strip() or not len(self.document_manager.doc_list):
+            return
+        try:
+            search_filter = self.read_filters()
+        except ValueError:
+            # Saisie de filtre en cours : l'erreur est signalée à la recherche explicite
+            return
+        self.typed_text = text
+        self.fetch_results(text, 0, incremental=True, search_filter=search_filter)
+
+    def show_next_page(self):
+        if self.results_page is not None and self.results_page.has_next():
+            self.fetch_results(self.results_query, self.results_page.offset + RESULTS_PAGE_SIZE, self.results_incremental,
+                               self.results_filters)
+
+    def show_previous_page(self):
+        if self.results_page is not None and self.results_page.offset > 0:
+            self.fetch_results(self.results_query, max(0, self.results_page.offset - RESULTS_PAGE_SIZE),
+                               self.results_incremental, self.results_filters)
+
+    def fetch_results(self, query, offset, incremental=False, search_filter=None):
+        # Chaque page est demandée au moteur à la volée (k = taille de page, décalage)
+        engine_class = ENGINES[self.engine_choice.get()]
+        ranking = self.ranking_choice.get()
+        # Une nouvelle recherche rend la précédente obsolète
+        for task in self.tasks:
+            if task.label == "Recherche":
+                task.cancel_event.set()
+
+        def work(task):
+            with self.state_lock:
+                if task.cancelled():
+                    return None
+                if not self.search_engine:
+                    self.search_engine = engine_class(self.document_manager.doc_list)
+                    self.search_engine.save(self.index_path)
+                    self.document_manager.search_engine = self.search_engine
+                elif type(self.search_engine) is not engine_class:
+                    # Changement de moteur : les poids déjà calculés sont réutilisés s'ils suivent le même modèle
+                    previous_engine = self.search_engine
+                    self.search_engine = engine_class.from_engine(previous_engine)
+                    if isinstance(previous_engine, ShardedSearchEngine):
+                        previous_engine.close()
+                    self.document_manager.search_engine = self.search_engine
+                if ranking != RANKING_MODES[0]:
+                    # Classements sémantiques : le texte saisi est recherché tel quel, sans complétion
+                    semantic_index = self.current_semantic_index()
+                    if ranking == "Sémantique":
+                        return semantic_index.search(query, k=RESULTS_PAGE_SIZE, offset=offset, filters=search_filter)
+                    return semantic_index.search_hybrid(query, k=RESULTS_PAGE_SIZE, offset=offset, filters=search_filter)
+                if incremental:
+                    # Le dernier mot est complété par préfixe ; les scores des mots déjà terminés sont réutilisés
+                    return self.search_engine.search_incremental(query, k=RESULTS_PAGE_SIZE, offset=offset,
+                                                                 filters=search_filter)
+                return self.search_engine.search(query, k=RESULTS_PAGE_SIZE, offset=offset, filters=search_filter)
+        self.start_task("Recherche", work,
+                        lambda task, results: self.show_results(task, query, results, incremental, search_filter))
+
+    def current_semantic_index(self):
+        # Appelé sous state_lock : reconstruit après un changement de moteur ou trop d'ajouts
+        # (l'index enregistré à côté de celui du moteur est repris s'il correspond au corpus)
+        index = self.semantic_index
+        if index is None or index.engine is not self.search_engine or index.stale():
+            self.semantic_index = semantic_index_for(self.search_engine, os.path.join(self.index_path, SEMANTIC_DIRECTORY))
+        return self.semantic_index
+
+    def show_results(self, task, query, results, incremental=False, search_filter=None):
+        if task.cancelled() or results is None:
+            return
+        self.results_query = query
+        self.results_incremental = incremental
+        self.results_filters = search_filter
+        self.results_page = results
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.result_documents = {}
+        for position, (doc, score) in enumerate(results):
+            iid = str(results.offset + position)
+            self.result_documents[iid] = doc
+            self.results_tree.insert("", tk.END, iid=iid, values=(doc.title, self.locale.type_name(doc), doc.timestamp, f"{score:.4f}"))
         if results:
-            for doc, score in results:
-                self.text_area.insert(tk.END, f"{doc} | Score : {score:.4f}\n")
+            self.page_label.set(f"Résultats {results.offset + 1}–{results.offset + len(results)} sur {results.total}")
         else:
-            self.text_area.insert(tk.END, "Aucun résultat trouvé.\n")
+            self.page_label.set("Aucun résultat trouvé.")
+        self.previous_button.configure(state=tk.NORMAL if results.offset > 0 else tk.DISABLED)
+        self.next_button.configure(state=tk.NORMAL if results.has_next() else tk.DISABLED)
+
+    def open_selected_document(self, event=None):
+        doc = self.result_documents.get(self.results_tree.focus())
+        if doc is None:
+            return
+        window = tk.Toplevel(self.root)
+        window.title(doc.title)
+        window.transient(self.root)
+        content = tk.Text(window, wrap=tk.WORD, width=80, height=20, bg="#ffffff", fg="#333333", font=("Arial", 12))
+        content.pack(fill=tk.BOTH, expand=True)
+        content.insert(tk.END, f"{self.locale.describe(doc)}\n\n{doc.content}\n")
+        content.configure(state=tk.DISABLED)
+
+    # ----------------------
+    # Diagnostic
+    # ----------------------
+    def show_diagnostics(self):
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.lift()
+            return
+        if not METRICS.enabled:
+            # La collecte est coupée par défaut (coût nul) ; ouvrir le panneau l'active
+            METRICS.enable()
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("800x500")
+        window.protocol("WM_DELETE_WINDOW", self.close_diagnostics)
+        self.diagnostics_window = window
+
+        buttons = ttk.Frame(window, padding="5")
+        buttons.pack(fill=tk.X)
+        self.profile_button = ttk.Button(buttons, text="Profilage : désactivé", command=self.toggle_profiling)
+        self.profile_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Remettre à zéro", command=METRICS.reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Exporter JSON", command=lambda: self.export_metrics(METRICS_JSON_PATH)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Exporter Prometheus",
+                   command=lambda: self.export_metrics(METRICS_PROMETHEUS_PATH)).pack(side=tk.LEFT, padx=5)
+        self.diagnostics_text = tk.Text(window, wrap=tk.NONE, font=("Courier", 10))
+        self.diagnostics_text.pack(fill=tk.BOTH, expand=True)
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        self.diagnostics_after = None
+        if self.diagnostics_window is None:
+            return
+        lines = format_metrics_summary(METRICS) or ["Aucune mesure pour l'instant : lancez un chargement ou une recherche."]
+        report = METRICS.profile_report("search_seconds", top=15) if METRICS.profile else ""
+        self.diagnostics_text.delete("1.0", tk.END)
+        self.diagnostics_text.insert(tk.END, "\n".join(lines) + "\n")
+        if report:
+            self.diagnostics_text.insert(tk.END, "\n--- Profil des recherches (cProfile) ---\n" + report)
+        self.diagnostics_after = self.root.after(DIAGNOSTICS_REFRESH_MS, self.refresh_diagnostics)
+
+    def toggle_profiling(self):
+        METRICS.profile = not METRICS.profile
+        self.profile_button.configure(text=f"Profilage : {'activé' if METRICS.profile else 'désactivé'}")
+
+    def export_metrics(self, path):
+        METRICS.write(path)
+        self.text_area.insert(tk.END, f"Mesures exportées dans '{path}'.\n")
         self.text_area.see(tk.END)
 
-    def show_stats(self):
-        num_docs = len(self.document_manager.doc_list)
-        num_reddit = sum(1 for doc in self.document_manager.doc_list if doc.doc_type == "Post Reddit")
-        num_arxiv = sum(1 for doc in self.document_manager.doc_list if doc.doc_type == "Article Arxiv")
+    def close_diagnostics(self):
+        if self.diagnostics_window is None:
+            return
+        if self.diagnostics_after is not None:
+            self.root.after_cancel(self.diagnostics_after)
+            self.diagnostics_after = None
+        self.diagnostics_window.destroy()
+        self.diagnostics_window = None
 
+    def show_stats(self):
+        # Statistiques tenues à jour par le gestionnaire ; facettes de tous les résultats
+        # de la dernière recherche complète, à partir des codes déjà enregistrés
+        query = None if self.results_incremental else self.results_query
+        search_filter = self.results_filters
+
+        def work(task):
+            with self.state_lock:
+                stats = self.document_manager.corpus_stats()
+                facets = None
+                if query and self.search_engine is not None:
+                    facets = stats.facets(self.search_engine.matches(query, search_filter), top=5)
+                top = {"authors": stats.authors.top(5), "subreddits": stats.subreddits.top(5), "months": stats.months.top(5)}
+                return stats.summary(), top, facets
+        self.start_task("Statistiques", work, lambda task, result: self.display_stats(query, *result))
+
+    def display_stats(self, query, summary, top, facets):
         self.text_area.insert(tk.END, f"\n--- Statistiques ---\n")
-        self.text_area.insert(tk.END, f"Nombre total de documents : {num_docs}\n")
-        self.text_area.insert(tk.END, f"Documents Reddit : {num_reddit}\n")
-        self.text_area.insert(tk.END, f"Documents Arxiv : {num_arxiv}\n")
+        self.text_area.insert(tk.END, f"Nombre total de documents : {summary['documents']}\n")
+        self.text_area.insert(tk.END, f"Documents Reddit : {summary['types'][DOC_TYPE_NAMES[1]]}\n")
+        self.text_area.insert(tk.END, f"Documents Arxiv : {summary['types'][DOC_TYPE_NAMES[2]]}\n")
+        self.text_area.insert(tk.END, f"Commentaires : {summary['comments']}\n")
+        self.text_area.insert(tk.END, f"Taille du vocabulaire : {summary['vocabulary']}\n")
+        self.text_area.insert(tk.END, f"Auteurs ({summary['authors']}) : {format_facet(top['authors'])}\n")
+        self.text_area.insert(tk.END, f"Subreddits ({summary['subreddits']}) : {format_facet(top['subreddits'])}\n")
+        self.text_area.insert(tk.END, f"Mois ({summary['months']}) : {format_facet(top['months'])}\n")
+        if facets is not None:
+            self.text_area.insert(tk.END, f"--- Résultats pour « {query} » : {facets['documents']} documents ---\n")
+            # Comptes par type dans l'ordre des codes, affichés avec les libellés de l'interface
+            types = zip(self.locale.types, facets["types"].values())
+            self.text_area.insert(tk.END, "Types : " + format_facet(item for item in types if item[1]) + "\n")
+            self.text_area.insert(tk.END, f"Commentaires : {facets['comments']}\n")
+            self.text_area.insert(tk.END, f"Auteurs : {format_facet(facets['authors'])}\n")
+            self.text_area.insert(tk.END, f"Subreddits : {format_facet(facets['subreddits'])}\n")
+            self.text_area.insert(tk.END, f"Mois : {format_facet(facets['months'])}\n")
         self.text_area.see(tk.END)
 
     def reset_text_area(self):
         self.text_area.delete(1.0, tk.END)
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.result_documents = {}
+        self.results_page = None
+        self.page_label.set("")
+        self.previous_button.configure(state=tk.DISABLED)
+        self.next_button.configure(state=tk.DISABLED)
+
+# ======================
+# Mesure du temps de démarrage
+# ======================
+STARTUP_SCRIPT = """
+import sys
+sys.path.insert(0, {module_dir!r})
+import tkinter as tk
+from v3_interface import SearchApp
+root = tk.Tk()
+app = SearchApp(root)
+root.after_idle(lambda: (print("ready", flush=True), app.close()))
+root.mainloop()
+"""
+
+def benchmark_startup(n_documents=1000):
+    # Temps jusqu'à la première fenêtre affichée par SearchApp, dans un processus
+    # neuf, avec un corpus enregistré à recharger (nécessite un affichage)
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(synthetic_documents(n_documents), os.path.join(directory, CORPUS_PATH))
+        script = STARTUP_SCRIPT.format(module_dir=os.path.dirname(os.path.abspath(__file__)))
+        return run_startup(["-c", script], directory, ready="ready")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,13 @@
+# ======================
+# Cœur commun du moteur de recherche
+# ======================
+# Paquet partagé par les trois versions : chacune n'y ajoute que son exemple,
+# sa ligne de commande ou son interface graphique. Les modules s'importent
+# séparément (from search_core.engines import SearchEngine, ...) :
+#   lazy       chargement différé des dépendances lourdes
+#   metrics    instrumentation (compteurs, histogrammes, profilage), mesure du temps de démarrage
+#   documents  classes de documents, libellés et stockage en colonnes
+#   corpus     déduplication, statistiques, gestionnaire de documents, persistance, filtres de recherche
+#   sources    extraction Reddit et arXiv, ingestion concurrente
+#   engines    moteurs de recherche : TF-IDF, index inversé, BM25F, moteur réparti, indexation en flux
+#   semantic   recherche sémantique (LSA, index IVF)
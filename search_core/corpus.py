@@ -0,0 +1,570 @@
+from array import array
+import time
+import csv
+import json
+import pickle
+import tempfile
+import re
+import os
+import hashlib
+import heapq
+import zlib
+from .lazy import np, pd
+from .metrics import METRICS
+from .documents import (LABELS, DOC_TYPE_NAMES, ArxivPaper, TIMESTAMP_FORMATS, RAW_TIMESTAMP, AUTHORS_SEPARATOR,
+                        encode_timestamp, decode_timestamp, document_type_code, comment_count, DocumentStore,
+                        synthetic_documents)
+
+# ======================
+# Classe DuplicateDetector
+# ======================
+# Doublons exacts : empreinte du titre et du contenu normalisés (casse, espaces).
+# Quasi-doublons : signature MinHash des triplets de mots, indexée par bandes
+# (LSH) ; seuls les documents partageant une bande sont comparés.
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 8
+MINHASH_PRIME = 4294967311
+MIN_SHINGLES = 5
+
+def normalize_text(text):
+    return " ".join(str(text).lower().split())
+
+def shingle_hashes(text, size=3):
+    tokens = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))}
+    shingles.discard("")
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+class DuplicateDetector:
+    def __init__(self, threshold=0.8, seed=0):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        # Permutations (a·x + b) mod p, a et b tirés uniformément modulo p
+        self.multipliers = rng.integers(1, MINHASH_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+        self.offsets = rng.integers(0, MINHASH_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+        self.band_mixers = rng.integers(1, 2 ** 63, MINHASH_PERMUTATIONS // MINHASH_BANDS, dtype=np.uint64) | np.uint64(1)
+        self.fingerprints = set()
+        # Par bande : clé -> emplacements de toutes les signatures qui la partagent
+        self.buckets = [{} for _ in range(MINHASH_BANDS)]
+        self.signatures = np.empty((0, MINHASH_PERMUTATIONS), dtype=np.uint32)
+        self.n_signatures = 0
+        self.counts = {"exact": 0, "near": 0}
+
+    def register(self, doc):
+        # Renvoie "exact" ou "near" pour un doublon, None pour un document nouveau (alors mémorisé)
+        fingerprint = hashlib.blake2b(f"{normalize_text(doc.title)}\x00{normalize_text(doc.content)}".encode("utf-8"),
+                                      digest_size=16).digest()
+        if fingerprint in self.fingerprints:
+            self.counts["exact"] += 1
+            return "exact"
+
+        # Le contenu seul suffit à repérer un résumé reposté sous un autre titre
+        hashes = shingle_hashes(doc.content)
+        if len(hashes) < MIN_SHINGLES:
+            hashes = shingle_hashes(f"{doc.title} {doc.content}")
+        if len(hashes) < MIN_SHINGLES:
+            # Texte trop court pour une estimation de similarité fiable
+            self.fingerprints.add(fingerprint)
+            return None
+        signature = self.signature(hashes)
+        band_keys = self.band_keys(signature)
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self.buckets[band].get(key, ()))
+        if candidates:
+            slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            if (np.mean(self.signatures[slots] == signature, axis=1) >= self.threshold).any():
+                self.counts["near"] += 1
+                return "near"
+
+        self.fingerprints.add(fingerprint)
+        slot = self.store_signature(signature)
+        for band, key in enumerate(band_keys):
+            self.buckets[band].setdefault(key, []).append(slot)
+        return None
+
+    def signature(self, hashes):
+        # a (< p < 2^33) est découpé en 17 bits de poids fort et 16 de poids faible :
+        # chaque produit partiel avec x (< 2^32) reste sous 2^50, sans dépassement sur 64 bits
+        high = (self.multipliers[:, None] >> np.uint64(16)) * hashes[None, :] % MINHASH_PRIME
+        low = (self.multipliers[:, None] & np.uint64(0xFFFF)) * hashes[None, :]
+        permuted = ((high << np.uint64(16)) + low + self.offsets[:, None]) % MINHASH_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        bands = signature.reshape(MINHASH_BANDS, -1).astype(np.uint64)
+        return [int(key) for key in (bands * self.band_mixers).sum(axis=1)]
+
+    def store_signature(self, signature):
+        if self.n_signatures == len(self.signatures):
+            grown = np.empty((max(16, 2 * len(self.signatures)), MINHASH_PERMUTATIONS), dtype=np.uint32)
+            grown[:self.n_signatures] = self.signatures
+            self.signatures = grown
+        self.signatures[self.n_signatures] = signature
+        self.n_signatures += 1
+        return self.n_signatures - 1
+
+# ======================
+# Classe CorpusStats
+# ======================
+# Statistiques tenues à jour à chaque ajout : nombre de documents par type,
+# auteur, mois et subreddit, total des commentaires et taille du vocabulaire.
+# Chaque document garde aussi ses codes de facettes, ce qui permet de compter
+# les facettes d'un ensemble de résultats sans relire les documents.
+# Même découpage en mots que TfidfVectorizer : la taille du vocabulaire est celle de l'index
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+MONTH_PATTERN = re.compile(r"\d{4}-\d{2}")
+UNKNOWN_MONTH = "inconnu"
+
+class Facet:
+    # Valeurs internées : un identifiant entier et un compteur par valeur
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.counts = []
+
+    def add(self, name):
+        value_id = self.ids.get(name)
+        if value_id is None:
+            value_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.counts.append(0)
+        self.counts[value_id] += 1
+        return value_id
+
+    def count(self, name):
+        value_id = self.ids.get(name)
+        return 0 if value_id is None else self.counts[value_id]
+
+    def top(self, n=10, counts=None):
+        counts = self.counts if counts is None else counts
+        best = heapq.nlargest(n, range(len(counts)), key=counts.__getitem__)
+        return [(self.names[value_id], int(counts[value_id])) for value_id in best if counts[value_id]]
+
+    def __len__(self):
+        return len(self.names)
+
+class CorpusStats:
+    def __init__(self):
+        self.type_counts = [0] * len(DOC_TYPE_NAMES)
+        self.authors = Facet()
+        self.months = Facet()
+        self.subreddits = Facet()
+        self.comments = 0
+        self.vocabulary = set()
+        # Codes de facettes par document, dans l'ordre du corpus (-1 : pas de subreddit)
+        self.doc_types = array("B")
+        self.doc_months = array("q")
+        self.doc_subreddits = array("q")
+        self.doc_comments = array("q")
+        self.author_ids = array("q")
+        self.author_offsets = array("q", [0])
+
+    def add(self, doc):
+        code = document_type_code(doc)
+        self.type_counts[code] += 1
+        self.doc_types.append(code)
+        for author in (doc.creators if code == 2 else [doc.creator]):
+            self.author_ids.append(self.authors.add(str(author)))
+        self.author_offsets.append(len(self.author_ids))
+        month = MONTH_PATTERN.match(str(doc.timestamp))
+        self.doc_months.append(self.months.add(month.group() if month else UNKNOWN_MONTH))
+        self.doc_subreddits.append(self.subreddits.add(doc.subreddit) if code == 1 and doc.subreddit else -1)
+        comments = comment_count(doc)
+        self.comments += comments
+        self.doc_comments.append(comments)
+        self.vocabulary.update(TOKEN_PATTERN.findall(doc.content.lower()))
+
+    def __len__(self):
+        return len(self.doc_types)
+
+    def summary(self):
+        # Réponse en O(1) : seuls des compteurs déjà à jour sont lus
+        return {
+            "documents": len(self.doc_types),
+            "types": dict(zip(DOC_TYPE_NAMES, self.type_counts)),
+            "comments": self.comments,
+            "vocabulary": len(self.vocabulary),
+            "authors": len(self.authors),
+            "months": len(self.months),
+            "subreddits": len(self.subreddits),
+        }
+
+    def facets(self, indices, top=10):
+        # Comptes par facette sur un sous-ensemble de documents (par exemple tous les
+        # résultats d'une requête), en O(taille du sous-ensemble). Les vues numpy sur
+        # les colonnes sont libérées au retour : pas d'ajout concurrent pendant l'appel.
+        indices = np.asarray(indices, dtype=np.int64)
+        types = np.bincount(np.frombuffer(self.doc_types, dtype=np.uint8)[indices], minlength=len(DOC_TYPE_NAMES))
+        months = np.bincount(np.frombuffer(self.doc_months, dtype=np.int64)[indices], minlength=len(self.months))
+        subreddits = np.frombuffer(self.doc_subreddits, dtype=np.int64)[indices]
+        subreddits = np.bincount(subreddits[subreddits >= 0], minlength=len(self.subreddits))
+        # Auteurs : plusieurs par article, lus dans des tranches contiguës de author_ids
+        offsets = np.frombuffer(self.author_offsets, dtype=np.int64)
+        starts, lengths = offsets[indices], offsets[indices + 1] - offsets[indices]
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        authors = np.bincount(np.frombuffer(self.author_ids, dtype=np.int64)[positions], minlength=len(self.authors))
+        return {
+            "documents": len(indices),
+            "types": dict(zip(DOC_TYPE_NAMES, types.tolist())),
+            "comments": int(np.frombuffer(self.doc_comments, dtype=np.int64)[indices].sum()),
+            "authors": self.authors.top(top, authors),
+            "months": self.months.top(top, months),
+            "subreddits": self.subreddits.top(top, subreddits),
+        }
+
+# ======================
+# Classe DocumentManager
+# ======================
+class DocumentManager:
+    def __init__(self, deduplicate=True):
+        self.doc_list = DocumentStore()
+        self.duplicate_detector = DuplicateDetector() if deduplicate else None
+        # Nombre de documents de doc_list déjà connus du détecteur
+        self.registered = 0
+        self.stats = CorpusStats()
+        self.search_engine = None
+
+    def add(self, doc):
+        # Renvoie False si le document est un doublon (exact ou quasi) déjà présent
+        with METRICS.timer("document_add_seconds"):
+            if self.duplicate_detector is not None:
+                self.register_stored()
+                duplicate = self.duplicate_detector.register(doc)
+                if duplicate is not None:
+                    METRICS.count("documents_duplicate_total", kind=duplicate)
+                    return False
+            self.corpus_stats()
+            self.doc_list.append(doc)
+            self.registered = len(self.doc_list)
+            self.stats.add(doc)
+            METRICS.count("documents_added_total")
+            # Le moteur attaché indexe le nouveau document sans réentraînement complet ;
+            # s'il partage ce DocumentStore, le document y est déjà enregistré
+            if self.search_engine is not None:
+                self.search_engine.add_documents([doc], stored=self.search_engine.documents is self.doc_list)
+            return True
+
+    def use_store(self, store):
+        # Reprend un DocumentStore existant (index ou corpus rechargé) ; ses documents
+        # ne passent par le détecteur de doublons qu'au premier ajout
+        self.doc_list = store
+        self.registered = 0
+        self.stats = CorpusStats()
+
+    def corpus_stats(self):
+        # Statistiques à jour ; les documents repris par use_store sont comptés au premier appel
+        for index in range(len(self.stats), len(self.doc_list)):
+            self.stats.add(self.doc_list[index])
+        return self.stats
+
+    def register_stored(self):
+        for index in range(self.registered, len(self.doc_list)):
+            self.duplicate_detector.register(self.doc_list[index])
+        self.registered = len(self.doc_list)
+
+    def show_all(self):
+        for doc in self.doc_list:
+            print(doc)
+
+# ======================
+# Persistance du corpus
+# ======================
+# Le corpus est écrit et relu par paquets de lignes, soit en CSV lisible (avec
+# les champs propres à chaque type), soit en DataFrames pandas sérialisés qui
+# reprennent directement les colonnes du DocumentStore : le rechargement n'a
+# alors ni date à analyser ni objet document à construire.
+CORPUS_PATH = "corpus.pkl"
+CORPUS_FORMAT_VERSION = 1
+CORPUS_CHUNK_SIZE = 10000
+CSV_COLUMNS = ["Title", "Creator", "Date", "Type", "Comments", "Subreddit", "Content"]
+# Auteurs d'un article : liste JSON dans la cellule (un nom peut contenir « ; ») ;
+# les corpus écrits auparavant les séparaient par CSV_AUTHORS_SEPARATOR
+CSV_AUTHORS_SEPARATOR = "; "
+# Code de type de chaque libellé connu, toutes langues confondues
+TYPE_CODES_BY_NAME = {name: code for labels in LABELS.values() for code, name in enumerate(labels["types"])}
+
+def corpus_frames(documents, chunk_size=CORPUS_CHUNK_SIZE):
+    # Un DocumentStore est découpé directement ; tout autre itérable passe par
+    # un petit store temporaire par paquet
+    if isinstance(documents, DocumentStore):
+        for start in range(0, len(documents), chunk_size):
+            yield documents.frame(start, start + chunk_size)
+        return
+    chunk = []
+    for doc in documents:
+        chunk.append(doc)
+        if len(chunk) == chunk_size:
+            yield DocumentStore(chunk).frame()
+            chunk = []
+    if chunk:
+        yield DocumentStore(chunk).frame()
+
+def csv_authors(cell):
+    try:
+        authors = json.loads(cell)
+    except ValueError:
+        authors = None
+    if not isinstance(authors, list):
+        authors = cell.split(CSV_AUTHORS_SEPARATOR) if cell else []
+    return AUTHORS_SEPARATOR.join(authors)
+
+def frame_to_csv(frame):
+    dates = [raw if code == RAW_TIMESTAMP else decode_timestamp(epoch, code)
+             for epoch, code, raw in zip(frame["epoch"], frame["timestamp_format"], frame["raw_timestamp"])]
+    # Un auteur absent est enregistré vide dans le DocumentStore : cellule vide
+    creators = [json.dumps(creator.split(AUTHORS_SEPARATOR) if creator else [], ensure_ascii=False) if code == 2 else creator
+                for code, creator in zip(frame["type"], frame["creator"])]
+    return pd.DataFrame({
+        "Title": frame["title"],
+        "Creator": creators,
+        "Date": dates,
+        "Type": [DOC_TYPE_NAMES[code] for code in frame["type"]],
+        "Comments": frame["comments"],
+        "Subreddit": frame["subreddit"],
+        "Content": frame["content"],
+    }, columns=CSV_COLUMNS)
+
+def frame_from_csv(chunk):
+    type_codes = chunk["Type"].map(TYPE_CODES_BY_NAME).fillna(0).astype(np.uint8)
+    # Les dates se répètent souvent (même jour, même format) : une analyse par valeur distincte
+    timestamps = {value: encode_timestamp(value) for value in chunk["Date"].unique()}
+    epochs, formats = zip(*(timestamps[value] for value in chunk["Date"])) if len(chunk) else ((), ())
+    formats = np.array(formats, dtype=np.uint8)
+    creators = chunk["Creator"].to_numpy(copy=True)
+    papers = (type_codes == 2).to_numpy()
+    creators[papers] = [csv_authors(cell) for cell in creators[papers]]
+    return pd.DataFrame({
+        "type": type_codes.to_numpy(),
+        "epoch": np.array(epochs, dtype=np.int64),
+        "timestamp_format": formats,
+        "comments": pd.to_numeric(chunk["Comments"], errors="coerce").fillna(0).astype(np.int64).to_numpy(),
+        "title": chunk["Title"].to_numpy(),
+        "creator": creators,
+        "content": chunk["Content"].to_numpy(),
+        "raw_timestamp": np.where(formats == RAW_TIMESTAMP, chunk["Date"], ""),
+        "subreddit": chunk["Subreddit"].to_numpy() if "Subreddit" in chunk else np.full(len(chunk), ""),
+    })
+
+def write_corpus(documents, path, chunk_size=CORPUS_CHUNK_SIZE):
+    # Format choisi par l'extension (.csv, sinon DataFrames sérialisés) ; écriture
+    # dans un fichier temporaire puis remplacement, comme pour l'index
+    tmp_path = path + ".tmp"
+    count = 0
+    if path.lower().endswith(".csv"):
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(CSV_COLUMNS)
+            for frame in corpus_frames(documents, chunk_size):
+                frame_to_csv(frame).to_csv(f, header=False, index=False)
+                count += len(frame)
+    else:
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"format_version": CORPUS_FORMAT_VERSION}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for frame in corpus_frames(documents, chunk_size):
+                pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+                count += len(frame)
+    os.replace(tmp_path, path)
+    return count
+
+def read_corpus_frames(path, chunk_size=CORPUS_CHUNK_SIZE):
+    # Générateur de paquets aux colonnes du DocumentStore
+    if path.lower().endswith(".csv"):
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False, encoding="utf-8"):
+            yield frame_from_csv(chunk)
+        return
+    # Fichier sérialisé : ne relire que des corpus écrits par write_corpus
+    with open(path, "rb") as f:
+        header = pickle.load(f)
+        if not isinstance(header, dict) or header.get("format_version") != CORPUS_FORMAT_VERSION:
+            raise ValueError(f"Format de corpus non supporté : {path}")
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def read_corpus(path, chunk_size=CORPUS_CHUNK_SIZE):
+    for frame in read_corpus_frames(path, chunk_size):
+        store = DocumentStore()
+        store.extend_frame(frame)
+        yield from store
+
+def load_corpus(path, deduplicate=True, chunk_size=CORPUS_CHUNK_SIZE):
+    # Reconstruit un DocumentManager sans accès réseau ; le rapport donne le débit de lecture
+    start = time.perf_counter()
+    store = DocumentStore()
+    with METRICS.timer("corpus_load_seconds"):
+        for frame in read_corpus_frames(path, chunk_size):
+            store.extend_frame(frame)
+    manager = DocumentManager(deduplicate=deduplicate)
+    manager.use_store(store)
+    seconds = time.perf_counter() - start
+    return manager, {"documents": len(store), "seconds": seconds, "docs_per_second": len(store) / max(seconds, 1e-9)}
+
+def benchmark_corpus_io(n_documents=100000, chunk_size=CORPUS_CHUNK_SIZE):
+    # Débits d'écriture et de rechargement (documents/s) pour chaque format
+    store = DocumentStore(synthetic_documents(n_documents))
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("corpus.csv", "corpus.pkl"):
+            path = os.path.join(directory, name)
+            start = time.perf_counter()
+            write_corpus(store, path, chunk_size)
+            write_seconds = time.perf_counter() - start
+            manager, report = load_corpus(path, chunk_size=chunk_size)
+            results[name.rsplit(".", 1)[1]] = {
+                "bytes": os.path.getsize(path),
+                "write_docs_per_second": n_documents / max(write_seconds, 1e-9),
+                "read_docs_per_second": report["docs_per_second"],
+            }
+    return results
+
+# ======================
+# Filtres de recherche
+# ======================
+# Les critères sont résolus sur des index de métadonnées tenus à jour avec le
+# corpus : un bitset (bits compactés) par type de document, la liste des
+# documents de chaque auteur, et des colonnes triées (date, commentaires) où
+# une plage se trouve par dichotomie. Le masque obtenu restreint les lignes de
+# la matrice avant le calcul des similarités : plus le filtre est sélectif,
+# moins il y a de documents à scorer.
+# Au-delà de cette proportion de documents retenus, extraire les lignes coûte plus que tout scorer
+FILTER_SLICE_RATIO = 0.5
+END_OF_DAY = 86399
+
+def parse_filter_date(value, end=False):
+    # Chaîne dans l'un des formats de TIMESTAMP_FORMATS ou horodatage en secondes ;
+    # en borne de fin, une date sans heure couvre toute la journée
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    epoch, code = encode_timestamp(str(value).strip())
+    if code == RAW_TIMESTAMP:
+        raise ValueError(f"Date de filtre non reconnue : {value}")
+    return epoch + END_OF_DAY if end and TIMESTAMP_FORMATS[code] == "%Y-%m-%d" else epoch
+
+def filter_type_codes(doc_type):
+    # Type(s) accepté(s) : libellé de type (dans l'une des langues) ou code de type, seul ou en liste
+    if doc_type is None:
+        return None
+    codes = set()
+    for value in ([doc_type] if isinstance(doc_type, (str, int)) else doc_type):
+        if isinstance(value, str):
+            if value not in TYPE_CODES_BY_NAME:
+                raise ValueError(f"Type de document inconnu : {value}")
+            codes.add(TYPE_CODES_BY_NAME[value])
+        elif 0 <= value < len(DOC_TYPE_NAMES):
+            codes.add(int(value))
+        else:
+            raise ValueError(f"Type de document inconnu : {value}")
+    return tuple(sorted(codes))
+
+def rows_bitset(rows, n_rows):
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+class SearchFilter:
+    # Critères combinés par ET ; un critère à None laisse passer tous les documents
+    def __init__(self, doc_type=None, since=None, until=None, creator=None, min_comments=None):
+        self.doc_types = filter_type_codes(doc_type)
+        self.since = None if since is None else parse_filter_date(since)
+        self.until = None if until is None else parse_filter_date(until, end=True)
+        self.creators = None if creator is None else ((creator,) if isinstance(creator, str) else tuple(creator))
+        self.min_comments = None if min_comments is None else int(min_comments)
+
+    def key(self):
+        return (self.doc_types, self.since, self.until, self.creators, self.min_comments)
+
+    def __bool__(self):
+        return any(value is not None for value in self.key())
+
+class MetadataIndex:
+    def __init__(self):
+        self.type_codes = array("B")
+        self.epochs = array("q")
+        # 0 pour un horodatage non reconnu : le document est exclu des filtres de date
+        self.dated = array("B")
+        self.comments = array("q")
+        self.authors = Facet()
+        self.author_rows = []
+        # Bitsets et colonnes triées, recalculés à la première recherche après un ajout
+        self.derived = None
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def update(self, documents):
+        # Seuls les documents ajoutés depuis la dernière mise à jour sont lus
+        start = len(self)
+        if start == len(documents):
+            return
+        if isinstance(documents, DocumentStore):
+            # Colonnes déjà encodées par le DocumentStore
+            self.type_codes.extend(documents.type_codes[start:])
+            self.epochs.extend(documents.epochs[start:])
+            self.dated.extend(int(code != RAW_TIMESTAMP) for code in documents.timestamp_formats[start:])
+            self.comments.extend(documents.comments[start:])
+            creators = (documents.creator(index) for index in range(start, len(documents)))
+        else:
+            new_documents = documents[start:]
+            for doc in new_documents:
+                code = document_type_code(doc)
+                epoch, timestamp_format = encode_timestamp(doc.timestamp)
+                self.type_codes.append(code)
+                self.epochs.append(epoch)
+                self.dated.append(int(timestamp_format != RAW_TIMESTAMP))
+                self.comments.append(comment_count(doc))
+            creators = (doc.creators if isinstance(doc, ArxivPaper) else doc.creator for doc in new_documents)
+        for row, creator in enumerate(creators, start):
+            for author in (creator if isinstance(creator, list) else [creator]):
+                author_id = self.authors.add(str(author))
+                if author_id == len(self.author_rows):
+                    self.author_rows.append(array("q"))
+                self.author_rows[author_id].append(row)
+        self.derived = None
+
+    def prepare(self):
+        if self.derived is not None:
+            return self.derived
+        codes = np.array(self.type_codes, dtype=np.uint8)
+        epochs = np.array(self.epochs, dtype=np.int64)
+        comments = np.array(self.comments, dtype=np.int64)
+        dated = np.flatnonzero(np.array(self.dated, dtype=bool))
+        by_epoch = dated[np.argsort(epochs[dated], kind="stable")]
+        by_comments = np.argsort(comments, kind="stable")
+        self.derived = {
+            "types": [np.packbits(codes == code) for code in range(len(DOC_TYPE_NAMES))],
+            "by_epoch": by_epoch,
+            "sorted_epochs": epochs[by_epoch],
+            "by_comments": by_comments,
+            "sorted_comments": comments[by_comments],
+        }
+        return self.derived
+
+    def bitset(self, search_filter):
+        # Intersection des bitsets de chaque critère (8 documents par octet)
+        derived = self.prepare()
+        n_rows = len(self)
+        bits = np.full((n_rows + 7) // 8, 0xFF, dtype=np.uint8)
+        if search_filter.doc_types is not None:
+            allowed = np.zeros_like(bits)
+            for code in search_filter.doc_types:
+                allowed |= derived["types"][code]
+            bits &= allowed
+        if search_filter.creators is not None:
+            author_ids = [self.authors.ids[name] for name in search_filter.creators if name in self.authors.ids]
+            rows = [np.array(self.author_rows[author_id], dtype=np.int64) for author_id in author_ids]
+            bits &= rows_bitset(np.concatenate(rows) if rows else [], n_rows)
+        if search_filter.since is not None or search_filter.until is not None:
+            sorted_epochs = derived["sorted_epochs"]
+            start = 0 if search_filter.since is None else np.searchsorted(sorted_epochs, search_filter.since, "left")
+            stop = len(sorted_epochs) if search_filter.until is None else np.searchsorted(sorted_epochs, search_filter.until, "right")
+            bits &= rows_bitset(derived["by_epoch"][start:stop], n_rows)
+        if search_filter.min_comments is not None:
+            start = np.searchsorted(derived["sorted_comments"], search_filter.min_comments, "left")
+            bits &= rows_bitset(derived["by_comments"][start:], n_rows)
+        return bits
+
+    def rows(self, search_filter):
+        # Indices croissants des documents retenus
+        return np.flatnonzero(np.unpackbits(self.bitset(search_filter), count=len(self)))
@@ -0,0 +1,439 @@
+from datetime import datetime, timezone
+from array import array
+import calendar
+import hashlib
+import os
+import tracemalloc
+from .lazy import np, pd
+
+# ======================
+# Libellés
+# ======================
+# Les libellés visibles (types de documents, descriptions, auteur inconnu)
+# dépendent de la langue de l'interface : un objet Locale les regroupe et se
+# passe explicitement à ce qui affiche des documents (la Version 3 donne FRENCH
+# à SearchApp). Les documents, le CSV, les statistiques et les filtres gardent
+# les libellés anglais, les mêmes quelle que soit la version chargée ; les
+# corpus CSV sont relus quelle que soit la langue de leurs libellés.
+LABELS = {
+    "en": {
+        "types": ["Generic Document", "Reddit Post", "Arxiv Paper"],
+        "description": "{title} created by {creator} on {timestamp} ({doc_type})",
+        "comments": " | Comments: {comments}",
+        "authors": " | Authors: {authors}",
+        "unknown_author": "Unknown",
+    },
+    "fr": {
+        "types": ["Document générique", "Post Reddit", "Article Arxiv"],
+        "description": "{title} créé par {creator} le {timestamp} ({doc_type})",
+        "comments": " | Commentaires : {comments}",
+        "authors": " | Auteurs : {authors}",
+        "unknown_author": "Inconnu",
+    },
+}
+
+class Locale:
+    def __init__(self, language):
+        self.language = language
+        self.labels = LABELS[language]
+        self.types = tuple(self.labels["types"])
+
+    def type_name(self, doc):
+        return self.types[document_type_code(doc)]
+
+    def describe(self, doc):
+        creator = self.labels["unknown_author"] if doc.creator == UNKNOWN_AUTHOR else doc.creator
+        text = self.labels["description"].format(title=doc.title, creator=creator, timestamp=doc.timestamp,
+                                                 doc_type=self.type_name(doc))
+        code = document_type_code(doc)
+        if code == 1:
+            text += self.labels["comments"].format(comments=doc.comments)
+        elif code == 2:
+            text += self.labels["authors"].format(authors=", ".join(doc.creators))
+        return text
+
+ENGLISH = Locale("en")
+FRENCH = Locale("fr")
+# Libellés de type des documents, dans l'ordre des codes de STORED_TYPES
+DOC_TYPE_NAMES = ENGLISH.types
+# Auteur enregistré quand la source n'en donne pas (traduit à l'affichage)
+UNKNOWN_AUTHOR = ENGLISH.labels["unknown_author"]
+
+# ======================
+# Classe BaseDocument
+# ======================
+class BaseDocument:
+    # Attributs déclarés : ni les documents ni les vues du DocumentStore n'ont de __dict__
+    __slots__ = ("title", "creator", "timestamp", "content", "doc_type")
+
+    def __init__(self, title, creator, timestamp, content=""):
+        self.title = title
+        self.creator = creator
+        self.timestamp = timestamp
+        self.content = content
+        self.doc_type = self.identify_type()
+
+    def identify_type(self):
+        return DOC_TYPE_NAMES[0]
+
+    def __str__(self):
+        return ENGLISH.describe(self)
+
+# ======================
+# Classe RedditPost
+# ======================
+class RedditPost(BaseDocument):
+    __slots__ = ("comments", "subreddit")
+
+    def __init__(self, title, creator, timestamp, comments, content="", subreddit=""):
+        super().__init__(title, creator, timestamp, content)
+        self.comments = comments
+        self.subreddit = subreddit
+
+    def identify_type(self):
+        return DOC_TYPE_NAMES[1]
+
+# ======================
+# Classe ArxivPaper
+# ======================
+class ArxivPaper(BaseDocument):
+    __slots__ = ("creators",)
+
+    def __init__(self, title, creators, timestamp, content=""):
+        super().__init__(title, creators, timestamp, content)
+        self.creators = creators
+
+    def identify_type(self):
+        return DOC_TYPE_NAMES[2]
+
+# ======================
+# Classe DocumentStore
+# ======================
+# Stockage en colonnes : un code de type, un horodatage entier et un nombre de
+# commentaires par document dans des tableaux numériques, et les textes dans
+# des tampons UTF-8 indexés par décalage. Aucun objet Python n'est conservé
+# par document ; les accès renvoient des vues légères.
+TIMESTAMP_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d"]
+RAW_TIMESTAMP = 255
+AUTHORS_SEPARATOR = "\x1f"
+
+def encode_timestamp(value):
+    # Horodatage entier (secondes) + code du format d'origine, pour restituer la chaîne à l'identique
+    if isinstance(value, str):
+        for code, timestamp_format in enumerate(TIMESTAMP_FORMATS):
+            try:
+                epoch = calendar.timegm(datetime.strptime(value, timestamp_format).timetuple())
+            except ValueError:
+                continue
+            if decode_timestamp(epoch, code) == value:
+                return epoch, code
+    return 0, RAW_TIMESTAMP
+
+def decode_timestamp(epoch, code):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(TIMESTAMP_FORMATS[code])
+
+class TextColumn:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array("q", [0])
+
+    def append(self, text):
+        self.buffer += text.encode("utf-8")
+        self.offsets.append(len(self.buffer))
+
+    def extend(self, texts):
+        encoded = [text.encode("utf-8") for text in texts]
+        ends = np.cumsum([len(chunk) for chunk in encoded], dtype=np.int64) + len(self.buffer)
+        self.buffer += b"".join(encoded)
+        self.offsets.frombytes(ends.tobytes())
+
+    def values(self, start, stop):
+        return [self[index] for index in range(start, stop)]
+
+    def __getitem__(self, index):
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.itemsize * len(self.offsets)
+
+class StoredFields:
+    # Vue sur une ligne du DocumentStore ; les champs sont lus à la demande. Les
+    # emplacements store et index sont déclarés par chaque classe concrète : une
+    # seule base (la classe de document) peut en déclarer dans un héritage multiple,
+    # et les propriétés ci-dessous, placées avant elle, masquent ses attributs
+    __slots__ = ()
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def title(self):
+        return self.store.titles[self.index]
+
+    @property
+    def creator(self):
+        return self.store.creator(self.index)
+
+    @property
+    def timestamp(self):
+        return self.store.timestamp(self.index)
+
+    @property
+    def epoch(self):
+        return self.store.epochs[self.index]
+
+    @property
+    def content(self):
+        return self.store.contents[self.index]
+
+    @property
+    def doc_type(self):
+        return self.identify_type()
+
+    def __eq__(self, other):
+        if isinstance(other, StoredFields):
+            return self.store is other.store and self.index == other.index
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+class StoredDocument(StoredFields, BaseDocument):
+    __slots__ = ("store", "index")
+
+class StoredRedditPost(StoredFields, RedditPost):
+    __slots__ = ("store", "index")
+
+    @property
+    def comments(self):
+        return self.store.comments[self.index]
+
+    @property
+    def subreddit(self):
+        return self.store.subreddits[self.index]
+
+class StoredArxivPaper(StoredFields, ArxivPaper):
+    __slots__ = ("store", "index")
+
+    @property
+    def creators(self):
+        return self.store.creator(self.index)
+
+# Codes de type internés : l'indice dans cette liste
+STORED_TYPES = [StoredDocument, StoredRedditPost, StoredArxivPaper]
+
+def document_type_code(doc):
+    if isinstance(doc, RedditPost):
+        return 1
+    if isinstance(doc, ArxivPaper):
+        return 2
+    return 0
+
+def comment_count(doc):
+    # Nombre de commentaires d'un post (0 pour les autres documents). Les classes
+    # acceptent toute valeur : une valeur absente ou non numérique compte pour 0,
+    # comme à la relecture d'un corpus CSV
+    if not isinstance(doc, RedditPost):
+        return 0
+    try:
+        return int(doc.comments)
+    except (TypeError, ValueError):
+        return 0
+
+class DocumentStore:
+    def __init__(self, documents=()):
+        self.type_codes = array("B")
+        self.epochs = array("q")
+        self.timestamp_formats = array("B")
+        self.comments = array("q")
+        self.titles = TextColumn()
+        self.creators = TextColumn()
+        self.contents = TextColumn()
+        # Horodatages non reconnus, conservés tels quels (vides sinon)
+        self.raw_timestamps = TextColumn()
+        self.subreddits = TextColumn()
+        self.extend(documents)
+
+    def append(self, doc):
+        code = document_type_code(doc)
+        epoch, timestamp_format = encode_timestamp(doc.timestamp)
+        self.type_codes.append(code)
+        self.epochs.append(epoch)
+        self.timestamp_formats.append(timestamp_format)
+        self.comments.append(comment_count(doc))
+        self.titles.append(doc.title)
+        # Auteur absent (None) : texte vide, pas la chaîne « None »
+        self.creators.append(AUTHORS_SEPARATOR.join(doc.creators) if code == 2 else
+                             "" if doc.creator is None else str(doc.creator))
+        self.contents.append(doc.content)
+        self.raw_timestamps.append(str(doc.timestamp) if timestamp_format == RAW_TIMESTAMP else "")
+        self.subreddits.append(doc.subreddit if code == 1 else "")
+
+    def extend(self, documents):
+        for doc in documents:
+            self.append(doc)
+
+    def frame(self, start=0, stop=None):
+        # Tranche des colonnes natives (codes, horodatages entiers, textes bruts)
+        stop = len(self) if stop is None else min(stop, len(self))
+        return pd.DataFrame({
+            "type": np.array(self.type_codes[start:stop], dtype=np.uint8),
+            "epoch": np.array(self.epochs[start:stop], dtype=np.int64),
+            "timestamp_format": np.array(self.timestamp_formats[start:stop], dtype=np.uint8),
+            "comments": np.array(self.comments[start:stop], dtype=np.int64),
+            "title": self.titles.values(start, stop),
+            "creator": self.creators.values(start, stop),
+            "content": self.contents.values(start, stop),
+            "raw_timestamp": self.raw_timestamps.values(start, stop),
+            "subreddit": self.subreddits.values(start, stop),
+        })
+
+    def extend_frame(self, frame):
+        # Ajout en bloc de colonnes produites par frame() : aucun document n'est reconstruit
+        self.type_codes.frombytes(frame["type"].to_numpy(dtype=np.uint8).tobytes())
+        self.epochs.frombytes(frame["epoch"].to_numpy(dtype=np.int64).tobytes())
+        self.timestamp_formats.frombytes(frame["timestamp_format"].to_numpy(dtype=np.uint8).tobytes())
+        self.comments.frombytes(frame["comments"].to_numpy(dtype=np.int64).tobytes())
+        self.titles.extend(frame["title"])
+        self.creators.extend(frame["creator"])
+        self.contents.extend(frame["content"])
+        self.raw_timestamps.extend(frame["raw_timestamp"])
+        # Corpus enregistrés avant l'ajout du subreddit : colonne absente
+        self.subreddits.extend(frame["subreddit"] if "subreddit" in frame else [""] * len(frame))
+
+    def creator(self, index):
+        creator = self.creators[index]
+        if self.type_codes[index] == 2:
+            return creator.split(AUTHORS_SEPARATOR) if creator else []
+        return creator or None
+
+    def timestamp(self, index):
+        if self.timestamp_formats[index] == RAW_TIMESTAMP:
+            return self.raw_timestamps[index]
+        return decode_timestamp(self.epochs[index], self.timestamp_formats[index])
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("indice de document hors limites")
+        return STORED_TYPES[self.type_codes[index]](self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield STORED_TYPES[self.type_codes[index]](self, index)
+
+    def fingerprint(self, stop=None):
+        # Empreinte des `stop` premiers documents, calculée sur les octets des colonnes
+        writer = DocumentStoreWriter()
+        writer.write(self, stop)
+        return writer.fingerprint()
+
+    def save(self, path):
+        writer = DocumentStoreWriter(path)
+        try:
+            writer.write(self)
+        finally:
+            writer.close()
+        return writer.fingerprint()
+
+    @classmethod
+    def load(cls, path):
+        # Relecture des colonnes d'un seul bloc chacune : aucun texte n'est décodé
+        store = cls()
+        for name in STORE_NUMERIC_COLUMNS:
+            with open(os.path.join(path, name + ".bin"), "rb") as f:
+                getattr(store, name).frombytes(f.read())
+        for name in STORE_TEXT_COLUMNS:
+            column = getattr(store, name)
+            with open(os.path.join(path, name + ".bin"), "rb") as f:
+                column.buffer = bytearray(f.read())
+            with open(os.path.join(path, name + ".offsets.bin"), "rb") as f:
+                column.offsets.frombytes(f.read())
+        return store
+
+    def nbytes(self):
+        numeric = sum(column.itemsize * len(column) for column in (self.type_codes, self.epochs, self.timestamp_formats, self.comments))
+        return numeric + sum(column.nbytes() for column in (self.titles, self.creators, self.contents, self.raw_timestamps, self.subreddits))
+
+# ======================
+# Enregistrement d'un DocumentStore
+# ======================
+# Chaque colonne est écrite telle quelle dans un fichier binaire (les textes avec
+# leurs décalages de fin) ; l'écriture peut se faire en plusieurs paquets. Les
+# octets écrits sont hachés au passage : l'empreinte d'un corpus ne dépend que de
+# ses colonnes et se recalcule sans reconstruire aucun document.
+STORE_NUMERIC_COLUMNS = ("type_codes", "epochs", "timestamp_formats", "comments")
+STORE_TEXT_COLUMNS = ("titles", "creators", "contents", "raw_timestamps", "subreddits")
+STORE_FILES = STORE_NUMERIC_COLUMNS + STORE_TEXT_COLUMNS + tuple(name + ".offsets" for name in STORE_TEXT_COLUMNS)
+
+class DocumentStoreWriter:
+    # Sans chemin, seule l'empreinte est calculée
+    def __init__(self, path=None):
+        self.files = {}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self.files = {name: open(os.path.join(path, name + ".bin"), "wb") for name in STORE_FILES}
+        self.digests = {name: hashlib.sha256() for name in STORE_FILES}
+        self.text_sizes = dict.fromkeys(STORE_TEXT_COLUMNS, 0)
+        self.count = 0
+
+    def write(self, store, stop=None):
+        stop = len(store) if stop is None else min(stop, len(store))
+        for name in STORE_NUMERIC_COLUMNS:
+            self.emit(name, getattr(store, name)[:stop].tobytes())
+        for name in STORE_TEXT_COLUMNS:
+            column = getattr(store, name)
+            size = column.offsets[stop]
+            self.emit(name, column.buffer[:size])
+            # Décalages de fin, relatifs au début du fichier
+            ends = np.frombuffer(column.offsets, dtype=np.int64)[1:stop + 1] + self.text_sizes[name]
+            self.emit(name + ".offsets", ends.tobytes())
+            self.text_sizes[name] += size
+        self.count += stop
+
+    def emit(self, name, data):
+        self.digests[name].update(data)
+        if name in self.files:
+            self.files[name].write(data)
+
+    def fingerprint(self):
+        digest = hashlib.sha256(str(self.count).encode("ascii"))
+        for name in STORE_FILES:
+            digest.update(self.digests[name].digest())
+        return digest.hexdigest()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+def synthetic_documents(n_documents):
+    for i in range(n_documents):
+        if i % 2:
+            yield RedditPost(f"Post {i}", f"user_{i % 500}", "2025-01-01 10:00:00", i % 300,
+                             f"Post {i} - contenu du post numéro {i}")
+        else:
+            yield ArxivPaper(f"Article {i}", [f"Auteur {i % 700}", f"Auteur {i % 300}"], "2025-01-01T00:00:00Z",
+                             f"Résumé de l'article numéro {i}")
+
+def benchmark_document_memory(n_documents=100000):
+    # Mémoire occupée par n documents : liste d'objets contre DocumentStore
+    tracemalloc.start()
+    documents = list(synthetic_documents(n_documents))
+    objects_bytes = tracemalloc.get_traced_memory()[0]
+    del documents
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = DocumentStore(synthetic_documents(n_documents))
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return {"documents": n_documents, "objects_bytes": objects_bytes, "store_bytes": store_bytes,
+            "ratio": objects_bytes / max(store_bytes, 1)}
@@ -0,0 +1,1229 @@
+import json
+import threading
+import time
+import tempfile
+import shutil
+import multiprocessing
+import weakref
+import re
+import os
+import bisect
+from collections import Counter, OrderedDict
+import itertools
+from .lazy import np, sparse, sklearn_text, sklearn_preprocessing
+from .metrics import METRICS
+from .documents import RedditPost, document_type_code, DocumentStore, DocumentStoreWriter
+from .corpus import FILTER_SLICE_RATIO, MetadataIndex
+
+# ======================
+# Classe SearchEngine
+# ======================
+INDEX_FORMAT_VERSION = 2
+INDEX_PATH = "search_index"
+# Colonnes binaires du DocumentStore, à côté de la matrice
+DOCUMENTS_DIRECTORY = "documents"
+
+def index_scoring(path):
+    # Modèle de pondération d'un index enregistré (les index antérieurs sont en TF-IDF)
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        return json.load(f).get("scoring", SearchEngine.SCORING)
+
+def corpus_fingerprint(documents, stop=None):
+    # Empreinte des `stop` premiers documents, sur les colonnes d'un DocumentStore
+    # (tout autre conteneur y est d'abord recopié)
+    if not isinstance(documents, DocumentStore):
+        documents = DocumentStore(itertools.islice(documents, stop))
+    return documents.fingerprint(stop)
+
+# Nom exporté pour chaque code de type : un document lu dans un DocumentStore
+# (classe Stored...) est exporté sous le nom de la classe d'origine
+DOCUMENT_CLASS_NAMES = ["BaseDocument", "RedditPost", "ArxivPaper"]
+
+def document_to_dict(doc):
+    record = {"class": DOCUMENT_CLASS_NAMES[document_type_code(doc)], "title": doc.title, "creator": doc.creator,
+              "timestamp": doc.timestamp, "content": doc.content}
+    if isinstance(doc, RedditPost):
+        record["comments"] = doc.comments
+        record["subreddit"] = doc.subreddit
+    return record
+
+def build_vectorizer(vocabulary, idf):
+    # Vectoriseur prêt à l'emploi à partir d'un vocabulaire et d'IDF déjà calculés
+    vectorizer = sklearn_text.TfidfVectorizer()
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.idf_ = idf
+    return vectorizer
+
+def rebuild_vectorizer(vectorizer, idf, copy_vocabulary=False):
+    # Même espace de termes (vocabulaire ou hachage), nouveaux IDF ; avec
+    # copy_vocabulary, le vocabulaire n'est plus partagé avec l'ancien vectoriseur
+    if isinstance(vectorizer, HashingTfidfVectorizer):
+        return HashingTfidfVectorizer(vectorizer.n_features, idf)
+    vocabulary = dict(vectorizer.vocabulary_) if copy_vocabulary else vectorizer.vocabulary_
+    if not isinstance(vectorizer, sklearn_text.TfidfVectorizer):
+        # Vectoriseur de comptes (BM25F)
+        return build_count_vectorizer(vocabulary, idf)
+    return build_vectorizer(vocabulary, idf)
+
+def smooth_idf(doc_freq, n_docs):
+    # Même formule que TfidfVectorizer(smooth_idf=True)
+    return np.log((1 + n_docs) / (1 + doc_freq)) + 1
+
+def grow(buffer, size):
+    # Réallocation par doublement : coût amorti O(1) par élément ajouté
+    if size <= len(buffer):
+        return buffer
+    grown = np.empty(max(size, 2 * len(buffer)), dtype=buffer.dtype)
+    grown[:len(buffer)] = buffer
+    return grown
+
+def save_array(path, name, array):
+    # Écriture dans un fichier temporaire puis remplacement : un index encore
+    # mappé en mémoire par un autre moteur garde l'ancien fichier intact
+    tmp_path = os.path.join(path, name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, os.path.join(path, name))
+
+def top_k(scores, limit):
+    # Sélection partielle des `limit` meilleurs scores positifs, puis tri de ces
+    # seuls candidats (à score égal, l'ordre du corpus est conservé)
+    positive = np.flatnonzero(scores > 0)
+    if limit < len(positive):
+        threshold = -np.partition(-scores[positive], limit - 1)[limit - 1]
+        candidates = positive[scores[positive] >= threshold]
+    else:
+        candidates = positive
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:limit]], len(positive)
+
+def row_scores(matrix, query_vec, rows=None):
+    # Similarité cosinus de la requête avec les lignes de la matrice (toutes, ou celles de rows)
+    if rows is None or len(rows) > FILTER_SLICE_RATIO * matrix.shape[0]:
+        scores = (matrix @ query_vec.T).toarray().ravel()
+        return scores if rows is None else scores[rows]
+    # Filtre sélectif : seules les lignes retenues sont multipliées
+    return (matrix[rows] @ query_vec.T).toarray().ravel()
+
+def batch_top_k(query_matrix, term_matrix, k, rows=None, added=None):
+    # Meilleurs documents de chaque requête d'un paquet, en un seul produit creux
+    # (requêtes x documents) ; rows restreint les résultats à ces documents, added
+    # porte les documents suivants (lignes ajoutées depuis la transposition)
+    scores = query_matrix @ term_matrix
+    if added is not None and added.shape[1]:
+        scores = sparse.hstack([scores, query_matrix @ added])
+    scores = scores.tocsr()
+    scores.sort_indices()
+    allowed = None
+    if rows is not None:
+        allowed = np.zeros(scores.shape[1], dtype=bool)
+        allowed[rows] = True
+    results = []
+    for row in range(scores.shape[0]):
+        # Seuls les documents partageant un terme avec la requête sont présents
+        row_slice = slice(scores.indptr[row], scores.indptr[row + 1])
+        doc_ids, scores_row = scores.indices[row_slice], scores.data[row_slice]
+        if allowed is not None:
+            kept = allowed[doc_ids]
+            doc_ids, scores_row = doc_ids[kept], scores_row[kept]
+        selected, total = top_k(scores_row, k)
+        results.append((doc_ids[selected].astype(np.int64), scores_row[selected], total))
+    return results
+
+class ResultPage:
+    def __init__(self, documents, indices, scores, total, offset=0):
+        self.documents = documents
+        self.indices = indices
+        self.scores = scores
+        self.total = total
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        for i, score in zip(self.indices, self.scores):
+            yield self.documents[i], score
+
+    def __getitem__(self, position):
+        return self.documents[self.indices[position]], self.scores[position]
+
+    def has_next(self):
+        return self.offset + len(self) < self.total
+
+class QueryCache:
+    # Cache LRU des pages de résultats, vidé dès que la génération de l'index change
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, generation):
+        if generation != self.generation:
+            self.entries.clear()
+            self.generation = generation
+        page = self.entries.get(key)
+        if page is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return page
+
+    def put(self, key, page):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = page
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+# Dernier mot de la saisie, complété par préfixe tant qu'aucun séparateur ne le suit
+PARTIAL_TOKEN = re.compile(r"\w+$")
+MAX_EXPANSIONS = 50
+
+class PrefixIndex:
+    # Vocabulaire trié : les termes commençant par un préfixe forment une plage
+    # contiguë, trouvée par dichotomie
+    def __init__(self, vocabulary, doc_freq):
+        self.terms = sorted(vocabulary)
+        self.term_ids = np.array([vocabulary[term] for term in self.terms], dtype=np.int64)
+        self.doc_freq = doc_freq
+
+    def complete(self, prefix, limit=MAX_EXPANSIONS):
+        # Identifiants des termes complétant le préfixe, les plus fréquents d'abord
+        start = bisect.bisect_left(self.terms, prefix)
+        stop = bisect.bisect_left(self.terms, prefix + "\U0010ffff", start)
+        ids = self.term_ids[start:stop]
+        if limit < len(ids):
+            ids = ids[np.argpartition(-self.doc_freq[ids], limit - 1)[:limit]]
+        return ids[np.argsort(-self.doc_freq[ids], kind="stable")]
+
+    def update(self, vocabulary, doc_freq):
+        # Termes ajoutés depuis (count_rows les ajoute en fin de vocabulaire), insérés à leur rang
+        new_terms = sorted(itertools.islice(vocabulary, len(self.terms), None))
+        positions = [bisect.bisect_left(self.terms, term) for term in new_terms]
+        self.term_ids = np.insert(self.term_ids, positions, [vocabulary[term] for term in new_terms])
+        for shift, (position, term) in enumerate(zip(positions, new_terms)):
+            self.terms.insert(position + shift, term)
+        self.doc_freq = doc_freq
+
+def term_postings(state, term):
+    # Documents et poids d'un terme : liste de la matrice transposée, puis celle des lignes ajoutées depuis
+    matrix, added = state["term_matrix"], state["added"]
+    row = slice(matrix.indptr[term], matrix.indptr[term + 1])
+    docs, weights = matrix.indices[row], matrix.data[row]
+    if added.nnz:
+        row = slice(added.indptr[term], added.indptr[term + 1])
+        docs = np.concatenate([docs, added.indices[row] + matrix.shape[1]])
+        weights = np.concatenate([weights, added.data[row]])
+    return docs, weights
+
+class SearchEngine:
+    # Modèle de pondération des lignes de doc_matrix, enregistré avec l'index
+    SCORING = "tfidf"
+
+    def __init__(self, documents, vectorizer=None, doc_matrix=None, compaction_ratio=0.1, cache_size=128):
+        # Le conteneur (liste ou DocumentStore) est partagé, pas copié
+        self.documents = documents if hasattr(documents, "extend") else list(documents)
+        if vectorizer is None:
+            self.vectorizer = sklearn_text.TfidfVectorizer()
+            with METRICS.timer("index_fit_seconds"):
+                self.doc_matrix = self.vectorizer.fit_transform([doc.content for doc in self.documents])
+        else:
+            # Index déjà construit (voir SearchEngine.load)
+            self.vectorizer = vectorizer
+            self.doc_matrix = doc_matrix
+
+        # Statistiques pour l'indexation incrémentale (initialisées au premier ajout)
+        self.compaction_ratio = compaction_ratio
+        self.added_since_compaction = 0
+        self.compactions = 0
+        self.doc_freq = None
+        self.buffers = None
+
+        # Toute modification des poids change la génération et invalide le cache
+        self.generation = 0
+        self.cache = QueryCache(cache_size)
+        # Structures de la recherche pendant la saisie (construites à la première frappe)
+        self.typing_state = None
+        # Métadonnées des filtres (construites au premier filtre)
+        self.metadata_index = None
+
+    def query_key(self, query):
+        # Clé indépendante de la casse, des espaces et de l'ordre des termes :
+        # le vecteur TF-IDF ne dépend que du multiensemble de jetons analysés
+        return tuple(sorted(Counter(self.vectorizer.build_analyzer()(query)).items()))
+
+    def search(self, query, k=10, offset=0, filters=None):
+        with METRICS.timer("search_seconds", engine=type(self).__name__):
+            key = (self.query_key(query), k, offset, filters.key() if filters else None)
+            page = self.cache.get(key, self.generation)
+            METRICS.count("search_cache_total", result="miss" if page is None else "hit")
+            if page is None:
+                with METRICS.timer("search_stage_seconds", stage="filter"):
+                    rows = self.filter_rows(filters)
+                page = self.rank(query, k, offset, rows)
+                self.cache.put(key, page)
+            return page
+
+    def filter_rows(self, filters):
+        # Lignes retenues par le filtre (None : pas de filtre)
+        if not filters:
+            return None
+        if self.metadata_index is None:
+            self.metadata_index = MetadataIndex()
+        self.metadata_index.update(self.documents)
+        rows = self.metadata_index.rows(filters)
+        # Documents déjà dans le conteneur partagé mais pas encore indexés
+        return rows[:np.searchsorted(rows, self.doc_matrix.shape[0])]
+
+    def rank(self, query, k, offset, rows=None):
+        with METRICS.timer("search_stage_seconds", stage="transform"):
+            query_vec = self.vectorizer.transform([query])
+        # Les lignes TF-IDF sont déjà normalisées (L2) : le produit scalaire
+        # donne directement la similarité cosinus
+        with METRICS.timer("search_stage_seconds", stage="similarity"):
+            similarity_scores = row_scores(self.doc_matrix, query_vec, rows)
+        with METRICS.timer("search_stage_seconds", stage="sort"):
+            selected, total = top_k(similarity_scores, offset + k)
+        selected = selected[offset:]
+        indices = selected if rows is None else rows[selected]
+        return ResultPage(self.documents, indices, similarity_scores[selected], total, offset)
+
+    def search_many(self, queries, k=10, chunk_size=256, filters=None):
+        # Toutes les requêtes sont vectorisées en une fois puis évaluées par
+        # paquets avec un seul produit creux (requêtes x documents), sur la
+        # matrice termes x documents déjà transposée pour la recherche pendant la saisie
+        METRICS.count("search_batch_queries_total", len(queries))
+        query_matrix = self.vectorizer.transform(queries)
+        state = self.typing_index()
+        rows = self.filter_rows(filters)
+        pages = []
+        for start in range(0, query_matrix.shape[0], chunk_size):
+            for doc_ids, scores, total in batch_top_k(query_matrix[start:start + chunk_size], state["term_matrix"], k, rows,
+                                                      state["added"]):
+                pages.append(ResultPage(self.documents, doc_ids, scores, total))
+        return pages
+
+    def matches(self, query, filters=None):
+        # Tous les documents de score non nul (ceux qui partagent un terme avec la requête),
+        # par exemple pour compter les facettes de l'ensemble des résultats
+        terms = self.vectorizer.transform([query]).indices
+        state = self.typing_index()
+        if not len(terms):
+            return np.empty(0, dtype=np.int64)
+        matched = np.unique(np.concatenate([term_postings(state, term)[0] for term in terms]))
+        rows = self.filter_rows(filters)
+        return matched if rows is None else np.intersect1d(matched, rows, assume_unique=True)
+
+    # ----------------------
+    # Recherche pendant la saisie
+    # ----------------------
+    def typing_index(self):
+        # Matrice termes x documents et index des préfixes. Seule une compaction (poids
+        # de toutes les lignes modifiés) impose de tout transposer de nouveau ; après
+        # un ajout, seules les lignes ajoutées depuis sont transposées (added) et les
+        # nouveaux termes insérés dans l'index des préfixes
+        state = self.typing_state
+        if state is not None and state["generation"] == self.generation:
+            return state
+        n_terms = self.doc_matrix.shape[1]
+        if state is None or state["compactions"] != self.compactions:
+            term_matrix = self.doc_matrix.T.tocsr()
+            hashed = isinstance(self.vectorizer, HashingTfidfVectorizer)
+            state = {
+                "compactions": self.compactions,
+                "term_matrix": term_matrix,
+                "added": sparse.csr_matrix((n_terms, 0)),
+                # Termes hachés : aucun mot à compléter
+                "prefixes": None if hashed else PrefixIndex(self.vectorizer.vocabulary_, np.diff(term_matrix.indptr)),
+            }
+        else:
+            term_matrix = state["term_matrix"]
+            if term_matrix.shape[0] < n_terms:
+                # Nouveaux termes : listes vides dans la matrice transposée
+                indptr = np.concatenate([term_matrix.indptr, np.full(n_terms - term_matrix.shape[0], term_matrix.indptr[-1],
+                                                                     dtype=term_matrix.indptr.dtype)])
+                term_matrix = sparse.csr_matrix((term_matrix.data, term_matrix.indices, indptr),
+                                                shape=(n_terms, term_matrix.shape[1]), copy=False)
+                state["term_matrix"] = term_matrix
+            state["added"] = self.doc_matrix[term_matrix.shape[1]:].T.tocsr()
+            if state["prefixes"] is not None:
+                state["prefixes"].update(self.vectorizer.vocabulary_,
+                                         np.diff(term_matrix.indptr) + np.diff(state["added"].indptr))
+        state["generation"] = self.generation
+        state["completed"] = None
+        self.typing_state = state
+        return state
+
+    def completed_scores(self, state, text):
+        # Produits scalaires des documents avec les mots terminés (TF x IDF, non normalisé) ;
+        # le vecteur est conservé d'une frappe à l'autre tant que ces mots ne changent pas
+        vocabulary, idf = self.vectorizer.vocabulary_, self.vectorizer.idf_
+        counts = Counter(term for term in self.vectorizer.build_analyzer()(text) if term in vocabulary)
+        key = tuple(sorted(counts.items()))
+        if state["completed"] is None or state["completed"]["key"] != key:
+            weights = {vocabulary[term]: count * idf[vocabulary[term]] for term, count in counts.items()}
+            scores = np.zeros(self.doc_matrix.shape[0])
+            for term, weight in weights.items():
+                docs, term_weights = term_postings(state, term)
+                scores[docs] += weight * term_weights
+            state["completed"] = {"key": key, "scores": scores, "weights": weights,
+                                  "norm_sq": sum(weight * weight for weight in weights.values())}
+        return state["completed"]
+
+    def search_incremental(self, text, k=10, offset=0, max_expansions=MAX_EXPANSIONS, filters=None):
+        # Similarité cosinus entre chaque document et la requête « mots terminés + meilleure
+        # complétion du dernier mot » ; sans mot partiel, le résultat est celui de search()
+        METRICS.count("search_incremental_total")
+        state = self.typing_index()
+        if state["prefixes"] is None:
+            return self.search(text, k, offset, filters)
+        partial = PARTIAL_TOKEN.search(text)
+        completed = self.completed_scores(state, text[:partial.start()] if partial else text)
+        base, norm_sq = completed["scores"], completed["norm_sq"]
+        expansions = state["prefixes"].complete(partial.group().lower(), max_expansions) if partial else []
+
+        if len(expansions) == 0:
+            scores = base / np.sqrt(norm_sq) if norm_sq else np.zeros(len(base))
+        else:
+            term_idf = self.vectorizer.idf_[expansions]
+            # Norme de la requête complétée par chacun des termes candidats
+            overlap = np.array([completed["weights"].get(term, 0.0) for term in expansions])
+            norms = np.sqrt(norm_sq + 2 * overlap * term_idf + term_idf ** 2)
+            scores = base / norms.min()
+            for term, weight, norm in zip(expansions, term_idf, norms):
+                docs, term_weights = term_postings(state, term)
+                scores[docs] = np.maximum(scores[docs], (base[docs] + weight * term_weights) / norm)
+        rows = self.filter_rows(filters)
+        if rows is not None:
+            scores = scores[rows]
+        selected, total = top_k(scores, offset + k)
+        selected = selected[offset:]
+        indices = selected if rows is None else rows[selected]
+        return ResultPage(self.documents, indices, scores[selected], total, offset)
+
+    # ----------------------
+    # Indexation incrémentale
+    # ----------------------
+    def add_documents(self, documents, stored=False):
+        documents = list(documents)
+        if not documents:
+            return
+        with METRICS.timer("index_add_seconds"):
+            self._add_documents(documents, stored)
+
+    def count_rows(self, texts):
+        # Comptes de termes des nouveaux textes ; le vocabulaire s'étend aux termes inconnus
+        if isinstance(self.vectorizer, HashingTfidfVectorizer):
+            return self.vectorizer.counts(texts)
+        analyzer = self.vectorizer.build_analyzer()
+        vocabulary = self.vectorizer.vocabulary_
+        rows, cols, counts = [], [], []
+        for row, text in enumerate(texts):
+            for term, count in Counter(analyzer(text)).items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+        return sparse.csr_matrix((np.array(counts, dtype=np.float64), (rows, cols)),
+                                 shape=(len(texts), len(vocabulary)))
+
+    def _add_documents(self, documents, stored):
+        self._prepare_incremental()
+
+        n_terms = self.doc_matrix.shape[1]
+        new_rows = self.count_rows([doc.content for doc in documents])
+
+        if not stored:
+            self.documents.extend(documents)
+        n_docs = len(self.documents)
+        idf = self._extend_statistics(new_rows, n_terms, smooth_idf)
+
+        new_rows.data *= idf[new_rows.indices]
+        sklearn_preprocessing.normalize(new_rows, copy=False)
+        self._append_rows(new_rows)
+
+        self.generation += 1
+        self.added_since_compaction += len(documents)
+        if self.added_since_compaction > self.compaction_ratio * n_docs:
+            self.compact()
+
+    def _extend_statistics(self, new_rows, n_terms, idf_function):
+        # Fréquences documentaires des nouvelles lignes (déjà ajoutées à self.documents)
+        # et IDF courants ; chaque couple (ligne, terme) de new_rows est unique
+        n_total = new_rows.shape[1]
+        idf_buffer, df_buffer = self.buffers["idf"], self.buffers["doc_freq"]
+        df_buffer = grow(df_buffer, n_total)
+        df_buffer[n_terms:n_total] = 0
+        np.add.at(df_buffer, new_rows.indices, 1)
+        self.doc_freq = df_buffer[:n_total]
+
+        # Les lignes existantes gardent leurs poids ; seuls les nouveaux termes
+        # reçoivent un IDF calculé sur les statistiques actuelles
+        idf_buffer = grow(idf_buffer, n_total)
+        idf_buffer[n_terms:n_total] = idf_function(self.doc_freq[n_terms:], len(self.documents))
+        self.buffers["idf"], self.buffers["doc_freq"] = idf_buffer, df_buffer
+        idf = idf_buffer[:n_total]
+        self.vectorizer = rebuild_vectorizer(self.vectorizer, idf)
+        return idf
+
+    def compact(self):
+        # Repondération de toutes les lignes avec les IDF exacts du corpus courant :
+        # le résultat est identique à un réentraînement complet
+        METRICS.count("index_compactions_total")
+        self._prepare_incremental()
+        idf = self.buffers["idf"][:self.doc_matrix.shape[1]]
+        exact_idf = smooth_idf(self.doc_freq, len(self.documents))
+        self.doc_matrix.data *= (exact_idf / idf)[self.doc_matrix.indices]
+        sklearn_preprocessing.normalize(self.doc_matrix, copy=False)
+        idf[:] = exact_idf
+        self.vectorizer = rebuild_vectorizer(self.vectorizer, idf)
+        self.added_since_compaction = 0
+        self.compactions += 1
+        self.generation += 1
+
+    def _prepare_incremental(self):
+        if self.buffers is not None:
+            return
+        # Copie unique des tableaux (éventuellement mappés en lecture seule, ou
+        # partagés avec un moteur créé par from_engine) dans des tampons
+        # extensibles, et du vocabulaire, que count_rows étend sur place
+        matrix = self.doc_matrix.tocsr()
+        n_terms = matrix.shape[1]
+        self.buffers = {
+            "data": np.array(matrix.data, dtype=np.float64),
+            "indices": np.array(matrix.indices),
+            "indptr": np.array(matrix.indptr),
+            "idf": np.array(self.vectorizer.idf_, dtype=np.float64),
+            "doc_freq": np.bincount(matrix.indices, minlength=n_terms),
+        }
+        self.doc_freq = self.buffers["doc_freq"][:n_terms]
+        self.vectorizer = rebuild_vectorizer(self.vectorizer, self.buffers["idf"][:n_terms], copy_vocabulary=True)
+        self._append_rows(sparse.csr_matrix((0, n_terms)))
+
+    def _append_rows(self, new_rows):
+        n_rows = self.doc_matrix.shape[0]
+        nnz = int(self.buffers["indptr"][n_rows])
+        new_nnz = nnz + new_rows.nnz
+        new_n_rows = n_rows + new_rows.shape[0]
+
+        data = grow(self.buffers["data"], new_nnz)
+        indices = grow(self.buffers["indices"], new_nnz)
+        indptr = grow(self.buffers["indptr"], new_n_rows + 1)
+        data[nnz:new_nnz] = new_rows.data
+        indices[nnz:new_nnz] = new_rows.indices
+        indptr[n_rows + 1:new_n_rows + 1] = new_rows.indptr[1:] + nnz
+        self.buffers.update(data=data, indices=indices, indptr=indptr)
+
+        # Vues sur les tampons : aucune copie de la matrice existante
+        self.doc_matrix = sparse.csr_matrix(
+            (data[:new_nnz], indices[:new_nnz], indptr[:new_n_rows + 1]),
+            shape=(new_n_rows, new_rows.shape[1]), copy=False)
+
+    # ----------------------
+    # Persistance de l'index sur disque
+    # ----------------------
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        matrix = self.doc_matrix.tocsr()
+        save_array(path, "data.npy", matrix.data)
+        save_array(path, "indices.npy", matrix.indices)
+        save_array(path, "indptr.npy", matrix.indptr)
+        save_array(path, "idf.npy", self.vectorizer.idf_)
+        hashed = isinstance(self.vectorizer, HashingTfidfVectorizer)
+        if not hashed:
+            terms = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+            save_array(path, "terms.npy", np.array(terms, dtype=str))
+        store = self.documents if isinstance(self.documents, DocumentStore) else DocumentStore(self.documents)
+        fingerprint = store.save(os.path.join(path, DOCUMENTS_DIRECTORY))
+        # Le fichier meta.json est écrit en dernier : sa présence marque un index complet
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "shape": list(matrix.shape),
+            "fingerprint": fingerprint,
+            "scoring": self.SCORING,
+        }
+        if hashed:
+            meta["n_features"] = self.vectorizer.n_features
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def from_engine(cls, engine):
+        # Réutilise les poids déjà calculés par un autre moteur du même modèle ;
+        # sinon, l'index est reconstruit
+        if engine.SCORING != cls.SCORING:
+            return cls(engine.documents, compaction_ratio=engine.compaction_ratio, cache_size=engine.cache.maxsize)
+        # Les deux moteurs partagent désormais matrice, IDF et vocabulaire : chacun
+        # en fait sa propre copie avant de les modifier (voir _prepare_incremental)
+        engine.buffers = None
+        return cls(engine.documents, vectorizer=engine.vectorizer, doc_matrix=engine.doc_matrix,
+                   compaction_ratio=engine.compaction_ratio, cache_size=engine.cache.maxsize)
+
+    @classmethod
+    def load(cls, path, documents=None, mmap=True):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["format_version"] != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Version d'index non supportée : {meta['format_version']}")
+        if meta.get("scoring", SearchEngine.SCORING) != cls.SCORING:
+            raise ValueError(f"L'index enregistré utilise un autre classement : {meta.get('scoring', SearchEngine.SCORING)}")
+
+        if documents is None:
+            documents = DocumentStore.load(os.path.join(path, DOCUMENTS_DIRECTORY))
+        # Nombre de documents (lignes de la matrice), puis empreinte des colonnes
+        elif len(documents) != meta["shape"][0] or corpus_fingerprint(documents) != meta["fingerprint"]:
+            raise ValueError("L'index enregistré ne correspond pas au corpus actuel")
+
+        mmap_mode = "r" if mmap else None
+        data = np.load(os.path.join(path, "data.npy"), mmap_mode=mmap_mode)
+        indices = np.load(os.path.join(path, "indices.npy"), mmap_mode=mmap_mode)
+        indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode=mmap_mode)
+        doc_matrix = sparse.csr_matrix((data, indices, indptr), shape=tuple(meta["shape"]), copy=False)
+
+        idf = np.load(os.path.join(path, "idf.npy"))
+        if "n_features" in meta:
+            vectorizer = HashingTfidfVectorizer(meta["n_features"], idf)
+        else:
+            terms = np.load(os.path.join(path, "terms.npy"))
+            vectorizer = cls.restore_vectorizer({term: i for i, term in enumerate(terms.tolist())}, idf)
+        return cls(documents, vectorizer=vectorizer, doc_matrix=doc_matrix)
+
+    @classmethod
+    def restore_vectorizer(cls, vocabulary, idf):
+        return build_vectorizer(vocabulary, idf)
+
+# ======================
+# Classe InvertedIndexEngine
+# ======================
+POSTINGS_BLOCK_SIZE = 64
+
+class InvertedIndexEngine(SearchEngine):
+    # Moteur à index inversé : mêmes poids TF-IDF que SearchEngine, mais chaque
+    # terme garde sa liste de documents triée par impact décroissant. La
+    # recherche avance bloc par bloc dans les listes des seuls termes de la
+    # requête et s'arrête dès que le k-ième meilleur score dépasse la borne
+    # supérieure des documents encore non vus (algorithme à seuil, type MaxScore).
+    # Les tableaux de travail sont partagés : une même instance ne doit pas
+    # servir plusieurs recherches en parallèle.
+    def __init__(self, documents, vectorizer=None, doc_matrix=None, compaction_ratio=0.1, cache_size=128):
+        super().__init__(documents, vectorizer, doc_matrix, compaction_ratio, cache_size)
+        self.postings = None
+
+    def add_documents(self, documents, stored=False):
+        super().add_documents(documents, stored)
+        self.postings = None
+
+    def compact(self):
+        super().compact()
+        self.postings = None
+
+    def build_postings(self):
+        csc = self.doc_matrix.tocsc()
+        term_ids = np.repeat(np.arange(csc.shape[1]), np.diff(csc.indptr))
+        # Par terme : poids décroissant, puis ordre du corpus
+        order = np.lexsort((csc.indices, -csc.data, term_ids))
+        self.postings = {
+            "indptr": csc.indptr,
+            "docs": csc.indices[order],
+            "weights": csc.data[order],
+        }
+        self.seen_marks = np.zeros(csc.shape[0], dtype=np.int64)
+        self.count_marks = np.zeros(csc.shape[0], dtype=bool)
+        self.query_stamp = 0
+
+    def rank(self, query, k, offset, rows=None):
+        if rows is not None and len(rows) <= FILTER_SLICE_RATIO * self.doc_matrix.shape[0]:
+            # Filtre sélectif : scorer directement les lignes retenues coûte moins que
+            # parcourir des listes dont la plupart des documents seraient écartés
+            return super().rank(query, k, offset, rows)
+        if self.postings is None:
+            self.build_postings()
+        allowed = None
+        if rows is not None:
+            allowed = np.zeros(self.doc_matrix.shape[0], dtype=bool)
+            allowed[rows] = True
+        with METRICS.timer("search_stage_seconds", stage="transform"):
+            query_vec = self.vectorizer.transform([query]).tocsr()
+        with METRICS.timer("search_stage_seconds", stage="postings"):
+            terms, query_weights = query_vec.indices, query_vec.data
+            indptr, docs, weights = self.postings["indptr"], self.postings["docs"], self.postings["weights"]
+            starts, ends = indptr[terms].astype(np.int64), indptr[terms + 1].astype(np.int64)
+            block_sizes = np.full(len(terms), POSTINGS_BLOCK_SIZE, dtype=np.int64)
+            limit = offset + k
+            self.query_stamp += 1
+
+            found_docs, found_scores = [], []
+            n_found, kth_score = 0, 0.0
+            while True:
+                active = starts < ends
+                if not active.any():
+                    break
+                # Borne supérieure du score de tout document pas encore rencontré
+                next_weights = np.zeros(len(terms))
+                next_weights[active] = weights[starts[active]]
+                contributions = query_weights * next_weights
+                if n_found >= limit and kth_score > contributions.sum():
+                    break
+
+                # On avance dans la liste qui contribue le plus à la borne, par blocs doublés
+                t = int(np.argmax(contributions))
+                stop = min(starts[t] + block_sizes[t], ends[t])
+                block = docs[starts[t]:stop]
+                starts[t] = stop
+                block_sizes[t] *= 2
+
+                new_docs = block[self.seen_marks[block] != self.query_stamp]
+                self.seen_marks[new_docs] = self.query_stamp
+                if allowed is not None:
+                    # La borne reste valable : écarter des documents ne peut que l'abaisser
+                    new_docs = new_docs[allowed[new_docs]]
+                if not len(new_docs):
+                    continue
+                # Accès direct aux lignes : score exact des nouveaux candidats
+                found_docs.append(new_docs)
+                found_scores.append((self.doc_matrix[new_docs] @ query_vec.T).toarray().ravel())
+                n_found += len(new_docs)
+                if n_found >= limit:
+                    all_scores = np.concatenate(found_scores)
+                    kth_score = np.partition(all_scores, n_found - limit)[n_found - limit]
+
+        with METRICS.timer("search_stage_seconds", stage="sort"):
+            if found_docs:
+                candidates = np.concatenate(found_docs)
+                scores = np.concatenate(found_scores)
+                order = np.argsort(candidates)
+                candidates, scores = candidates[order], scores[order]
+            else:
+                candidates, scores = np.empty(0, dtype=np.int64), np.empty(0)
+            selected, _ = top_k(scores, limit)
+            selected = selected[offset:]
+        return ResultPage(self.documents, candidates[selected], scores[selected],
+                          self.count_matches(terms, allowed), offset)
+
+    def count_matches(self, terms, allowed=None):
+        indptr, docs = self.postings["indptr"], self.postings["docs"]
+        if len(terms) == 1 and allowed is None:
+            return int(indptr[terms[0] + 1] - indptr[terms[0]])
+        # Union des listes sans tri : un document présent dans plusieurs listes
+        # reçoit la même marque, quel que soit l'ordre des écritures
+        matched = np.concatenate([docs[indptr[t]:indptr[t + 1]] for t in terms]) if len(terms) else docs[:0]
+        if allowed is not None:
+            matched = matched[allowed[matched]]
+        self.count_marks[matched] = True
+        count = int(np.count_nonzero(self.count_marks))
+        self.count_marks[matched] = False
+        return count
+
+# ======================
+# Classe BM25FEngine
+# ======================
+# Classement BM25F sur deux champs, titre et contenu. La normalisation par la
+# longueur de chaque champ, la pondération des champs, la saturation de la
+# fréquence (k1) et l'IDF sont appliquées à l'indexation : doc_matrix contient
+# directement la contribution de chaque terme au score de chaque document. Une
+# requête se réduit alors à additionner les colonnes de ses termes (produit creux
+# avec ses comptes), par le même chemin que SearchEngine (filtres, recherche par
+# lots, cache, matches).
+BM25_K1 = 1.2
+# Par champ : (poids du champ, normalisation par la longueur b)
+BM25F_FIELDS = {"title": (2.0, 0.5), "content": (1.0, 0.75)}
+
+def bm25_idf(doc_freq, n_docs):
+    # IDF de BM25, variante toujours positive (celle de Lucene)
+    return np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+def build_count_vectorizer(vocabulary, idf):
+    # Vectoriseur des requêtes BM25F : simples comptes de termes, les poids étant dans l'index
+    vectorizer = sklearn_text.CountVectorizer()
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.idf_ = idf
+    return vectorizer
+
+def stack_rows(chunks, n_terms):
+    # Paquets de lignes de comptes (élargis au vocabulaire courant) en une seule matrice
+    widened = [sparse.csr_matrix((chunk.data, chunk.indices, chunk.indptr), shape=(chunk.shape[0], n_terms))
+               for chunk in chunks]
+    return widened[0] if len(widened) == 1 else sparse.vstack(widened, format="csr")
+
+def field_lengths(field_counts):
+    return [np.asarray(counts.sum(axis=1), dtype=np.float64).ravel() for counts in field_counts]
+
+def bm25f_weights(field_counts, lengths, average_lengths, idf):
+    # Poids d'impact de chaque couple (document, terme) : fréquences des champs
+    # divisées par leur longueur relative et pondérées, sommées, saturées puis
+    # multipliées par l'IDF
+    frequencies = None
+    for (boost, b), counts, length, average in zip(BM25F_FIELDS.values(), field_counts, lengths, average_lengths):
+        norms = boost / (1 - b + b * length / average) if average else np.full(len(length), float(boost))
+        weighted = counts.astype(np.float64)
+        weighted.data *= np.repeat(norms, np.diff(weighted.indptr))
+        frequencies = weighted if frequencies is None else frequencies + weighted
+    frequencies.data = frequencies.data / (BM25_K1 + frequencies.data) * idf[frequencies.indices]
+    return frequencies.tocsr()
+
+class BM25FEngine(SearchEngine):
+    # Même interface que SearchEngine. Les comptes de chaque champ sont conservés
+    # (par paquets) pour pondérer les ajouts et recalculer les poids exacts à la
+    # compaction ; pour un index rechargé, ils sont recalculés au premier ajout.
+    SCORING = "bm25f"
+
+    def __init__(self, documents, vectorizer=None, doc_matrix=None, compaction_ratio=0.1, cache_size=128):
+        documents = documents if hasattr(documents, "extend") else list(documents)
+        self.field_counts = None
+        self.length_totals = None
+        if vectorizer is None:
+            with METRICS.timer("index_fit_seconds"):
+                vectorizer, doc_matrix = self.fit(documents)
+        super().__init__(documents, vectorizer, doc_matrix, compaction_ratio, cache_size)
+
+    @classmethod
+    def restore_vectorizer(cls, vocabulary, idf):
+        return build_count_vectorizer(vocabulary, idf)
+
+    def fit(self, documents):
+        # Un seul vocabulaire pour les deux champs : tous les titres, puis tous les contenus
+        counter = sklearn_text.CountVectorizer()
+        counts = counter.fit_transform(itertools.chain.from_iterable(
+            [getattr(doc, field) for doc in documents] for field in BM25F_FIELDS)).tocsr()
+        n_docs = len(documents)
+        self.field_counts = [[counts[i * n_docs:(i + 1) * n_docs]] for i in range(len(BM25F_FIELDS))]
+        return self.reweigh(counter.vocabulary_)
+
+    def reweigh(self, vocabulary):
+        # Poids exacts de toutes les lignes, avec les statistiques du corpus courant
+        field_counts = [stack_rows(chunks, len(vocabulary)) for chunks in self.field_counts]
+        self.field_counts = [[counts] for counts in field_counts]
+        lengths = field_lengths(field_counts)
+        self.length_totals = np.array([length.sum() for length in lengths])
+        n_docs = field_counts[0].shape[0]
+        terms = field_counts[0]
+        for counts in field_counts[1:]:
+            terms = terms + counts
+        idf = bm25_idf(np.bincount(terms.indices, minlength=len(vocabulary)), n_docs)
+        doc_matrix = bm25f_weights(field_counts, lengths, self.length_totals / max(n_docs, 1), idf)
+        return build_count_vectorizer(vocabulary, idf), doc_matrix
+
+    def prepare_fields(self):
+        # Comptes des champs d'un index rechargé (ou converti), recalculés depuis les documents
+        if self.field_counts is not None:
+            return
+        documents = list(itertools.islice(self.documents, self.doc_matrix.shape[0]))
+        self.field_counts = [[self.vectorizer.transform([getattr(doc, field) for doc in documents]).tocsr()]
+                             for field in BM25F_FIELDS]
+        self.length_totals = np.array([length.sum() for length in field_lengths(chunks[0] for chunks in self.field_counts)])
+
+    def _add_documents(self, documents, stored):
+        self._prepare_incremental()
+        self.prepare_fields()
+
+        n_terms = self.doc_matrix.shape[1]
+        field_counts = [self.count_rows([getattr(doc, field) for doc in documents]) for field in BM25F_FIELDS]
+        field_counts = [stack_rows([counts], len(self.vectorizer.vocabulary_)) for counts in field_counts]
+
+        if not stored:
+            self.documents.extend(documents)
+        n_docs = len(self.documents)
+
+        terms = field_counts[0]
+        for counts in field_counts[1:]:
+            terms = terms + counts
+        idf = self._extend_statistics(terms, n_terms, bm25_idf)
+
+        # Les lignes existantes gardent leurs poids ; les nouvelles sont pondérées
+        # avec les longueurs moyennes et les IDF actuels
+        lengths = field_lengths(field_counts)
+        self.length_totals = self.length_totals + [length.sum() for length in lengths]
+        self._append_rows(bm25f_weights(field_counts, lengths, self.length_totals / n_docs, idf))
+        for chunks, counts in zip(self.field_counts, field_counts):
+            chunks.append(counts)
+
+        self.generation += 1
+        self.added_since_compaction += len(documents)
+        if self.added_since_compaction > self.compaction_ratio * n_docs:
+            self.compact()
+
+    def compact(self):
+        # Réindexation à partir des comptes conservés : identique à un entraînement complet
+        METRICS.count("index_compactions_total")
+        self.prepare_fields()
+        self.vectorizer, self.doc_matrix = self.reweigh(self.vectorizer.vocabulary_)
+        self.buffers = None
+        self.doc_freq = None
+        self.added_since_compaction = 0
+        self.compactions += 1
+        self.generation += 1
+
+    def search_incremental(self, text, k=10, offset=0, max_expansions=MAX_EXPANSIONS, filters=None):
+        # Les scores BM25F s'additionnent terme à terme : score des mots terminés plus,
+        # pour chaque document, la plus forte contribution d'une complétion du dernier mot
+        METRICS.count("search_incremental_total")
+        state = self.typing_index()
+        partial = PARTIAL_TOKEN.search(text)
+        completed_text = text[:partial.start()] if partial else text
+        key = self.query_key(completed_text)
+        if state["completed"] is None or state["completed"]["key"] != key:
+            query_vec = self.vectorizer.transform([completed_text])
+            state["completed"] = {"key": key, "scores": row_scores(self.doc_matrix, query_vec)}
+        scores = state["completed"]["scores"]
+        expansions = state["prefixes"].complete(partial.group().lower(), max_expansions) if partial else []
+
+        if len(expansions):
+            best = np.zeros(len(scores))
+            for term in expansions:
+                docs, term_weights = term_postings(state, term)
+                best[docs] = np.maximum(best[docs], term_weights)
+            scores = scores + best
+        rows = self.filter_rows(filters)
+        if rows is not None:
+            scores = scores[rows]
+        selected, total = top_k(scores, offset + k)
+        selected = selected[offset:]
+        indices = selected if rows is None else rows[selected]
+        return ResultPage(self.documents, indices, scores[selected], total, offset)
+
+# ======================
+# Classe ShardedSearchEngine
+# ======================
+# Le coordinateur garde le vocabulaire et les IDF du corpus entier ; les lignes
+# TF-IDF sont découpées en partitions contiguës, écrites en fichiers .npy (en
+# mémoire vive via /dev/shm quand c'est possible) et mappées par des processus
+# de partition. Seuls le vecteur de la requête et les k meilleurs résultats de
+# chaque partition transitent par les tubes.
+SHARD_START_METHOD = "spawn"
+
+def merge_top_k(parts, limit):
+    # Fusion des meilleurs résultats des partitions : même ordre que top_k sur le
+    # corpus entier (score décroissant, puis ordre du corpus)
+    indices = np.concatenate([part[0] for part in parts])
+    scores = np.concatenate([part[1] for part in parts])
+    order = np.lexsort((indices, -scores))[:limit]
+    return indices[order], scores[order], sum(part[2] for part in parts)
+
+def shard_boundaries(indptr, n_shards):
+    # Lignes de début de chaque partition : même nombre de coefficients non nuls,
+    # donc même coût de calcul, par partition
+    targets = np.linspace(0, indptr[-1], n_shards + 1)[1:-1]
+    inner = np.searchsorted(indptr, targets)
+    return np.concatenate([[0], inner, [len(indptr) - 1]]).astype(np.int64)
+
+def write_shard(path, matrix, start, stop):
+    os.makedirs(path)
+    begin, end = matrix.indptr[start], matrix.indptr[stop]
+    save_array(path, "data.npy", matrix.data[begin:end])
+    save_array(path, "indices.npy", matrix.indices[begin:end])
+    save_array(path, "indptr.npy", matrix.indptr[start:stop + 1] - begin)
+
+def load_shard(path, n_terms):
+    data = np.load(os.path.join(path, "data.npy"), mmap_mode="r")
+    indices = np.load(os.path.join(path, "indices.npy"), mmap_mode="r")
+    indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, n_terms), copy=False)
+
+def shard_worker(connection):
+    # Boucle d'un processus de partition : une commande reçue, une réponse ("ok" ou "error") renvoyée
+    matrix, start, term_matrix = None, 0, None
+    while True:
+        message = connection.recv()
+        command = message[0]
+        if command == "stop":
+            connection.close()
+            return
+        try:
+            if command == "load":
+                _, path, start, n_terms = message
+                matrix, term_matrix = load_shard(path, n_terms), None
+                reply = matrix.shape[0]
+            else:
+                query_matrix = message[1]
+                if query_matrix.shape[1] > matrix.shape[1]:
+                    # Termes ajoutés depuis la publication : absents de ces lignes, la matrice est seulement élargie
+                    matrix = sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr),
+                                               shape=(matrix.shape[0], query_matrix.shape[1]), copy=False)
+                    term_matrix = None
+                if command == "rank":
+                    _, query_vec, limit, rows = message
+                    scores = row_scores(matrix, query_vec, rows)
+                    selected, total = top_k(scores, limit)
+                    local = selected if rows is None else rows[selected]
+                    reply = (start + local.astype(np.int64), scores[selected], total)
+                elif command == "rank_many":
+                    _, query_matrix, limit, rows = message
+                    if term_matrix is None:
+                        term_matrix = matrix.T.tocsr()
+                    reply = [(start + doc_ids, scores, total)
+                             for doc_ids, scores, total in batch_top_k(query_matrix, term_matrix, limit, rows)]
+                else:
+                    raise ValueError(f"commande inconnue : {command}")
+            connection.send(("ok", reply))
+        except Exception as error:
+            connection.send(("error", f"{type(error).__name__}: {error}"))
+
+def stop_shards(connections, processes, directory):
+    for connection in connections:
+        try:
+            connection.send(("stop",))
+        except OSError:
+            pass
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+    shutil.rmtree(directory, ignore_errors=True)
+
+class ShardPool:
+    # Processus de partition et répertoire de leurs fichiers, libérés par close()
+    # ou, à défaut, à la destruction du pool (ou à la sortie de l'interpréteur)
+    def __init__(self, n_shards):
+        context = multiprocessing.get_context(SHARD_START_METHOD)
+        self.directory = tempfile.mkdtemp(prefix="search-shards-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        self.connections, self.processes = [], []
+        for _ in range(n_shards):
+            connection, child_connection = context.Pipe()
+            process = context.Process(target=shard_worker, args=(child_connection,), daemon=True)
+            process.start()
+            child_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.finalizer = weakref.finalize(self, stop_shards, self.connections, self.processes, self.directory)
+
+    def request(self, messages):
+        # Diffusion puis collecte : les partitions travaillent en parallèle (None : partition non sollicitée)
+        targets = [(shard, message) for shard, message in enumerate(messages) if message is not None]
+        try:
+            for shard, message in targets:
+                self.connections[shard].send(message)
+            replies = [(shard, self.connections[shard].recv()) for shard, _ in targets]
+        except (EOFError, OSError) as error:
+            raise RuntimeError(f"Processus de partition interrompu : {error}") from error
+        for shard, (status, reply) in replies:
+            if status == "error":
+                raise RuntimeError(f"Partition {shard} : {reply}")
+        return [reply for _, (_, reply) in replies]
+
+    def close(self):
+        self.finalizer()
+
+class ShardedSearchEngine(SearchEngine):
+    # Mêmes poids et mêmes résultats que SearchEngine ; le calcul des similarités
+    # est réparti entre n_shards processus (un par cœur par défaut), démarrés à la
+    # première recherche. L'indexation, la recherche pendant la saisie et matches()
+    # restent dans le processus coordinateur.
+    def __init__(self, documents, vectorizer=None, doc_matrix=None, compaction_ratio=0.1, cache_size=128, n_shards=None):
+        super().__init__(documents, vectorizer, doc_matrix, compaction_ratio, cache_size)
+        self.n_shards = n_shards or os.cpu_count() or 1
+        self.pool = None
+        self.shard_lock = threading.Lock()
+        self.boundaries = None
+        self.shard_paths = None
+        self.published_generation = None
+        self.publications = 0
+
+    def compact(self):
+        super().compact()
+        # Toutes les lignes sont repondérées : republication complète (et rééquilibrage)
+        self.boundaries = None
+
+    def publish_shards(self):
+        # Écrit les partitions modifiées depuis la dernière publication et les fait recharger
+        if self.published_generation == self.generation and self.pool is not None:
+            return
+        if self.pool is None:
+            self.pool = ShardPool(self.n_shards)
+            self.boundaries = None
+            self.shard_paths = None
+        matrix = self.doc_matrix.tocsr()
+        with METRICS.timer("shard_publish_seconds"):
+            if self.boundaries is None:
+                self.boundaries = shard_boundaries(matrix.indptr, self.n_shards)
+                changed = range(self.n_shards)
+            else:
+                # Ajouts sans compaction : les lignes existantes sont inchangées, les
+                # nouvelles lignes rejoignent la dernière partition
+                self.boundaries[-1] = matrix.shape[0]
+                changed = [self.n_shards - 1]
+            self.publications += 1
+            previous_paths = list(self.shard_paths or [None] * self.n_shards)
+            self.shard_paths = list(previous_paths)
+            messages = [None] * self.n_shards
+            for shard in changed:
+                path = os.path.join(self.pool.directory, f"{self.publications}-{shard}")
+                write_shard(path, matrix, self.boundaries[shard], self.boundaries[shard + 1])
+                self.shard_paths[shard] = path
+                messages[shard] = ("load", path, int(self.boundaries[shard]), matrix.shape[1])
+            self.pool.request(messages)
+            for shard in changed:
+                if previous_paths[shard] is not None:
+                    shutil.rmtree(previous_paths[shard], ignore_errors=True)
+        self.published_generation = self.generation
+
+    def shard_rows(self, rows):
+        # Lignes retenues par partition, en indices locaux
+        if rows is None:
+            return [None] * self.n_shards
+        cuts = np.searchsorted(rows, self.boundaries)
+        return [rows[cuts[shard]:cuts[shard + 1]] - self.boundaries[shard] for shard in range(self.n_shards)]
+
+    def rank(self, query, k, offset, rows=None):
+        with METRICS.timer("search_stage_seconds", stage="transform"):
+            query_vec = self.vectorizer.transform([query])
+        with self.shard_lock:
+            self.publish_shards()
+            shard_rows = self.shard_rows(rows)
+            with METRICS.timer("search_stage_seconds", stage="shards"):
+                parts = self.pool.request([("rank", query_vec, offset + k, shard_rows[shard])
+                                           for shard in range(self.n_shards)])
+        with METRICS.timer("search_stage_seconds", stage="merge"):
+            indices, scores, total = merge_top_k(parts, offset + k)
+        return ResultPage(self.documents, indices[offset:], scores[offset:], total, offset)
+
+    def search_many(self, queries, k=10, chunk_size=256, filters=None):
+        METRICS.count("search_batch_queries_total", len(queries))
+        query_matrix = self.vectorizer.transform(queries)
+        rows = self.filter_rows(filters)
+        pages = []
+        with self.shard_lock:
+            self.publish_shards()
+            shard_rows = self.shard_rows(rows)
+            for start in range(0, query_matrix.shape[0], chunk_size):
+                chunk = query_matrix[start:start + chunk_size]
+                replies = self.pool.request([("rank_many", chunk, k, shard_rows[shard]) for shard in range(self.n_shards)])
+                for parts in zip(*replies):
+                    indices, scores, total = merge_top_k(parts, k)
+                    pages.append(ResultPage(self.documents, indices, scores, total))
+        return pages
+
+    def close(self):
+        # Arrête les processus de partition ; ils redémarrent à la recherche suivante
+        with self.shard_lock:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
+                self.shard_paths = None
+                self.published_generation = None
+
+# ======================
+# Indexation hors mémoire
+# ======================
+# Construction en flux d'un index pour les corpus qui ne tiennent pas en
+# mémoire. Les termes sont hachés dans un espace de taille fixe (aucun
+# vocabulaire) ; au premier passage, les comptes de chaque paquet de documents
+# sont écrits sur disque et les fréquences documentaires cumulées ; au second,
+# chaque paquet est repondéré par les IDF définitifs et recopié dans les
+# fichiers de l'index. Mémoire de travail : environ 16 octets par
+# caractéristique, plus un paquet de documents, quelle que soit la taille du corpus.
+# Les documents sont écrits paquet par paquet dans les colonnes binaires d'un
+# DocumentStore. Au chargement, la matrice reste projetée en mémoire (sans copie)
+# mais ces colonnes sont relues en entier : ce sont elles qui bornent la taille
+# du corpus utilisable.
+HASHING_FEATURES = 2 ** 20
+STREAM_CHUNK_SIZE = 10000
+
+def index_dtype(*maxima):
+    # Même choix que scipy (int32 tant que les valeurs le permettent) : des indices
+    # et un indptr de ce type commun sont repris tels quels, sans copie, par csr_matrix
+    return np.int32 if max(maxima) <= np.iinfo(np.int32).max else np.int64
+
+class HashingTfidfVectorizer:
+    # Pendant haché de TfidfVectorizer pour le chemin des requêtes (même analyse du
+    # texte, mêmes poids IDF lissés et même normalisation L2)
+    def __init__(self, n_features=HASHING_FEATURES, idf=None):
+        self.n_features = n_features
+        self.idf_ = idf
+        self.hashing = sklearn_text.HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+
+    def build_analyzer(self):
+        return self.hashing.build_analyzer()
+
+    def counts(self, texts):
+        return self.hashing.transform(texts)
+
+    def transform(self, texts):
+        matrix = self.counts(texts)
+        matrix.data *= self.idf_[matrix.indices]
+        sklearn_preprocessing.normalize(matrix, copy=False)
+        return matrix
+
+def build_streaming_index(documents, path, n_features=HASHING_FEATURES, chunk_size=STREAM_CHUNK_SIZE):
+    # Index lisible par SearchEngine.load, construit à partir d'un itérable de documents
+    # (extracteur, read_corpus...) parcouru une seule fois
+    start = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+    # Sans meta.json, un index interrompu en cours de construction n'est jamais chargé
+    for name in ("meta.json", "terms.npy"):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+    vectorizer = HashingTfidfVectorizer(n_features)
+    doc_freq = np.zeros(n_features, dtype=np.int64)
+    chunks_directory = tempfile.mkdtemp(prefix="chunks-", dir=path)
+    writer = DocumentStoreWriter(os.path.join(path, DOCUMENTS_DIRECTORY))
+    chunk_shapes = []
+
+    def write_chunk(chunk):
+        # Premier passage : documents ajoutés aux colonnes de l'index, comptes écrits sur disque
+        store = DocumentStore(chunk)
+        writer.write(store)
+        counts = vectorizer.counts(store.contents.values(0, len(store)))
+        doc_freq[:] += np.bincount(counts.indices, minlength=n_features)
+        write_shard(os.path.join(chunks_directory, str(len(chunk_shapes))), counts, 0, counts.shape[0])
+        chunk_shapes.append((counts.shape[0], counts.nnz))
+
+    try:
+        with METRICS.timer("index_stream_seconds", stage="count"):
+            try:
+                chunk = []
+                for doc in documents:
+                    chunk.append(doc)
+                    if len(chunk) == chunk_size:
+                        write_chunk(chunk)
+                        chunk = []
+                if chunk:
+                    write_chunk(chunk)
+            finally:
+                writer.close()
+        n_docs = sum(n_rows for n_rows, _ in chunk_shapes)
+        nnz = sum(chunk_nnz for _, chunk_nnz in chunk_shapes)
+        idf = smooth_idf(doc_freq, n_docs)
+        indices_dtype = index_dtype(nnz, n_features)
+
+        # Second passage : fichiers de l'index projetés en mémoire et remplis paquet par paquet
+        with METRICS.timer("index_stream_seconds", stage="weight"):
+            columns = {name: np.lib.format.open_memmap(os.path.join(chunks_directory, name), mode="w+", dtype=dtype, shape=(size,))
+                       for name, dtype, size in [("data.npy", np.float64, nnz), ("indices.npy", indices_dtype, nnz),
+                                                 ("indptr.npy", indices_dtype, n_docs + 1)]}
+            columns["indptr.npy"][0] = 0
+            row = offset = 0
+            for chunk, (n_rows, chunk_nnz) in enumerate(chunk_shapes):
+                chunk_path = os.path.join(chunks_directory, str(chunk))
+                weighted = load_shard(chunk_path, n_features).astype(np.float64)
+                weighted.data *= idf[weighted.indices]
+                sklearn_preprocessing.normalize(weighted, copy=False)
+                columns["data.npy"][offset:offset + chunk_nnz] = weighted.data
+                columns["indices.npy"][offset:offset + chunk_nnz] = weighted.indices
+                columns["indptr.npy"][row + 1:row + n_rows + 1] = weighted.indptr[1:] + offset
+                row, offset = row + n_rows, offset + chunk_nnz
+                shutil.rmtree(chunk_path)
+            for column in columns.values():
+                column.flush()
+            columns.clear()
+            for name in ("data.npy", "indices.npy", "indptr.npy"):
+                os.replace(os.path.join(chunks_directory, name), os.path.join(path, name))
+        save_array(path, "idf.npy", idf)
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "shape": [n_docs, n_features],
+            "fingerprint": writer.fingerprint(),
+            "n_features": n_features,
+        }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    finally:
+        shutil.rmtree(chunks_directory, ignore_errors=True)
+    seconds = time.perf_counter() - start
+    return {"documents": n_docs, "nnz": nnz, "seconds": seconds, "docs_per_second": n_docs / max(seconds, 1e-9)}
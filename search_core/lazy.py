@@ -0,0 +1,31 @@
+import importlib
+
+# ======================
+# Chargement différé des dépendances lourdes
+# ======================
+# numpy, pandas, praw, scipy et scikit-learn ne sont importés qu'au premier accès à
+# l'un de leurs attributs : le lancement et la manipulation des documents
+# n'en paient pas le coût.
+class LazyModule:
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attribute):
+        # Appelé uniquement pour les attributs du module (name et module sont des attributs d'instance)
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        value = getattr(self.module, attribute)
+        # Mis en cache sur l'instance : les accès suivants (np.zeros...) ne repassent plus par ici
+        setattr(self, attribute, value)
+        return value
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+praw = LazyModule("praw")
+requests = LazyModule("requests")
+sparse = LazyModule("scipy.sparse")
+sklearn_text = LazyModule("sklearn.feature_extraction.text")
+sklearn_preprocessing = LazyModule("sklearn.preprocessing")
+sklearn_decomposition = LazyModule("sklearn.decomposition")
+sklearn_cluster = LazyModule("sklearn.cluster")
@@ -0,0 +1,282 @@
+import json
+import threading
+import tracemalloc
+import time
+import tempfile
+import os
+import sys
+import subprocess
+import bisect
+import io
+import cProfile
+import pstats
+import itertools
+
+# ======================
+# Instrumentation
+# ======================
+# Compteurs et histogrammes (durées, tailles) des chemins critiques. Désactivée,
+# chaque point de mesure se réduit à un test de booléen : timer() renvoie un
+# contexte vide partagé et count()/observe() retournent immédiatement.
+# Activation : SEARCH_METRICS=1 dans l'environnement, ou METRICS.enable().
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Un compteur par borne, plus le dépassement (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Estimation par interpolation linéaire dans le seau concerné (comme histogram_quantile
+        # de Prometheus), bornée par les valeurs extrêmes observées
+        if not self.count:
+            return None
+        rank, cumulative = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(self.max, max(self.min, lower + (upper - lower) * (rank - cumulative) / count))
+            cumulative += count
+        return self.max
+
+class Timer:
+    __slots__ = ("metrics", "name", "labels", "start", "profiler", "memory")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.profiler = None
+        self.memory = None
+
+    def __enter__(self):
+        metrics = self.metrics
+        # Un seul profileur actif par thread : les blocs imbriqués sont inclus dans le plus externe
+        if metrics.profile and not getattr(metrics.local, "profiling", False):
+            metrics.local.profiling = True
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if metrics.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        metrics = self.metrics
+        metrics.observe(self.name, elapsed, **self.labels)
+        if self.memory is not None:
+            metrics.observe(self.name.replace("_seconds", "") + "_peak_bytes",
+                            max(0, tracemalloc.get_traced_memory()[1] - self.memory), BYTES_BUCKETS, **self.labels)
+        if self.profiler is not None:
+            self.profiler.disable()
+            metrics.local.profiling = False
+            metrics.add_profile(self.name, self.profiler)
+        return False
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_TIMER = NullTimer()
+
+def metric_key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def prometheus_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs]
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        # Crochets optionnels : cProfile et pic tracemalloc autour des blocs chronométrés
+        self.profile = False
+        self.trace_memory = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.counters = {}
+        self.histograms = {}
+        self.profiles = {}
+
+    def enable(self, profile=False, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.profile = False
+        self.trace_memory = False
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.profiles.clear()
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = metric_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        # Contexte chronométrant un bloc ; le nom se termine par _seconds
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, labels)
+
+    def add_profile(self, name, profiler):
+        with self.lock:
+            stats = self.profiles.get(name)
+            if stats is None:
+                self.profiles[name] = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+
+    def profile_report(self, name, top=20):
+        # Fonctions les plus coûteuses (temps cumulé) des blocs profilés sous ce nom
+        with self.lock:
+            stats = self.profiles.get(name)
+            if stats is None:
+                return ""
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats("cumulative").print_stats(top)
+        return output.getvalue()
+
+    def snapshot(self):
+        with self.lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = []
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                histograms.append({
+                    "name": name, "labels": dict(labels), "count": histogram.count, "sum": histogram.sum,
+                    "buckets": dict(zip([str(bound) for bound in histogram.buckets] + ["+Inf"], itertools.accumulate(histogram.counts))),
+                    "p50": histogram.quantile(0.5), "p99": histogram.quantile(0.99),
+                })
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        # Format texte d'exposition de Prometheus (version 0.0.4)
+        lines, declared = [], set()
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{prometheus_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip([repr(float(bound)) for bound in histogram.buckets] + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{prometheus_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{prometheus_labels(labels)} {histogram.sum!r}")
+                lines.append(f"{name}_count{prometheus_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # Format choisi d'après l'extension : .json, sinon texte Prometheus
+        content = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+def format_metrics_summary(metrics):
+    # Résumé lisible : une ligne par compteur et par histogramme
+    snapshot = metrics.snapshot()
+    lines = []
+    for counter in snapshot["counters"]:
+        lines.append(f"{counter['name']}{prometheus_labels(counter['labels'].items())} = {counter['value']}")
+    for histogram in snapshot["histograms"]:
+        name = f"{histogram['name']}{prometheus_labels(histogram['labels'].items())}"
+        if histogram["name"].endswith("_seconds"):
+            lines.append(f"{name} : {histogram['count']} × {1000 * histogram['sum'] / histogram['count']:.2f} ms en moyenne, "
+                         f"p50 ≈ {1000 * histogram['p50']:.2f} ms, p99 ≈ {1000 * histogram['p99']:.2f} ms")
+        else:
+            lines.append(f"{name} : {histogram['count']} mesures, moyenne {histogram['sum'] / histogram['count']:.0f}, "
+                         f"p99 ≈ {histogram['p99']:.0f}")
+    return lines
+
+METRICS = Metrics(enabled=os.environ.get("SEARCH_METRICS") == "1")
+
+# ======================
+# Mesure du temps de démarrage
+# ======================
+def importtime_report(stderr, top=5):
+    # Lignes « import time: self | cumulative | module » produites par python -X importtime ;
+    # seuls les imports de premier niveau (non indentés) sont additionnés
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):
+            imports.append((name.strip(), int(cumulative) / 1e6))
+    imports.sort(key=lambda item: item[1], reverse=True)
+    return {"import_seconds": sum(seconds for _, seconds in imports), "heaviest": imports[:top]}
+
+def run_startup(command, directory, stdin="", ready=None):
+    # Durée jusqu'à la fin du processus, ou jusqu'à la ligne « ready » sur sa sortie standard
+    # (la sortie d'erreur, volumineuse, passe par un fichier pour ne pas bloquer le processus)
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-X", "importtime"] + command, cwd=directory, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=stderr, text=True, encoding="utf-8")
+        seconds = None
+        if ready is not None:
+            for line in process.stdout:
+                if line.strip() == ready:
+                    seconds = time.perf_counter() - start
+                    break
+        process.communicate(stdin)
+        if seconds is None:
+            seconds = time.perf_counter() - start
+        stderr.seek(0)
+        output = stderr.read()
+    if process.returncode != 0:
+        raise RuntimeError(f"Échec du démarrage : {output.strip().splitlines()[-1:]}")
+    return dict(seconds=seconds, **importtime_report(output))
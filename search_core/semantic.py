@@ -0,0 +1,214 @@
+import json
+import os
+from .lazy import np, sklearn_decomposition, sklearn_cluster
+from .metrics import METRICS
+from .corpus import FILTER_SLICE_RATIO
+from .engines import corpus_fingerprint, save_array, top_k, ResultPage, SearchEngine, HashingTfidfVectorizer
+
+# ======================
+# Recherche sémantique (LSA)
+# ======================
+# Les lignes TF-IDF sont réduites par SVD tronquée (analyse sémantique latente)
+# à des vecteurs denses de faible dimension, normalisés et stockés en float32 :
+# deux documents sans terme commun mais au vocabulaire voisin restent proches.
+# La recherche passe par un index à listes inversées (IVF) : les vecteurs sont
+# regroupés par k-moyennes et rangés liste par liste ; une requête ne parcourt
+# que les n_probe listes dont le centre est le plus proche. n_probe règle le
+# compromis rappel/latence (n_probe = nombre de listes : recherche exacte).
+SEMANTIC_FORMAT_VERSION = 1
+SEMANTIC_DIRECTORY = "semantic"
+SEMANTIC_COMPONENTS = 128
+SEMANTIC_PROBES = 16
+# Au-delà de cette part de documents ajoutés depuis la construction, l'index est à reconstruire
+SEMANTIC_REBUILD_RATIO = 0.2
+# Classement hybride : poids de la similarité lexicale, et candidats retenus par classement (multiple de k)
+HYBRID_WEIGHT = 0.5
+HYBRID_CANDIDATES = 4
+
+class SemanticIndex:
+    # Index des vecteurs LSA des documents d'un moteur TF-IDF (même interface de
+    # recherche que SearchEngine). Les documents indexés par le moteur après la
+    # construction sont projetés sur la base existante et parcourus
+    # exhaustivement, jusqu'à la reconstruction (voir stale()).
+    def __init__(self, engine, projection, centroids, vectors, ids, offsets, n_probe=SEMANTIC_PROBES):
+        self.engine = engine
+        # Base de la SVD, une ligne par terme (contiguë : une requête n'en lit que quelques lignes)
+        self.projection = projection
+        self.centroids = centroids
+        # Distance au centre à un terme constant près : ||c||² / 2 - q·c
+        self.centroid_bias = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+        # Vecteurs rangés liste par liste : ids donne le document de chaque ligne,
+        # offsets les bornes de chaque liste
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.positions = np.empty(len(ids), dtype=np.int64)
+        self.positions[ids] = np.arange(len(ids))
+        self.n_rows = len(ids)
+        self.n_probe = n_probe
+        self.extra = None
+        self.extra_generation = None
+
+    @classmethod
+    def build(cls, engine, path=None, n_components=SEMANTIC_COMPONENTS, n_lists=None, n_probe=SEMANTIC_PROBES, seed=0):
+        # Avec path, l'index est enregistré et ses vecteurs relus par projection en mémoire
+        check_semantic_engine(engine)
+        matrix = engine.doc_matrix.tocsr()
+        n_docs, n_terms = matrix.shape
+        if n_docs < 2 or n_terms < 2:
+            raise ValueError("Corpus trop petit pour la recherche sémantique")
+        with METRICS.timer("semantic_build_seconds", stage="svd"):
+            svd = sklearn_decomposition.TruncatedSVD(n_components=min(n_components, n_docs - 1, n_terms - 1),
+                                                     random_state=seed)
+            vectors = normalize_dense(svd.fit_transform(matrix).astype(np.float32))
+        with METRICS.timer("semantic_build_seconds", stage="ivf"):
+            # Environ √N listes : le parcours des centres et celui des listes sondées s'équilibrent
+            n_lists = min(n_lists or max(1, int(np.sqrt(n_docs))), n_docs)
+            kmeans = sklearn_cluster.MiniBatchKMeans(n_clusters=n_lists, n_init=1, random_state=seed)
+            labels = kmeans.fit_predict(vectors)
+            ids = np.argsort(labels, kind="stable")
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+        index = cls(engine, np.ascontiguousarray(svd.components_.T, dtype=np.float32), kmeans.cluster_centers_.astype(np.float32),
+                    vectors[ids], ids, offsets, n_probe)
+        if path is not None:
+            index.save(path)
+            index.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        return index
+
+    def project(self, matrix):
+        # Vecteurs LSA normalisés de lignes TF-IDF ; les termes apparus après la construction sont ignorés
+        # En float32 comme la base : un produit en float64 en convertirait une copie à chaque appel
+        matrix = matrix.tocsr().astype(np.float32)
+        n_terms = self.projection.shape[0]
+        if matrix.shape[1] > n_terms:
+            matrix = matrix[:, :n_terms]
+        return normalize_dense(np.asarray(matrix @ self.projection))
+
+    def refresh(self):
+        if self.extra_generation != self.engine.generation:
+            matrix = self.engine.doc_matrix
+            if matrix.shape[0] > self.n_rows:
+                self.extra = self.project(matrix[self.n_rows:])
+            else:
+                self.extra = np.empty((0, self.projection.shape[1]), dtype=np.float32)
+            self.extra_generation = self.engine.generation
+
+    def stale(self, ratio=SEMANTIC_REBUILD_RATIO):
+        return self.engine.doc_matrix.shape[0] - self.n_rows > ratio * self.n_rows
+
+    def vectors_for(self, doc_ids):
+        self.refresh()
+        result = np.empty((len(doc_ids), self.projection.shape[1]), dtype=np.float32)
+        indexed = doc_ids < self.n_rows
+        result[indexed] = self.vectors[self.positions[doc_ids[indexed]]]
+        result[~indexed] = self.extra[doc_ids[~indexed] - self.n_rows]
+        return result
+
+    def probe(self, query_vector, n_probe):
+        # Lignes des n_probe listes dont le centre est le plus proche de la requête
+        n_lists = len(self.centroids)
+        if n_probe >= n_lists:
+            return np.arange(self.n_rows)
+        distances = self.centroid_bias - self.centroids @ query_vector
+        lists = np.sort(np.argpartition(distances, n_probe - 1)[:n_probe])
+        return np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+
+    def candidates(self, query_vector, rows=None, n_probe=None):
+        # Documents candidats (ordre du corpus) et leur similarité cosinus avec la requête
+        self.refresh()
+        n_docs = self.n_rows + len(self.extra)
+        if rows is not None and len(rows) <= FILTER_SLICE_RATIO * n_docs:
+            # Filtre sélectif : calcul exact sur les seules lignes retenues
+            return rows, self.vectors_for(rows) @ query_vector
+        positions = self.probe(query_vector, n_probe or self.n_probe)
+        docs = np.concatenate([self.ids[positions], np.arange(self.n_rows, n_docs)])
+        scores = np.concatenate([self.vectors[positions] @ query_vector, self.extra @ query_vector])
+        if rows is not None:
+            kept = np.zeros(n_docs, dtype=bool)
+            kept[rows] = True
+            docs, scores = docs[kept[docs]], scores[kept[docs]]
+        order = np.argsort(docs, kind="stable")
+        return docs[order], scores[order]
+
+    def search(self, query, k=10, offset=0, filters=None, n_probe=None):
+        # total : candidats de similarité positive parmi les listes sondées
+        with METRICS.timer("search_seconds", engine=type(self).__name__):
+            rows = self.engine.filter_rows(filters)
+            query_vector = self.project(self.engine.vectorizer.transform([query]))[0]
+            with METRICS.timer("search_stage_seconds", stage="semantic"):
+                docs, scores = self.candidates(query_vector, rows, n_probe)
+            selected, total = top_k(scores, offset + k)
+            selected = selected[offset:]
+            return ResultPage(self.engine.documents, docs[selected], scores[selected], total, offset)
+
+    def search_hybrid(self, query, k=10, offset=0, filters=None, weight=HYBRID_WEIGHT, n_probe=None):
+        # Combinaison des similarités lexicale (cosinus TF-IDF) et sémantique, calculées
+        # exactement sur l'union des meilleurs candidats de chacun des deux classements
+        with METRICS.timer("search_seconds", engine="hybride"):
+            limit = (offset + k) * HYBRID_CANDIDATES
+            rows = self.engine.filter_rows(filters)
+            lexical = self.engine.rank(query, limit, 0, rows)
+            query_vec = self.engine.vectorizer.transform([query])
+            query_vector = self.project(query_vec)[0]
+            with METRICS.timer("search_stage_seconds", stage="semantic"):
+                docs, scores = self.candidates(query_vector, rows, n_probe)
+                selected, _ = top_k(scores, limit)
+                candidates = np.union1d(lexical.indices, docs[selected]).astype(np.int64)
+            with METRICS.timer("search_stage_seconds", stage="hybrid"):
+                lexical_scores = (self.engine.doc_matrix[candidates] @ query_vec.T).toarray().ravel()
+                scores = weight * lexical_scores + (1 - weight) * (self.vectors_for(candidates) @ query_vector)
+                selected, total = top_k(scores, offset + k)
+            selected = selected[offset:]
+            return ResultPage(self.engine.documents, candidates[selected], scores[selected], total, offset)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name, array in [("projection.npy", self.projection), ("centroids.npy", self.centroids),
+                            ("vectors.npy", np.asarray(self.vectors)), ("ids.npy", self.ids), ("offsets.npy", self.offsets)]:
+            save_array(path, name, array)
+        # Le fichier meta.json est écrit en dernier : sa présence marque un index complet
+        meta = {
+            "format_version": SEMANTIC_FORMAT_VERSION,
+            "rows": self.n_rows,
+            "fingerprint": corpus_fingerprint(self.engine.documents, self.n_rows),
+            "n_probe": self.n_probe,
+        }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path, engine, mmap=True):
+        check_semantic_engine(engine)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["format_version"] != SEMANTIC_FORMAT_VERSION:
+            raise ValueError(f"Version d'index sémantique non supportée : {meta['format_version']}")
+        # Le moteur peut avoir indexé des documents depuis : seuls les premiers doivent correspondre
+        if (meta["rows"] > engine.doc_matrix.shape[0]
+                or corpus_fingerprint(engine.documents, meta["rows"]) != meta["fingerprint"]):
+            raise ValueError("L'index sémantique ne correspond pas au corpus actuel")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy")) for name in ("projection", "centroids", "ids", "offsets")}
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        return cls(engine, arrays["projection"], arrays["centroids"], vectors, arrays["ids"], arrays["offsets"],
+                   meta["n_probe"])
+
+def normalize_dense(vectors):
+    # Normalisation L2 des lignes (les lignes nulles restent nulles)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+def check_semantic_engine(engine):
+    if engine.SCORING != SearchEngine.SCORING or isinstance(engine.vectorizer, HashingTfidfVectorizer):
+        raise ValueError("La recherche sémantique s'appuie sur un index TF-IDF à vocabulaire")
+
+def semantic_index_for(engine, path, n_probe=SEMANTIC_PROBES):
+    # Index sémantique enregistré s'il correspond encore au moteur, sinon (re)construit
+    try:
+        index = SemanticIndex.load(path, engine)
+    except (FileNotFoundError, ValueError):
+        index = None
+    if index is None or index.stale():
+        index = SemanticIndex.build(engine, path, n_probe=n_probe)
+    index.n_probe = n_probe
+    return index
@@ -0,0 +1,335 @@
+import urllib.parse
+import urllib.error
+import http.client
+import threading
+import queue
+from types import SimpleNamespace
+from xml.etree import ElementTree
+from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from .lazy import praw, requests
+from .metrics import METRICS
+from .documents import UNKNOWN_AUTHOR, RedditPost, ArxivPaper
+
+# ======================
+# Fonction pour extraire les posts Reddit
+# ======================
+REDDIT_CREDENTIALS = {
+    "client_id": 'y_jUSZ3PH27WkoD6IY52UQ',
+    "client_secret": 'W1KV3UJjFlxRrDla-ZFIvfc_wGkrmw',
+    "user_agent": 'Redit WebScraping',
+    "redirect_uri": 'http://localhost:8080',
+}
+reddit_client = None
+reddit_client_lock = threading.Lock()
+
+def shared_reddit_client():
+    # Un seul client praw pour tout le processus (authentification et session HTTP réutilisées)
+    global reddit_client
+    with reddit_client_lock:
+        if reddit_client is None:
+            # Session HTTP fournie à praw : un crochet y mesure chaque réponse
+            session = requests.Session()
+            session.hooks["response"].append(record_reddit_response)
+            reddit_client = praw.Reddit(**REDDIT_CREDENTIALS, requestor_kwargs={"session": session})
+        return reddit_client
+
+def record_reddit_response(response, *args, **kwargs):
+    if METRICS.enabled:
+        METRICS.count("source_bytes_total", len(response.content), source="Reddit")
+        METRICS.observe("source_request_seconds", response.elapsed.total_seconds(), source="Reddit")
+
+def reddit_submission_to_post(post, subreddit=""):
+    post_data = f"{post.title} - {post.selftext}"
+    return RedditPost(
+        title=post.title,
+        creator=str(post.author) if post.author else UNKNOWN_AUTHOR,
+        timestamp=str(datetime.fromtimestamp(post.created_utc)),
+        comments=post.num_comments,
+        content=post_data,
+        subreddit=subreddit
+    )
+
+class RedditExtractor:
+    def __init__(self, subreddits=("Python",), limit=10, listing="top", client=None, max_workers=8, queue_size=1000):
+        self.subreddits = list(subreddits)
+        self.limit = limit
+        self.listing = listing
+        self.client = client
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.errors = {}
+
+    def posts(self):
+        # Générateur : un thread par subreddit alimente une file bornée, les
+        # posts sont produits dès leur arrivée sans attendre la fin de la collecte
+        client = self.client if self.client is not None else shared_reddit_client()
+        posts_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        self.errors = {}
+
+        def offer(item):
+            while not stop.is_set():
+                try:
+                    posts_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch(name):
+            try:
+                for submission in getattr(client.subreddit(name), self.listing)(limit=self.limit):
+                    if not offer(reddit_submission_to_post(submission, name)):
+                        return
+            except Exception as exc:
+                self.errors[name] = exc
+            finally:
+                offer(None)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.subreddits))))
+        for name in self.subreddits:
+            executor.submit(fetch, name)
+        produced, pending = 0, len(self.subreddits)
+        try:
+            while pending:
+                post = posts_queue.get()
+                if post is None:
+                    pending -= 1
+                    continue
+                produced += 1
+                METRICS.count("source_documents_total", source="Reddit")
+                yield post
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        if not produced and self.errors:
+            raise next(iter(self.errors.values()))
+
+def reddit_posts_extract():
+    with METRICS.timer("extract_seconds", source="Reddit"):
+        return list(RedditExtractor(subreddits=("Python",), limit=10).posts())
+
+# ======================
+# Client Reddit factice (tests et mesures de débit hors ligne)
+# ======================
+class FakeRedditClient:
+    def __init__(self, posts_per_subreddit=100, latency=0.0):
+        self.posts_per_subreddit = posts_per_subreddit
+        self.latency = latency
+
+    def subreddit(self, name):
+        return FakeSubreddit(name, self.posts_per_subreddit, self.latency)
+
+class FakeSubreddit:
+    def __init__(self, name, size, latency):
+        self.name = name
+        self.size = size
+        self.latency = latency
+
+    def listing(self, limit=None):
+        count = self.size if limit is None else min(limit, self.size)
+        for i in range(count):
+            # Latence simulée d'une page de 100 résultats de l'API Reddit
+            if self.latency and i % 100 == 0:
+                time.sleep(self.latency)
+            yield SimpleNamespace(
+                title=f"{self.name} post {i}",
+                selftext=f"Contenu du post {i} publié sur r/{self.name}",
+                author=f"user_{i % 50}",
+                created_utc=1735689600 + 60 * i,
+                num_comments=i % 200,
+            )
+
+    top = hot = new = listing
+
+# ======================
+# Fonction pour extraire les articles Arxiv
+# ======================
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+# arXiv demande au plus une requête toutes les trois secondes
+ARXIV_REQUEST_RATE = 1 / 3
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH_NS = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+class TokenBucket:
+    # Limiteur de débit : on ne dort que si aucun jeton n'est disponible
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            # Un solde négatif réserve le jeton pour l'appelant qui va attendre
+            self.tokens -= 1
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+def arxiv_entry_to_paper(entry):
+    authors = [name.text for name in entry.iterfind(f"{ATOM_NS}author/{ATOM_NS}name")]
+    return ArxivPaper(
+        title=entry.findtext(f"{ATOM_NS}title", "").replace("\n", " "),
+        creators=authors,
+        timestamp=entry.findtext(f"{ATOM_NS}published", ""),
+        content=entry.findtext(f"{ATOM_NS}summary", "").replace("\n", " ")
+    )
+
+def parse_arxiv_feed(stream, chunk_size=64 * 1024, on_total=None):
+    # Analyse incrémentale du flux Atom : chaque entrée est convertie puis
+    # retirée de l'arbre dès qu'elle est complète
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    feed = None
+    while True:
+        chunk = stream.read(chunk_size)
+        METRICS.count("source_bytes_total", len(chunk), source="Arxiv")
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+        for event, element in parser.read_events():
+            if event == "start":
+                if feed is None:
+                    feed = element
+            elif element.tag == f"{ATOM_NS}entry":
+                yield arxiv_entry_to_paper(element)
+                feed.remove(element)
+            elif element.tag == f"{OPENSEARCH_NS}totalResults" and on_total is not None:
+                on_total(int(element.text))
+        if not chunk:
+            return
+
+class ArxivHarvester:
+    def __init__(self, query="all:Data Science", page_size=100, max_results=None, url=ARXIV_API_URL,
+                 rate=ARXIV_REQUEST_RATE, timeout=30):
+        parts = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.path = parts.path
+        self.query = query
+        self.page_size = page_size
+        self.max_results = max_results
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate)
+        self.connection = None
+        self.total_results = None
+
+    def papers(self):
+        # Générateur : les articles sont produits page par page, au fil de l'analyse
+        start = 0
+        try:
+            while self.max_results is None or start < self.max_results:
+                if self.total_results is not None and start >= self.total_results:
+                    return
+                size = self.page_size if self.max_results is None else min(self.page_size, self.max_results - start)
+                count = 0
+                for paper in self.fetch_page(start, size):
+                    count += 1
+                    METRICS.count("source_documents_total", source="Arxiv")
+                    yield paper
+                if count < size:
+                    return
+                start += count
+        finally:
+            self.close()
+
+    def fetch_page(self, start, size):
+        self.bucket.acquire()
+        params = urllib.parse.urlencode({"search_query": self.query, "start": start, "max_results": size})
+        # Temps jusqu'aux en-têtes de la réponse ; le corps est lu au fil de l'analyse
+        with METRICS.timer("source_request_seconds", source="Arxiv"):
+            response = self.request(f"{self.path}?{params}")
+        try:
+            yield from parse_arxiv_feed(response, on_total=self.set_total)
+        finally:
+            response.close()
+
+    def set_total(self, total):
+        self.total_results = total
+
+    def request(self, target):
+        # Une seule connexion HTTP persistante, rouverte si le serveur l'a fermée
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            try:
+                self.connection.request("GET", target)
+                response = self.connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                response.read()
+                raise urllib.error.HTTPError(target, response.status, response.reason, response.headers, None)
+            return response
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+def arxiv_papers_extract():
+    with METRICS.timer("extract_seconds", source="Arxiv"):
+        return list(ArxivHarvester(query="all:Data Science", max_results=10).papers())
+
+# ======================
+# Ingestion concurrente des sources
+# ======================
+SOURCES = {"Reddit": reddit_posts_extract, "Arxiv": arxiv_papers_extract}
+
+# Mêmes sources en flux : les documents arrivent un à un (progression, annulation)
+SOURCE_STREAMS = {
+    "Reddit": lambda: RedditExtractor(subreddits=("Python",), limit=10).posts(),
+    "Arxiv": lambda: ArxivHarvester(query="all:Data Science", max_results=10).papers(),
+}
+
+def timed_extract(extract):
+    start = time.perf_counter()
+    try:
+        documents, error = extract(), None
+    except Exception as exc:
+        documents, error = [], exc
+    return documents, time.perf_counter() - start, error
+
+def ingest_sources(document_manager, sources=SOURCES, timeout=None):
+    # Les extracteurs (limités par le réseau) tournent en parallèle ; leurs
+    # documents sont ajoutés au gestionnaire dans l'ordre d'arrivée, depuis le
+    # thread appelant. Une source lente ou en échec ne bloque pas les autres.
+    start = time.perf_counter()
+    reports = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, len(sources)))
+    futures = {executor.submit(timed_extract, extract): name for name, extract in sources.items()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            documents, seconds, error = future.result()
+            added = sum(1 for document in documents if document_manager.add(document))
+            reports[futures[future]] = {"documents": added, "duplicates": len(documents) - added,
+                                        "seconds": seconds, "error": error}
+    except FutureTimeoutError:
+        for name in futures.values():
+            if name not in reports:
+                reports[name] = {"documents": 0, "duplicates": 0, "seconds": time.perf_counter() - start,
+                                 "error": FutureTimeoutError(f"délai de {timeout} s dépassé")}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return reports
+
+def format_ingestion_report(name, report):
+    if report["error"] is not None:
+        return f"{name} : échec après {report['seconds']:.2f} s ({report['error']})"
+    message = f"{name} : {report['documents']} documents en {report['seconds']:.2f} s"
+    if report["duplicates"]:
+        message += f" ({report['duplicates']} doublons ignorés)"
+    return message
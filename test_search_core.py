@@ -0,0 +1,1047 @@
+import unittest
+import threading
+import time
+import os
+import pickle
+import tempfile
+import json
+import tracemalloc
+import numpy as np
+from search_core.metrics import NULL_TIMER, Metrics, format_metrics_summary, METRICS
+from search_core.documents import BaseDocument, RedditPost, ArxivPaper, DocumentStore, benchmark_document_memory
+from search_core.corpus import (MINHASH_BANDS, MINHASH_PRIME, shingle_hashes, DuplicateDetector, DocumentManager,
+                                write_corpus, read_corpus, load_corpus, benchmark_corpus_io, SearchFilter)
+from search_core.sources import (RedditExtractor, reddit_posts_extract, FakeRedditClient, TokenBucket, ArxivHarvester,
+                                 arxiv_papers_extract, ingest_sources)
+from search_core.engines import (SearchEngine, InvertedIndexEngine, BM25FEngine, ShardedSearchEngine,
+                                 build_streaming_index)
+from search_core.semantic import SemanticIndex, semantic_index_for
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# ====================
+# Faux serveur arXiv (flux Atom préenregistrés)
+# ====================
+ATOM_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+  <title>ArXiv Query</title>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  {entries}
+</feed>"""
+
+ATOM_ENTRY = """<entry>
+    <title>Article {i}</title>
+    <published>2025-01-{day:02d}T00:00:00Z</published>
+    <summary>Résumé
+de l'article {i}</summary>
+    <author><name>Auteur {i}</name></author>
+    <author><name>Coauteur {i}</name></author>
+  </entry>"""
+
+class FakeArxivHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    total = 5
+    connections = 0
+    requests = []
+
+    def setup(self):
+        super().setup()
+        FakeArxivHandler.connections += 1
+
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        start, size = int(params["start"][0]), int(params["max_results"][0])
+        FakeArxivHandler.requests.append((start, size))
+        entries = "".join(ATOM_ENTRY.format(i=i, day=i + 1) for i in range(start, min(start + size, self.total)))
+        body = ATOM_FEED.format(total=self.total, entries=entries).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSearchCore(unittest.TestCase):
+    # ====================
+    # Test de la classe BaseDocument
+    # ====================
+    def test_base_document_creation(self):
+        print("[Test] Création d'un BaseDocument...")
+        base_doc = BaseDocument("Titre générique", "Auteur Test", "2025-01-01", "Contenu générique")
+        self.assertEqual(base_doc.title, "Titre générique")
+        self.assertEqual(base_doc.creator, "Auteur Test")
+        self.assertEqual(base_doc.timestamp, "2025-01-01")
+        self.assertEqual(base_doc.doc_type, "Generic Document")
+        print("✔️ BaseDocument créé avec succès.")
+
+    # ====================
+    # Test de la classe RedditPost
+    # ====================
+    def test_reddit_post_creation(self):
+        print("[Test] Création d'un RedditPost...")
+        reddit_post = RedditPost("Titre Reddit", "Utilisateur Reddit", "2025-01-01", 100, "Contenu Reddit")
+        self.assertEqual(reddit_post.title, "Titre Reddit")
+        self.assertEqual(reddit_post.creator, "Utilisateur Reddit")
+        self.assertEqual(reddit_post.comments, 100)
+        self.assertEqual(reddit_post.doc_type, "Reddit Post")
+        print("✔️ RedditPost créé avec succès.")
+
+    # ====================
+    # Test de la classe ArxivPaper
+    # ====================
+    def test_arxiv_paper_creation(self):
+        print("[Test] Création d'un ArxivPaper...")
+        arxiv_paper = ArxivPaper("Titre Arxiv", ["Auteur1", "Auteur2"], "2025-01-01", "Résumé Arxiv")
+        self.assertEqual(arxiv_paper.title, "Titre Arxiv")
+        self.assertEqual(arxiv_paper.creators, ["Auteur1", "Auteur2"])
+        self.assertEqual(arxiv_paper.doc_type, "Arxiv Paper")
+        print("✔️ ArxivPaper créé avec succès.")
+
+    # ====================
+    # Test de la classe DocumentManager
+    # ====================
+    def test_document_manager(self):
+        print("[Test] Gestion des documents avec DocumentManager...")
+        manager = DocumentManager()
+        doc1 = RedditPost("Titre1", "Auteur1", "2025-01-01", 10)
+        doc2 = ArxivPaper("Titre2", ["Auteur2"], "2025-01-02")
+        manager.add(doc1)
+        manager.add(doc2)
+        self.assertEqual(len(manager.doc_list), 2)
+        print("✔️ DocumentManager fonctionne correctement.")
+
+    # ====================
+    # Test de l'extraction Reddit
+    # ====================
+    def test_reddit_posts_extract(self):
+        print("[Test] Extraction des posts Reddit...")
+        reddit_posts = reddit_posts_extract()
+        self.assertGreater(len(reddit_posts), 0)
+        self.assertIsInstance(reddit_posts[0], RedditPost)
+        print("✔️ Extraction des posts Reddit réussie.")
+
+    # ====================
+    # Test de l'extraction Arxiv
+    # ====================
+    def test_arxiv_papers_extract(self):
+        print("[Test] Extraction des articles Arxiv...")
+        arxiv_papers = arxiv_papers_extract()
+        self.assertGreater(len(arxiv_papers), 0)
+        self.assertIsInstance(arxiv_papers[0], ArxivPaper)
+        print("✔️ Extraction des articles Arxiv réussie.")
+
+    # ====================
+    # Test du moteur de recherche
+    # ====================
+    def test_search_engine(self):
+        print("[Test] Initialisation du moteur de recherche...")
+        docs = [
+            BaseDocument("Python Tutorial", "John Doe", "2025-01-01", "Learn Python basics"),
+            BaseDocument("Advanced Python", "Jane Smith", "2025-02-01", "Master advanced Python techniques"),
+            BaseDocument("Data Science", "Alice Brown", "2025-03-01", "Learn data science with Python")
+        ]
+        search_engine = SearchEngine(docs)
+        results = search_engine.search("Python")
+        self.assertGreater(len(results), 0)
+        print("✔️ Moteur de recherche fonctionne correctement.")
+
+    # ====================
+    # Test de la persistance de l'index
+    # ====================
+    def test_search_engine_save_load(self):
+        print("[Test] Sauvegarde et rechargement de l'index...")
+        docs = [
+            RedditPost("Python Tutorial", "John Doe", "2025-01-01", 12, "Learn Python basics"),
+            ArxivPaper("Data Science", ["Alice Brown", "Bob White"], "2025-03-01", "Learn data science with Python")
+        ]
+        search_engine = SearchEngine(docs)
+        with tempfile.TemporaryDirectory() as index_dir:
+            search_engine.save(index_dir)
+            loaded_engine = SearchEngine.load(index_dir)
+            self.assertEqual([doc.title for doc, _ in loaded_engine.search("Python")],
+                             [doc.title for doc, _ in search_engine.search("Python")])
+            self.assertEqual(loaded_engine.documents[0].comments, 12)
+            self.assertEqual(loaded_engine.documents[1].creators, ["Alice Brown", "Bob White"])
+            self.assertEqual(SearchEngine.load(index_dir, docs).documents, docs)
+            self.assertEqual(SearchEngine.load(index_dir, DocumentStore(docs)).documents.fingerprint(),
+                             loaded_engine.documents.fingerprint())
+            with self.assertRaises(ValueError):
+                SearchEngine.load(index_dir, docs[:1])
+            # Même nombre de documents, contenu différent : l'empreinte des colonnes diffère
+            with self.assertRaises(ValueError):
+                SearchEngine.load(index_dir, [docs[0], ArxivPaper("Data Science", ["Alice Brown"], "2025-03-01",
+                                                                  "Learn data science with Python")])
+            # Les colonnes relues acceptent de nouveaux documents
+            loaded_engine.add_documents([RedditPost("Rust Guide", "Eve", "2025-04-01", 3, "Systems programming with Rust")])
+            self.assertEqual(loaded_engine.search("Rust")[0][0].title, "Rust Guide")
+        print("✔️ Index sauvegardé et rechargé correctement.")
+
+    # ====================
+    # Test de l'aller-retour des documents par l'index enregistré
+    # ====================
+    def test_index_documents_round_trip(self):
+        print("[Test] Classes et champs des documents après sauvegarde et rechargement de l'index...")
+        docs = [
+            BaseDocument("Python notes", "Eve", "2025-02-01", "Generic python notes"),
+            RedditPost("Python Tutorial", "John Doe", "2025-01-01", 12, "Learn Python basics", "learnpython"),
+            ArxivPaper("Data Science", ["Alice Brown", "Bob White"], "2025-03-01", "Learn data science with Python")
+        ]
+        # Documents lus dans un DocumentStore, puis index rechargé et enregistré de nouveau
+        engine = SearchEngine(DocumentStore(docs))
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("premier", "second"):
+                engine.save(os.path.join(directory, name))
+                engine = SearchEngine.load(os.path.join(directory, name))
+                self.assertEqual([(isinstance(doc, RedditPost), isinstance(doc, ArxivPaper)) for doc in engine.documents],
+                                 [(False, False), (True, False), (False, True)])
+                for loaded, original in zip(engine.documents, docs):
+                    self.assertEqual((loaded.title, loaded.creator, loaded.timestamp, loaded.content, loaded.doc_type),
+                                     (original.title, original.creator, original.timestamp, original.content, original.doc_type))
+                self.assertEqual((engine.documents[1].comments, engine.documents[1].subreddit), (12, "learnpython"))
+                self.assertEqual(engine.documents[2].creators, ["Alice Brown", "Bob White"])
+        print("✔️ Documents rechargés avec leur classe et leurs champs.")
+
+    # ====================
+    # Test de l'indexation incrémentale
+    # ====================
+    def test_search_engine_add_documents(self):
+        print("[Test] Ajout incrémental de documents au moteur de recherche...")
+        docs = [
+            BaseDocument("Python Tutorial", "John Doe", "2025-01-01", "Learn Python basics"),
+            BaseDocument("Advanced Python", "Jane Smith", "2025-02-01", "Master advanced Python techniques"),
+            BaseDocument("Rust Guide", "Alice Brown", "2025-03-01", "Systems programming with Rust"),
+            BaseDocument("Data Science", "Bob White", "2025-04-01", "Learn data science with Python")
+        ]
+        manager = DocumentManager()
+        manager.add(docs[0])
+        manager.search_engine = SearchEngine(manager.doc_list)
+        for doc in docs[1:]:
+            manager.add(doc)
+        self.assertEqual(manager.search_engine.search("Rust")[0][0].title, "Rust Guide")
+
+        manager.search_engine.compact()
+        incremental_scores = {doc.title: score for doc, score in manager.search_engine.search("learn Python")}
+        full_scores = {doc.title: score for doc, score in SearchEngine(docs).search("learn Python")}
+        self.assertEqual(incremental_scores.keys(), full_scores.keys())
+        for title, score in full_scores.items():
+            self.assertAlmostEqual(incremental_scores[title], score)
+        print("✔️ Documents ajoutés sans réentraînement complet.")
+
+    # ====================
+    # Test de la pagination des résultats
+    # ====================
+    def test_search_engine_pagination(self):
+        print("[Test] Sélection top-k et pagination des résultats...")
+        docs = [BaseDocument(f"Doc {i}", "Auteur", "2025-01-01", "python " * (i + 1) + "langage " * (12 - i)) for i in range(12)]
+        docs.append(BaseDocument("Hors sujet", "Auteur", "2025-01-01", "cuisine"))
+        search_engine = SearchEngine(docs)
+
+        first_page = search_engine.search("python", k=5)
+        second_page = search_engine.search("python", k=5, offset=5)
+        last_page = search_engine.search("python", k=5, offset=10)
+        self.assertEqual(first_page.total, 12)
+        self.assertEqual((len(first_page), len(second_page), len(last_page)), (5, 5, 2))
+        self.assertTrue(second_page.has_next())
+        self.assertFalse(last_page.has_next())
+
+        ranked = [doc.title for page in (first_page, second_page, last_page) for doc, _ in page]
+        self.assertEqual(ranked, [f"Doc {i}" for i in range(11, -1, -1)])
+        print("✔️ Pagination des résultats correcte.")
+
+    # ====================
+    # Test du moteur à index inversé
+    # ====================
+    def test_inverted_index_engine(self):
+        print("[Test] Classement du moteur à index inversé...")
+        words = ["python", "data", "science", "rust", "java", "learn", "model", "graph"]
+        docs = [BaseDocument(f"Doc {i}", "Auteur", "2025-01-01",
+                             " ".join(words[(i * j) % len(words)] for j in range(1, 6 + i % 4)))
+                for i in range(60)]
+        search_engine = SearchEngine(docs)
+        inverted_engine = InvertedIndexEngine.from_engine(search_engine)
+        for query in ["python", "data science", "rust graph model", "inconnu"]:
+            for k, offset in [(5, 0), (5, 5), (100, 0)]:
+                expected = search_engine.search(query, k=k, offset=offset)
+                results = inverted_engine.search(query, k=k, offset=offset)
+                self.assertEqual([doc for doc, _ in results], [doc for doc, _ in expected])
+                self.assertEqual(results.total, expected.total)
+        # Documents présents dans plusieurs listes de termes : comptés une seule fois
+        terms = [search_engine.vectorizer.vocabulary_[word] for word in ("data", "science", "python")]
+        self.assertEqual(inverted_engine.count_matches(terms), len(search_engine.matches("data science python")))
+        self.assertFalse(inverted_engine.count_marks.any())
+
+        inverted_engine.add_documents([BaseDocument("Nouveau", "Auteur", "2025-02-01", "kotlin")])
+        self.assertEqual(inverted_engine.search("kotlin")[0][0].title, "Nouveau")
+        print("✔️ Index inversé conforme au moteur TF-IDF.")
+
+    # ====================
+    # Test de l'indépendance des moteurs créés par from_engine
+    # ====================
+    def test_from_engine_independent(self):
+        print("[Test] Ajouts dans un moteur sans effet sur le moteur créé à partir de lui...")
+        docs = [BaseDocument(f"Doc {i}", "Auteur", "2025-01-01", text)
+                for i, text in enumerate(["python data", "data science", "rust graph", "python model", "java graph"])]
+        search_engine = SearchEngine(docs)
+        search_engine.add_documents([BaseDocument("Doc 5", "Auteur", "2025-01-02", "python science")])
+        inverted_engine = InvertedIndexEngine.from_engine(search_engine)
+        expected = [(doc.title, score) for doc, score in inverted_engine.search("python graph")]
+
+        # Nouveaux termes et compaction (IDF recalculés sur place) dans le moteur d'origine
+        search_engine.add_documents([BaseDocument("Doc 6", "Auteur", "2025-01-03", "kotlin swift haskell")])
+        search_engine.compact()
+        self.assertEqual(search_engine.search("kotlin")[0][0].title, "Doc 6")
+        self.assertEqual([(doc.title, score) for doc, score in inverted_engine.search("python graph")], expected)
+        self.assertEqual(len(inverted_engine.search("kotlin")), 0)
+
+        # Les documents restent partagés : le moteur dérivé indexe à son tour le document
+        # déjà ajouté au corpus, puis un nouveau, sans effet sur le moteur d'origine
+        inverted_engine.add_documents(search_engine.documents[6:], stored=True)
+        self.assertEqual(inverted_engine.search("kotlin")[0][0].title, "Doc 6")
+        inverted_engine.add_documents([BaseDocument("Doc 7", "Auteur", "2025-01-04", "elixir erlang")])
+        self.assertEqual(inverted_engine.search("elixir")[0][0].title, "Doc 7")
+        self.assertEqual(len(search_engine.search("elixir")), 0)
+        self.assertEqual(search_engine.search("kotlin")[0][0].title, "Doc 6")
+        print("✔️ Moteurs indépendants après from_engine.")
+
+    # ====================
+    # Test du moteur réparti entre plusieurs processus
+    # ====================
+    def test_sharded_engine(self):
+        print("[Test] Moteur réparti : fusion des meilleurs résultats de chaque partition...")
+        words = ["python", "data", "science", "rust", "java", "learn", "model", "graph"]
+        docs = [RedditPost(f"Post {i}", f"user_{i % 5}", "2025-01-01 10:00:00", i,
+                           " ".join(words[(i * j) % len(words)] for j in range(1, 6 + i % 4)))
+                if i % 2 else
+                BaseDocument(f"Doc {i}", "Auteur", "2025-01-01", " ".join(words[(i * j + 1) % len(words)] for j in range(1, 4 + i % 3)))
+                for i in range(90)]
+        search_engine = SearchEngine(list(docs), compaction_ratio=0.2)
+        sharded_engine = ShardedSearchEngine(list(docs), compaction_ratio=0.2, n_shards=3)
+
+        def assert_same_results(expected, results):
+            self.assertEqual(results.indices.tolist(), expected.indices.tolist())
+            self.assertEqual(results.total, expected.total)
+            for score, expected_score in zip(results.scores, expected.scores):
+                self.assertAlmostEqual(score, expected_score)
+
+        queries = ["python", "data science", "rust graph model", "inconnu"]
+        try:
+            for query in queries:
+                for k, offset in [(5, 0), (5, 5), (100, 0)]:
+                    assert_same_results(search_engine.search(query, k=k, offset=offset),
+                                        sharded_engine.search(query, k=k, offset=offset))
+                search_filter = SearchFilter(doc_type='Reddit Post', creator=["user_1", "user_3"])
+                assert_same_results(search_engine.search(query, filters=search_filter),
+                                    sharded_engine.search(query, filters=search_filter))
+            for expected, results in zip(search_engine.search_many(queries, k=7), sharded_engine.search_many(queries, k=7)):
+                assert_same_results(expected, results)
+            for expected, results in zip(search_engine.search_many(queries, k=7, filters=search_filter),
+                                         sharded_engine.search_many(queries, k=7, filters=search_filter)):
+                assert_same_results(expected, results)
+            directory = sharded_engine.pool.directory
+            processes = sharded_engine.pool.processes
+
+            # Ajout sans compaction : seule la dernière partition est republiée (nouveau terme compris)
+            new_docs = [BaseDocument("Kotlin", "Auteur", "2025-02-01", "kotlin data")]
+            search_engine.add_documents(new_docs)
+            sharded_engine.add_documents(new_docs)
+            assert_same_results(search_engine.search("kotlin data", k=20), sharded_engine.search("kotlin data", k=20))
+            self.assertEqual(sharded_engine.boundaries[-1], len(docs) + 1)
+            # Compaction : toutes les partitions sont republiées et rééquilibrées
+            more_docs = [BaseDocument(f"Extra {i}", "Auteur", "2025-03-01", "python kotlin") for i in range(30)]
+            search_engine.add_documents(more_docs)
+            sharded_engine.add_documents(more_docs)
+            for query in queries + ["kotlin"]:
+                assert_same_results(search_engine.search(query, k=10, offset=2), sharded_engine.search(query, k=10, offset=2))
+            self.assertEqual(len(os.listdir(directory)), 3)
+        finally:
+            sharded_engine.close()
+        self.assertFalse(os.path.exists(directory))
+        self.assertFalse(any(process.is_alive() for process in processes))
+        print("✔️ Classement réparti identique au moteur à un seul processus.")
+
+    # ====================
+    # Test de l'indexation en flux
+    # ====================
+    def test_streaming_index(self):
+        print("[Test] Construction de l'index en flux, à mémoire bornée...")
+        words = ["python", "data", "science", "rust", "java", "learn", "model", "graph"]
+
+        def generate_documents(n_documents):
+            for i in range(n_documents):
+                yield BaseDocument(f"Doc {i}", "Auteur", "2025-01-01",
+                                   " ".join(words[(i * j) % len(words)] for j in range(1, 6 + i % 4)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index")
+            report = build_streaming_index(generate_documents(300), path, n_features=2 ** 16, chunk_size=64)
+            self.assertEqual(report["documents"], 300)
+            self.assertEqual(sorted(os.listdir(path)), ["data.npy", "documents", "idf.npy", "indices.npy", "indptr.npy", "meta.json"])
+
+            # Sans collision de hachage, mêmes scores que le vocabulaire exact
+            search_engine = SearchEngine(list(generate_documents(300)))
+            streamed_engine = SearchEngine.load(path)
+            # Indices et indptr de même type : la matrice chargée reste projetée en mémoire
+            for array in (streamed_engine.doc_matrix.data, streamed_engine.doc_matrix.indices, streamed_engine.doc_matrix.indptr):
+                while not isinstance(array, np.memmap) and array.base is not None:
+                    array = array.base
+                self.assertIsInstance(array, np.memmap)
+            self.assertEqual([doc.title for doc in streamed_engine.documents], [doc.title for doc in search_engine.documents])
+            for query in ["python", "data science", "rust graph model", "inconnu"]:
+                expected, results = search_engine.search(query, k=20), streamed_engine.search(query, k=20)
+                self.assertEqual(results.total, expected.total)
+                for score, expected_score in zip(results.scores, expected.scores):
+                    self.assertAlmostEqual(score, expected_score)
+            SearchEngine.load(path, search_engine.documents)
+            with self.assertRaises(ValueError):
+                SearchEngine.load(path, search_engine.documents[:10])
+
+            # L'index haché reste modifiable et enregistrable
+            streamed_engine.add_documents([BaseDocument("Nouveau", "Auteur", "2025-02-01", "kotlin coroutines")])
+            self.assertEqual(streamed_engine.search("kotlin")[0][0].title, "Nouveau")
+            streamed_engine.save(os.path.join(directory, "copie"))
+            self.assertEqual(SearchEngine.load(os.path.join(directory, "copie")).search("kotlin")[0][0].title, "Nouveau")
+
+            # Pic mémoire indépendant du nombre de documents
+            peaks = []
+            for n_documents in (500, 2000):
+                tracemalloc.start()
+                build_streaming_index(generate_documents(n_documents), os.path.join(directory, f"index_{n_documents}"),
+                                      n_features=2 ** 14, chunk_size=100)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            self.assertLess(peaks[1], 1.5 * peaks[0])
+        print("✔️ Index construit par paquets et interrogeable.")
+
+    # ====================
+    # Test du moteur BM25F
+    # ====================
+    def test_bm25f_engine(self):
+        print("[Test] Classement BM25F sur le titre et le contenu...")
+        docs = [RedditPost("Python tips", "user_1", "2025-01-01 10:00:00", 4, "notes about data science"),
+                BaseDocument("Data tips", "Auteur", "2025-01-02", "python about data science"),
+                ArxivPaper("Survey tips", ["Auteur"], "2025-01-03", "python data " + "science model graph " * 3),
+                BaseDocument("Rust tips", "Auteur", "2025-01-04", "rust only here now")]
+        search_engine = BM25FEngine(list(docs))
+
+        # Un terme du titre pèse plus que le même terme dans le contenu, et un contenu
+        # court plus qu'un contenu long
+        self.assertEqual([doc.title for doc, _ in search_engine.search("python")], ["Python tips", "Data tips", "Survey tips"])
+        self.assertEqual(search_engine.search("python").total, 3)
+        self.assertEqual(len(search_engine.search("inconnu")), 0)
+        results = search_engine.search("python", filters=SearchFilter(doc_type="Reddit Post"))
+        self.assertEqual([doc.title for doc, _ in results], ["Python tips"])
+        self.assertEqual([[doc.title for doc, _ in page] for page in search_engine.search_many(["python", "rust"], k=2)],
+                         [["Python tips", "Data tips"], ["Rust tips"]])
+        # Sans mot partiel, la recherche pendant la saisie donne les scores de search()
+        expected = search_engine.search("python data")
+        results = search_engine.search_incremental("python data ")
+        self.assertEqual(results.indices.tolist(), expected.indices.tolist())
+        self.assertEqual(search_engine.search_incremental("python sci")[0][0].title, search_engine.search("python science")[0][0].title)
+
+        # Ajouts puis compaction : mêmes poids qu'un index construit d'un coup
+        new_docs = [BaseDocument("Kotlin", "Auteur", "2025-02-01", "kotlin data"),
+                    BaseDocument("Python again", "Auteur", "2025-02-02", "python kotlin")]
+        incremental_engine = BM25FEngine(list(docs[:2]), compaction_ratio=10)
+        incremental_engine.add_documents(docs[2:])
+        incremental_engine.add_documents(new_docs)
+        self.assertEqual(incremental_engine.search("kotlin")[0][0].title, "Kotlin")
+        incremental_engine.compact()
+        full_engine = BM25FEngine(docs + new_docs)
+        for query in ["python", "kotlin data", "rust", "science"]:
+            expected, results = full_engine.search(query), incremental_engine.search(query)
+            self.assertEqual(results.indices.tolist(), expected.indices.tolist())
+            for score, expected_score in zip(results.scores, expected.scores):
+                self.assertAlmostEqual(score, expected_score)
+
+        # Enregistrement : l'index BM25F ne se recharge pas comme un index TF-IDF
+        with tempfile.TemporaryDirectory() as directory:
+            search_engine.save(directory)
+            loaded_engine = BM25FEngine.load(directory, mmap=False)
+            self.assertEqual(loaded_engine.search("python").indices.tolist(), search_engine.search("python").indices.tolist())
+            with self.assertRaises(ValueError):
+                SearchEngine.load(directory)
+            loaded_engine.add_documents(new_docs)
+            self.assertEqual(loaded_engine.search("kotlin")[0][0].title, "Kotlin")
+        # Conversion entre modèles : réindexation complète (TF-IDF n'indexe que le contenu)
+        self.assertEqual(SearchEngine.from_engine(search_engine).search("python").total, 2)
+        print("✔️ Classement BM25F, ajouts et persistance vérifiés.")
+
+    # ====================
+    # Test de la recherche sémantique
+    # ====================
+    def test_semantic_search(self):
+        print("[Test] Recherche sémantique (LSA) et index IVF...")
+        topics = [["python", "code", "script", "function", "compiler"], ["cat", "dog", "pet", "animal", "kitten"]]
+        docs = [RedditPost(f"Post {i}", f"user_{i % 3}", "2025-01-01 10:00:00", i,
+                           " ".join(topics[i % 2][(i * j) % 5] for j in range(1, 4)))
+                for i in range(60)]
+        search_engine = SearchEngine(list(docs))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "semantic")
+            semantic_index = SemanticIndex.build(search_engine, path, n_components=8, n_lists=6, n_probe=2)
+            self.assertIsInstance(semantic_index.vectors, np.memmap)
+            self.assertEqual(semantic_index.vectors.dtype, np.float32)
+
+            # Les documents du même thème sont retrouvés, même sans le terme de la requête
+            results = semantic_index.search("script", k=20)
+            self.assertTrue(all(doc in docs[0::2] for doc, _ in results))
+            self.assertTrue(any("script" not in doc.content for doc, _ in results))
+            # Toutes les listes parcourues : classement exact par similarité cosinus
+            exhaustive = semantic_index.search("script", k=60, n_probe=6)
+            vectors = semantic_index.vectors_for(np.arange(60))
+            query_vector = semantic_index.project(search_engine.vectorizer.transform(["script"]))[0]
+            expected = vectors @ query_vector
+            self.assertEqual(exhaustive.total, int(np.count_nonzero(expected > 0)))
+            for score, expected_score in zip(exhaustive.scores, np.sort(expected)[::-1]):
+                self.assertAlmostEqual(score, expected_score, places=5)
+            self.assertLessEqual(set(results.indices[:5].tolist()), set(exhaustive.indices.tolist()))
+
+            search_filter = SearchFilter(creator=["user_1"])
+            self.assertTrue(all(doc.creator == "user_1" for doc, _ in semantic_index.search("dog", filters=search_filter)))
+            hybrid = semantic_index.search_hybrid("python", k=5)
+            self.assertIn("python", hybrid[0][0].content)
+
+            # Index enregistré : rechargé tant que le corpus correspond
+            loaded_index = SemanticIndex.load(path, search_engine)
+            self.assertEqual(loaded_index.search("script").indices.tolist(), semantic_index.search("script").indices.tolist())
+            with self.assertRaises(ValueError):
+                SemanticIndex.load(path, SearchEngine(docs[:30]))
+            with self.assertRaises(ValueError):
+                SemanticIndex.build(BM25FEngine(docs))
+
+            # Documents ajoutés depuis la construction : projetés et parcourus à part
+            search_engine.add_documents([BaseDocument("Nouveau", "Auteur", "2025-02-01", "kitten pet animal")])
+            self.assertIn(60, loaded_index.search("kitten", k=61).indices.tolist())
+            self.assertFalse(loaded_index.stale())
+            search_engine.add_documents([BaseDocument(f"Extra {i}", "Auteur", "2025-02-02", "compiler code") for i in range(15)])
+            self.assertTrue(loaded_index.stale())
+            rebuilt_index = semantic_index_for(search_engine, path, n_probe=3)
+            self.assertEqual(rebuilt_index.n_rows, 76)
+            self.assertEqual(rebuilt_index.n_probe, 3)
+        print("✔️ Recherche sémantique, hybride et persistance vérifiées.")
+
+    # ====================
+    # Test de la recherche par lots
+    # ====================
+    def test_search_engine_search_many(self):
+        print("[Test] Recherche de plusieurs requêtes en un seul appel...")
+        docs = [
+            BaseDocument("Python Tutorial", "John Doe", "2025-01-01", "Learn Python basics"),
+            BaseDocument("Advanced Python", "Jane Smith", "2025-02-01", "Master advanced Python techniques"),
+            BaseDocument("Rust Guide", "Alice Brown", "2025-03-01", "Systems programming with Rust"),
+            BaseDocument("Data Science", "Bob White", "2025-04-01", "Learn data science with Python")
+        ]
+        search_engine = SearchEngine(docs)
+        queries = ["python", "learn rust", "cuisine", "data python techniques"]
+        pages = search_engine.search_many(queries, k=2, chunk_size=3)
+        self.assertEqual(len(pages), len(queries))
+        for query, page in zip(queries, pages):
+            expected = search_engine.search(query, k=2)
+            self.assertEqual([doc for doc, _ in page], [doc for doc, _ in expected])
+            self.assertEqual(page.total, expected.total)
+            for (_, score), (_, expected_score) in zip(page, expected):
+                self.assertAlmostEqual(score, expected_score)
+        # La matrice termes x documents est celle de la recherche pendant la saisie, transposée une seule fois
+        term_matrix = search_engine.typing_index()["term_matrix"]
+        search_filter = SearchFilter(since="2025-02-01")
+        pages = search_engine.search_many(queries, k=2, filters=search_filter)
+        self.assertIs(search_engine.typing_index()["term_matrix"], term_matrix)
+        for query, page in zip(queries, pages):
+            expected = search_engine.search(query, k=2, filters=search_filter)
+            self.assertEqual([doc for doc, _ in page], [doc for doc, _ in expected])
+            self.assertEqual(page.total, expected.total)
+        self.assertEqual([doc.title for doc, _ in pages[0]], ["Advanced Python", "Data Science"])
+        print("✔️ Recherche par lots conforme à la recherche unitaire.")
+
+    # ====================
+    # Test de la recherche pendant la saisie
+    # ====================
+    def test_search_engine_incremental(self):
+        print("[Test] Recherche pendant la saisie...")
+        docs = [
+            BaseDocument("Python Tutorial", "John Doe", "2025-01-01", "Learn Python basics"),
+            BaseDocument("Advanced Python", "Jane Smith", "2025-02-01", "Master advanced Python techniques"),
+            BaseDocument("Rust Guide", "Alice Brown", "2025-03-01", "Systems programming with Rust"),
+            BaseDocument("Data Science", "Bob White", "2025-04-01", "Learn data science with Python")
+        ]
+        search_engine = SearchEngine(docs)
+        vocabulary = search_engine.vectorizer.vocabulary_
+        prefixes = search_engine.typing_index()["prefixes"]
+        self.assertEqual(sorted(prefixes.complete("pro")), [vocabulary["programming"]])
+        self.assertEqual(len(prefixes.complete("zzz")), 0)
+
+        # Mots terminés (ou complétion unique) : mêmes résultats que search()
+        for text, query in [("learn python ", "learn python"), ("learn pyt", "learn python"), ("rus", "rust")]:
+            page, expected = search_engine.search_incremental(text, k=3), search_engine.search(query, k=3)
+            self.assertEqual([doc for doc, _ in page], [doc for doc, _ in expected])
+            self.assertEqual(page.total, expected.total)
+            for (_, score), (_, expected_score) in zip(page, expected):
+                self.assertAlmostEqual(score, expected_score)
+
+        # Les scores des mots terminés sont réutilisés tant qu'ils ne changent pas
+        search_engine.search_incremental("rust g")
+        completed = search_engine.typing_index()["completed"]
+        search_engine.search_incremental("rust gu")
+        self.assertIs(search_engine.typing_index()["completed"], completed)
+        search_engine.add_documents([BaseDocument("Rust Book", "Carol", "2025-05-01", "Rust ownership explained")])
+        self.assertEqual(search_engine.search_incremental("rust own", k=1)[0][0].title, "Rust Book")
+
+        # Ajouts sans compaction : la matrice transposée est conservée, seules les lignes ajoutées le sont à part
+        search_engine = SearchEngine(docs, compaction_ratio=1.0)
+        term_matrix = search_engine.typing_index()["term_matrix"]
+        search_engine.add_documents([BaseDocument("Kotlin Guide", "Dan", "2025-06-01", "Kotlin coroutines programming")])
+        search_engine.add_documents([BaseDocument("Kotlin Python", "Eve", "2025-07-01", "Python and Kotlin interop")])
+        state = search_engine.typing_index()
+        self.assertTrue(np.shares_memory(state["term_matrix"].data, term_matrix.data))
+        self.assertEqual(state["added"].shape[1], 2)
+        vocabulary = search_engine.vectorizer.vocabulary_
+        self.assertEqual(sorted(state["prefixes"].complete("kot")), [vocabulary["kotlin"]])
+        for text, query in [("kotlin cor", "kotlin coroutines"), ("python kot", "python kotlin"), ("progr", "programming")]:
+            page, expected = search_engine.search_incremental(text, k=5), search_engine.search(query, k=5)
+            self.assertEqual([doc for doc, _ in page], [doc for doc, _ in expected])
+            for (_, score), (_, expected_score) in zip(page, expected):
+                self.assertAlmostEqual(score, expected_score)
+        for page, query in zip(search_engine.search_many(["kotlin", "python"], k=5), ["kotlin", "python"]):
+            self.assertEqual([doc for doc, _ in page], [doc for doc, _ in search_engine.search(query, k=5)])
+        self.assertEqual(len(search_engine.matches("kotlin python")), search_engine.search("kotlin python").total)
+        search_engine.compact()
+        self.assertEqual(search_engine.typing_index()["added"].shape[1], 0)
+        print("✔️ Complétion du dernier mot et réutilisation des scores.")
+
+    # ====================
+    # Test des filtres de recherche
+    # ====================
+    def test_search_filters(self):
+        print("[Test] Recherche filtrée par type, date, auteur et commentaires...")
+        docs = [
+            RedditPost("Python tips", "alice", "2025-01-05 10:00:00", 120, "python tips and tricks", "Python"),
+            RedditPost("Python news", "bob", "2025-02-10 09:30:00", 3, "python release news", "Python"),
+            ArxivPaper("Python for science", ["carol", "alice"], "2025-01-20T08:00:00Z", "python scientific computing"),
+            ArxivPaper("Rust safety", ["dave"], "2025-03-01T08:00:00Z", "rust memory safety"),
+            BaseDocument("Python notes", "erin", "2025-01-31", "python personal notes"),
+            RedditPost("Python date inconnue", "alice", "hier soir", 50, "python undated post", "Python"),
+        ]
+        python_docs = [0, 1, 2, 4, 5]
+        cases = [
+            (SearchFilter(doc_type='Reddit Post'), [0, 1, 5]),
+            (SearchFilter(doc_type=['Arxiv Paper', 0]), [2, 4]),
+            (SearchFilter(creator="alice"), [0, 2, 5]),
+            (SearchFilter(creator=["bob", "erin"]), [1, 4]),
+            (SearchFilter(creator="inconnu"), []),
+            # Une date sans heure inclut toute la journée en borne de fin ; date non reconnue : exclu
+            (SearchFilter(since="2025-01-01", until="2025-01-31"), [0, 2, 4]),
+            (SearchFilter(since="2025-02-01"), [1]),
+            (SearchFilter(min_comments=50), [0, 5]),
+            (SearchFilter(doc_type='Reddit Post', creator="alice", until="2025-12-31"), [0]),
+        ]
+        for engine_class in (SearchEngine, InvertedIndexEngine):
+            for container in (docs, DocumentStore(docs)):
+                search_engine = engine_class(container)
+                unfiltered = search_engine.search("python", k=len(docs))
+                scores = {doc.title: score for doc, score in unfiltered}
+                for search_filter, expected in cases:
+                    expected = [i for i in expected if i in python_docs]
+                    page = search_engine.search("python", k=len(docs), filters=search_filter)
+                    # Mêmes scores et même ordre que la recherche complète restreinte aux documents retenus
+                    self.assertEqual(page.indices.tolist(), [i for i in unfiltered.indices.tolist() if i in expected])
+                    self.assertEqual(page.total, len(expected))
+                    for doc, score in page:
+                        self.assertAlmostEqual(score, scores[doc.title])
+                    self.assertEqual(search_engine.matches("python", search_filter).tolist(), expected)
+                    incremental = search_engine.search_incremental("pyth", k=len(docs), filters=search_filter)
+                    self.assertEqual(sorted(incremental.indices.tolist()), expected)
+
+                # Pagination filtrée et clé de cache propre à chaque filtre
+                reddit = SearchFilter(doc_type='Reddit Post')
+                first = search_engine.search("python", k=1, filters=reddit)
+                second = search_engine.search("python", k=1, offset=1, filters=reddit)
+                self.assertTrue(first.has_next())
+                self.assertNotEqual(first.indices[0], second.indices[0])
+                self.assertEqual(len(search_engine.search("python", k=10, filters=SearchFilter(creator="dave"))), 0)
+
+            # Les documents ajoutés ensuite sont pris en compte par les filtres
+            search_engine.add_documents([RedditPost("Python ajout", "frank", "2025-04-01 12:00:00", 7, "python added")])
+            page = search_engine.search("python", filters=SearchFilter(creator="frank"))
+            self.assertEqual([doc.title for doc, _ in page], ["Python ajout"])
+
+        self.assertFalse(SearchFilter())
+        with self.assertRaises(ValueError):
+            SearchFilter(doc_type="Podcast")
+        with self.assertRaises(ValueError):
+            SearchFilter(since="la semaine dernière")
+        print("✔️ Filtres appliqués avant le calcul des scores.")
+
+    # ====================
+    # Test du cache de requêtes
+    # ====================
+    def test_search_engine_query_cache(self):
+        print("[Test] Cache des résultats de recherche...")
+        docs = [
+            BaseDocument("Python Tutorial", "John Doe", "2025-01-01", "Learn Python basics"),
+            BaseDocument("Data Science", "Alice Brown", "2025-03-01", "Learn data science with Python")
+        ]
+        search_engine = SearchEngine(docs, cache_size=2)
+        first = search_engine.search("Learn Python")
+        self.assertIs(search_engine.search("  python   LEARN "), first)
+        self.assertEqual((search_engine.cache.hits, search_engine.cache.misses), (1, 1))
+
+        search_engine.search("data")
+        search_engine.search("science")
+        self.assertEqual(search_engine.cache.info()["size"], 2)
+        self.assertIsNot(search_engine.search("learn python"), first)
+
+        self.assertEqual(search_engine.search("learn").total, 2)
+        search_engine.add_documents([BaseDocument("Rust Guide", "Bob White", "2025-04-01", "Learn Rust")])
+        self.assertEqual(search_engine.search("learn").total, 3)
+        print("✔️ Cache des résultats fonctionnel.")
+
+    # ====================
+    # Test de l'ingestion concurrente
+    # ====================
+    def test_ingest_sources(self):
+        print("[Test] Ingestion concurrente des sources...")
+        def slow_source():
+            time.sleep(0.3)
+            return [RedditPost("Titre1", "Auteur1", "2025-01-01", 10)]
+
+        def other_slow_source():
+            time.sleep(0.3)
+            return [ArxivPaper("Titre2", ["Auteur2"], "2025-01-02"), ArxivPaper("Titre3", ["Auteur3"], "2025-01-03")]
+
+        def failing_source():
+            raise ConnectionError("source indisponible")
+
+        manager = DocumentManager()
+        start = time.perf_counter()
+        reports = ingest_sources(manager, {"Lente": slow_source, "Autre": other_slow_source, "Panne": failing_source})
+        self.assertLess(time.perf_counter() - start, 0.55)
+        self.assertEqual(len(manager.doc_list), 3)
+        self.assertEqual(reports["Autre"]["documents"], 2)
+        self.assertIsNone(reports["Lente"]["error"])
+        self.assertIsInstance(reports["Panne"]["error"], ConnectionError)
+        self.assertGreaterEqual(reports["Lente"]["seconds"], 0.3)
+        print("✔️ Sources ingérées en parallèle.")
+
+    # ====================
+    # Test du moissonneur Arxiv paginé
+    # ====================
+    def test_arxiv_harvester(self):
+        print("[Test] Moissonnage Arxiv paginé sur un serveur local...")
+        FakeArxivHandler.connections, FakeArxivHandler.requests = 0, []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeArxivHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            harvester = ArxivHarvester(page_size=2, url=f"http://127.0.0.1:{server.server_port}/api/query", rate=1000)
+            papers = harvester.papers()
+            first_paper = next(papers)
+            self.assertIsInstance(first_paper, ArxivPaper)
+            self.assertEqual(first_paper.creators, ["Auteur 0", "Coauteur 0"])
+            self.assertEqual(first_paper.content, "Résumé de l'article 0")
+            self.assertEqual(len(FakeArxivHandler.requests), 1)
+
+            remaining = list(papers)
+            self.assertEqual([paper.title for paper in remaining], [f"Article {i}" for i in range(1, 5)])
+            self.assertEqual(FakeArxivHandler.requests, [(0, 2), (2, 2), (4, 2)])
+            self.assertEqual(FakeArxivHandler.connections, 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+        print("✔️ Moissonnage Arxiv réussi.")
+
+    # ====================
+    # Test du limiteur de débit
+    # ====================
+    def test_token_bucket(self):
+        print("[Test] Limiteur de débit à jetons...")
+        now, sleeps = [0.0], []
+        bucket = TokenBucket(rate=2, clock=lambda: now[0], sleep=sleeps.append)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(sleeps, [0.5])
+        now[0] = 10.0
+        bucket.acquire()
+        self.assertEqual(sleeps, [0.5])
+        print("✔️ Le limiteur n'attend que si nécessaire.")
+
+    # ====================
+    # Test de l'extracteur Reddit multi-subreddits
+    # ====================
+    def test_reddit_extractor_fake_client(self):
+        print("[Test] Extraction Reddit en flux avec un client factice...")
+        extractor = RedditExtractor(subreddits=["Python", "MachineLearning", "datascience"], limit=250,
+                                    client=FakeRedditClient(posts_per_subreddit=300))
+        posts = extractor.posts()
+        first_post = next(posts)
+        self.assertIsInstance(first_post, RedditPost)
+        remaining = list(posts)
+        self.assertEqual(len(remaining) + 1, 750)
+        self.assertEqual({post.title.split()[0] for post in remaining + [first_post]}, {"Python", "MachineLearning", "datascience"})
+        self.assertEqual(extractor.errors, {})
+
+        early_stop = RedditExtractor(subreddits=["Python", "rust"], limit=5000, client=FakeRedditClient(5000), queue_size=10).posts()
+        self.assertEqual(len([post for _, post in zip(range(20), early_stop)]), 20)
+        early_stop.close()
+        print("✔️ Extraction Reddit en flux réussie.")
+
+    # ====================
+    # Test du stockage en colonnes
+    # ====================
+    def test_document_store(self):
+        print("[Test] Stockage des documents en colonnes...")
+        docs = [
+            BaseDocument("Titre générique", "Auteur Test", "2025-01-01", "Contenu générique"),
+            RedditPost("Titre Reddit", "Utilisateur Reddit", "2025-01-01 10:30:00", 100, "Contenu Reddit"),
+            ArxivPaper("Titre Arxiv", ["Auteur1", "Auteur2"], "2025-01-02T08:00:00Z", "Résumé Arxiv"),
+            RedditPost("Date libre", "Anonyme", "hier soir", 0)
+        ]
+        store = DocumentStore(docs)
+        self.assertEqual(len(store), 4)
+        for original, stored in zip(docs, store):
+            self.assertIsInstance(stored, type(original))
+            self.assertEqual(str(stored), str(original))
+            self.assertEqual(stored.content, original.content)
+            # Vues et documents sans __dict__ : aucun dictionnaire d'attributs par document
+            self.assertFalse(hasattr(stored, "__dict__"))
+            self.assertFalse(hasattr(original, "__dict__"))
+        self.assertEqual(store[1].comments, 100)
+        self.assertEqual(store[2].creators, ["Auteur1", "Auteur2"])
+        self.assertEqual(store[-1].timestamp, "hier soir")
+        self.assertEqual(store[1].epoch, 1735727400)
+        # Nombre de commentaires absent ou donné en texte (accepté par RedditPost) : normalisé à l'ajout
+        loose = [RedditPost("Sans compte", "Anonyme", "2025-01-03", None), RedditPost("Texte", "Anonyme", "2025-01-03", "12"),
+                 RedditPost("Illisible", "Anonyme", "2025-01-03", "beaucoup")]
+        self.assertEqual([doc.comments for doc in DocumentStore(loose)], [0, 12, 0])
+        loose_manager = DocumentManager()
+        for doc in loose:
+            loose_manager.add(doc)
+        self.assertEqual(loose_manager.stats.summary()["comments"], 12)
+
+        manager = DocumentManager()
+        for doc in docs:
+            manager.add(doc)
+        self.assertEqual([doc.title for doc in manager.doc_list], [doc.title for doc in docs])
+
+        memory = benchmark_document_memory(2000)
+        self.assertLess(memory["store_bytes"], memory["objects_bytes"])
+        print("✔️ Stockage en colonnes fonctionnel.")
+
+    # ====================
+    # Test de la détection des doublons
+    # ====================
+    def test_document_manager_deduplication(self):
+        print("[Test] Détection des doublons à l'ajout...")
+        abstract = ("We study the scalability of sparse retrieval models on large scientific corpora "
+                    "and show that impact ordered inverted indexes answer top k queries efficiently")
+        manager = DocumentManager()
+        self.assertTrue(manager.add(ArxivPaper("Sparse retrieval at scale", ["Auteur1"], "2025-01-01", abstract)))
+        self.assertFalse(manager.add(ArxivPaper("Sparse  Retrieval at scale", ["Auteur1"], "2025-01-01", abstract.upper())))
+        self.assertFalse(manager.add(RedditPost("Sparse retrieval at scale (cross-post)", "Utilisateur", "2025-01-02", 3,
+                                                abstract + " efficiently")))
+        self.assertTrue(manager.add(ArxivPaper("Dense retrieval", ["Auteur2"], "2025-01-03",
+                                               "Dense embeddings trained with contrastive losses for semantic search")))
+        self.assertTrue(manager.add(RedditPost("Titre1", "Auteur1", "2025-01-01", 10)))
+        self.assertEqual(len(manager.doc_list), 3)
+        self.assertEqual(manager.duplicate_detector.counts, {"exact": 1, "near": 1})
+
+        # Signatures MinHash exactes : (a·x + b) mod p calculé sans dépassement sur 64 bits
+        detector = DuplicateDetector()
+        hashes = shingle_hashes(abstract)
+        expected = [min((int(a) * int(x) + int(b)) % MINHASH_PRIME for x in hashes)
+                    for a, b in zip(detector.multipliers, detector.offsets)]
+        self.assertEqual(detector.signature(hashes).tolist(), expected)
+        # Toutes les signatures d'une même clé de bande sont comparées, pas seulement la première
+        detector.band_keys = lambda signature: [0] * MINHASH_BANDS
+        other = "Graph neural networks learn node representations by passing messages between neighbours"
+        self.assertIsNone(detector.register(BaseDocument("Autre", "Auteur3", "2025-01-04", other)))
+        self.assertIsNone(detector.register(ArxivPaper("Sparse retrieval at scale", ["Auteur1"], "2025-01-01", abstract)))
+        self.assertEqual(detector.register(RedditPost("Cross-post", "Utilisateur", "2025-01-02", 3, abstract + " efficiently")), "near")
+
+        without_dedup = DocumentManager(deduplicate=False)
+        for _ in range(2):
+            without_dedup.add(RedditPost("Titre1", "Auteur1", "2025-01-01", 10))
+        self.assertEqual(len(without_dedup.doc_list), 2)
+        print("✔️ Doublons exacts et quasi-doublons ignorés.")
+
+    # ====================
+    # Test de la persistance du corpus
+    # ====================
+    def test_corpus_persistence(self):
+        print("[Test] Export et rechargement du corpus...")
+        docs = [
+            BaseDocument("Titre, générique", "Auteur Test", "2025-01-01", "Contenu sur\ndeux lignes ; avec séparateur"),
+            RedditPost("Titre Reddit", "Utilisateur Reddit", "2025-01-01 10:30:00", 100, "Contenu Reddit"),
+            ArxivPaper("Titre Arxiv", ["Auteur1", "Auteur2"], "2025-01-02T08:00:00Z", "Résumé Arxiv"),
+            RedditPost("Date libre", "Anonyme", "hier soir", 0),
+            ArxivPaper("Séparateur", ["Doe; John", "Smith, J."], "2025-01-03", "Noms avec séparateurs"),
+            BaseDocument("Sans auteur", None, "2025-01-04", "Auteur absent")
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("corpus.csv", "corpus.pkl"):
+                path = os.path.join(directory, name)
+                self.assertEqual(write_corpus(docs, path, chunk_size=3), len(docs))
+                manager, report = load_corpus(path, chunk_size=3)
+                self.assertEqual(report["documents"], len(docs))
+                self.assertGreater(report["docs_per_second"], 0)
+                for original, loaded in zip(docs, manager.doc_list):
+                    self.assertIsInstance(loaded, type(original))
+                    self.assertEqual(str(loaded), str(original))
+                    self.assertEqual(loaded.content, original.content)
+                self.assertEqual(manager.doc_list[1].comments, 100)
+                self.assertEqual(manager.doc_list[2].creators, ["Auteur1", "Auteur2"])
+                self.assertEqual(manager.doc_list[4].creators, ["Doe; John", "Smith, J."])
+                self.assertIsNone(manager.doc_list[5].creator)
+                self.assertEqual([doc.title for doc in read_corpus(path)], [doc.title for doc in docs])
+
+                # Les documents rechargés comptent pour la détection des doublons
+                self.assertFalse(manager.add(RedditPost("Titre Reddit", "Utilisateur Reddit", "2025-01-01 10:30:00", 100,
+                                                        "Contenu Reddit")))
+                self.assertTrue(manager.add(RedditPost("Nouveau", "Utilisateur", "2025-01-03", 1, "Autre contenu")))
+                self.assertEqual(len(manager.doc_list), len(docs) + 1)
+
+            with open(os.path.join(directory, "autre.pkl"), "wb") as f:
+                pickle.dump([], f)
+            with self.assertRaises(ValueError):
+                load_corpus(os.path.join(directory, "autre.pkl"))
+
+        throughput = benchmark_corpus_io(2000)
+        self.assertEqual(set(throughput), {"csv", "pkl"})
+        print("✔️ Corpus enregistré et rechargé sans perte.")
+
+    # ====================
+    # Test des statistiques incrémentales du corpus
+    # ====================
+    def test_corpus_stats(self):
+        print("[Test] Statistiques et facettes du corpus...")
+        docs = [
+            RedditPost("Python rapide", "alice", "2025-01-05 10:00:00", 12, "python numpy vitesse", subreddit="Python"),
+            RedditPost("Rust sûr", "bob", "2025-02-01 09:00:00", 3, "rust mémoire vitesse", subreddit="rust"),
+            ArxivPaper("Données", ["alice", "carol"], "2025-02-03T08:00:00Z", "apprentissage des données python"),
+            BaseDocument("Note", "dave", "2024-12-31", "note générique"),
+            RedditPost("Question", "bob", "hier soir", 7, "question python", subreddit="Python"),
+        ]
+        manager = DocumentManager()
+        for doc in docs:
+            manager.add(doc)
+        stats = manager.corpus_stats()
+        summary = stats.summary()
+        self.assertEqual(summary["documents"], 5)
+        self.assertEqual(list(summary["types"].values()), [1, 3, 1])
+        self.assertEqual(summary["comments"], 22)
+        self.assertEqual(summary["authors"], 4)
+        self.assertEqual(summary["months"], 4)
+        self.assertEqual(summary["subreddits"], 2)
+        self.assertEqual(stats.authors.top(2), [("alice", 2), ("bob", 2)])
+        self.assertEqual(stats.subreddits.top(1), [("Python", 2)])
+        engine = SearchEngine(docs)
+        self.assertEqual(summary["vocabulary"], len(engine.vectorizer.vocabulary_))
+        for query in ("python", "vitesse rust", "absent"):
+            self.assertEqual(len(engine.matches(query)), engine.search(query).total)
+
+        # Facettes d'un sous-ensemble comparées à un comptage direct
+        subset = [0, 2, 4]
+        facets = stats.facets(subset)
+        self.assertEqual(facets["documents"], 3)
+        self.assertEqual(facets["comments"], sum(docs[i].comments for i in subset if isinstance(docs[i], RedditPost)))
+        self.assertEqual(dict(facets["authors"]), {"alice": 2, "carol": 1, "bob": 1})
+        self.assertEqual(dict(facets["subreddits"]), {"Python": 2})
+        self.assertEqual(dict(facets["months"]), {"2025-01": 1, "2025-02": 1, "inconnu": 1})
+        self.assertEqual(stats.facets([])["documents"], 0)
+
+        # Le sous-reddit survit au stockage en colonnes et au rechargement du corpus
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("corpus.csv", "corpus.pkl"):
+                path = os.path.join(directory, name)
+                write_corpus(manager.doc_list, path)
+                loaded, _ = load_corpus(path)
+                self.assertEqual(loaded.doc_list[1].subreddit, "rust")
+                self.assertEqual(loaded.corpus_stats().summary(), summary)
+        store_manager = DocumentManager()
+        store_manager.use_store(DocumentStore(docs))
+        self.assertEqual(store_manager.corpus_stats().summary(), summary)
+        store_manager.add(RedditPost("Nouveau", "erin", "2025-03-01 00:00:00", 1, "autre texte", subreddit="rust"))
+        self.assertEqual(store_manager.corpus_stats().summary()["subreddits"], 2)
+        self.assertEqual(dict(store_manager.corpus_stats().subreddits.top()), {"Python": 2, "rust": 2})
+        print("✔️ Statistiques maintenues sans reparcourir le corpus.")
+
+    # ====================
+    # Test de l'instrumentation
+    # ====================
+    def test_instrumentation(self):
+        print("[Test] Compteurs, histogrammes et exports des métriques...")
+        metrics = Metrics()
+        # Désactivée : aucun enregistrement, contexte vide partagé
+        self.assertIs(metrics.timer("search_seconds"), NULL_TIMER)
+        metrics.count("documents_added_total")
+        metrics.observe("search_seconds", 0.5)
+        self.assertEqual(metrics.snapshot(), {"counters": [], "histograms": []})
+
+        metrics.enable()
+        metrics.count("documents_added_total", 3)
+        metrics.count("documents_duplicate_total", kind="exact")
+        metrics.count("documents_duplicate_total", kind='quasi "near"')
+        for value in (0.002, 0.003, 0.004, 0.2):
+            metrics.observe("search_seconds", value, engine="SearchEngine")
+        with metrics.timer("corpus_load_seconds"):
+            pass
+        snapshot = metrics.snapshot()
+        self.assertEqual([(c["name"], c["value"]) for c in snapshot["counters"]],
+                         [("documents_added_total", 3), ("documents_duplicate_total", 1), ("documents_duplicate_total", 1)])
+        histogram = next(h for h in snapshot["histograms"] if h["name"] == "search_seconds")
+        self.assertEqual((histogram["count"], histogram["labels"]), (4, {"engine": "SearchEngine"}))
+        self.assertAlmostEqual(histogram["sum"], 0.209)
+        self.assertEqual(histogram["buckets"]["0.005"], 3)
+        self.assertEqual(histogram["buckets"]["+Inf"], 4)
+        # Quantiles estimés dans le bon seau et bornés par les valeurs observées
+        self.assertTrue(0.0025 <= histogram["p50"] <= 0.005)
+        self.assertTrue(0.1 <= histogram["p99"] <= 0.2)
+        self.assertEqual(json.loads(metrics.to_json()), snapshot)
+
+        exposition = metrics.to_prometheus().splitlines()
+        self.assertIn("# TYPE documents_added_total counter", exposition)
+        self.assertIn("documents_added_total 3", exposition)
+        self.assertIn('documents_duplicate_total{kind="quasi \\"near\\""} 1', exposition)
+        self.assertIn("# TYPE search_seconds histogram", exposition)
+        self.assertIn('search_seconds_bucket{engine="SearchEngine",le="0.005"} 3', exposition)
+        self.assertIn('search_seconds_bucket{engine="SearchEngine",le="+Inf"} 4', exposition)
+        self.assertIn('search_seconds_count{engine="SearchEngine"} 4', exposition)
+        self.assertEqual(len(format_metrics_summary(metrics)), 5)
+
+        # Profil cProfile et pic mémoire autour des blocs chronométrés
+        metrics.enable(profile=True, trace_memory=True)
+        with metrics.timer("index_fit_seconds"):
+            sorted(str(i) for i in range(2000))
+        self.assertIn("function calls", metrics.profile_report("index_fit_seconds"))
+        self.assertEqual(metrics.profile_report("inconnu"), "")
+        self.assertIn("index_fit_peak_bytes", {h["name"] for h in metrics.snapshot()["histograms"]})
+        tracemalloc.stop()
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {"counters": [], "histograms": []})
+
+        # Points de mesure du module, via l'instance globale
+        METRICS.reset()
+        METRICS.enable()
+        try:
+            manager = DocumentManager()
+            doc = RedditPost("Python tips", "alice", "2025-01-05 10:00:00", 12, "python tips and tricks for everyone")
+            manager.add(doc)
+            manager.add(doc)
+            for engine_class in (SearchEngine, InvertedIndexEngine):
+                engine_class(manager.doc_list).search("python")
+            stages = {(h["name"], h["labels"].get("stage")) for h in METRICS.snapshot()["histograms"]}
+            for stage in ("transform", "similarity", "postings", "sort"):
+                self.assertIn(("search_stage_seconds", stage), stages)
+            self.assertIn(("search_seconds", None), stages)
+            self.assertIn(("index_fit_seconds", None), stages)
+            counters = {(c["name"], tuple(c["labels"].items())): c["value"] for c in METRICS.snapshot()["counters"]}
+            self.assertEqual(counters[("documents_added_total", ())], 1)
+            self.assertEqual(counters[("documents_duplicate_total", (("kind", "exact"),))], 1)
+        finally:
+            METRICS.disable()
+            METRICS.reset()
+        print("✔️ Métriques enregistrées et exportées.")
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file